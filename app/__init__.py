@@ -14,6 +14,35 @@ load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Result codec: json (Celery's default when compression is none), orjson or msgpack
+RESULT_SERIALIZER = os.getenv("RESULT_SERIALIZER", "json")
+# none, zlib, zstd or lz4; only results of at least RESULT_COMPRESSION_MIN_BYTES are compressed
+RESULT_COMPRESSION = os.getenv("RESULT_COMPRESSION", "none")
+RESULT_COMPRESSION_MIN_BYTES = int(os.getenv("RESULT_COMPRESSION_MIN_BYTES", "1024"))
+
+# Slack crawling is I/O bound and runs on a thread (or gevent) pool; LLM calls
+# get workers of their own; merges and other CPU work stay on the default queue.
+# Every task that reads or writes the message store is on the Slack queue, so
+# the store lives with the Slack workers only
+SLACK_QUEUE = os.getenv("SLACK_QUEUE", "slack")
+LLM_QUEUE = os.getenv("LLM_QUEUE", "llm")
+
+# Seconds before Redis hands an unacknowledged task to another worker. Fetch
+# chunks are acknowledged when they finish, so this must outlast the longest one
+BROKER_VISIBILITY_TIMEOUT = int(os.getenv("BROKER_VISIBILITY_TIMEOUT", "43200"))
+
+TASK_QUEUES = {
+    "app.tasks.fetch_messages_task": SLACK_QUEUE,
+    "app.tasks.fetch_messages_chunk_task": SLACK_QUEUE,
+    "app.tasks.calculate_top_repliers_task": SLACK_QUEUE,
+    "app.tasks.channel_repliers_task": SLACK_QUEUE,
+    "app.tasks.apply_slack_event_task": SLACK_QUEUE,
+    "app.tasks.thread_parents_task": SLACK_QUEUE,
+    "app.tasks.summarize_thread_task": LLM_QUEUE,
+    "app.tasks.summarize_threads_task": LLM_QUEUE,
+    "app.tasks.summarize_thread_parents_task": LLM_QUEUE,
+}
+
 def make_celery(app):
     celery = Celery(
         app.import_name,
@@ -22,6 +51,18 @@ def make_celery(app):
     )
     celery.conf.update(app.config)
     celery.conf.broker_connection_retry_on_startup = True
+    celery.conf.task_routes = {name: {"queue": queue} for name, queue in TASK_QUEUES.items()}
+    # Priorities 0 (first) to 9 within each queue; Redis keeps one list per step
+    celery.conf.broker_transport_options = {
+        "priority_steps": list(range(10)), "sep": ":", "queue_order_strategy": "priority",
+        "visibility_timeout": BROKER_VISIBILITY_TIMEOUT,
+    }
+
+    if RESULT_SERIALIZER != "json" or RESULT_COMPRESSION != "none":
+        from .result_codec import register_result_codec
+        codec = register_result_codec(RESULT_SERIALIZER, RESULT_COMPRESSION, RESULT_COMPRESSION_MIN_BYTES)
+        celery.conf.result_serializer = codec
+        celery.conf.result_accept_content = ["json", codec]
 
     return celery
 
@@ -0,0 +1,104 @@
+import heapq
+from array import array
+from datetime import date, datetime, time, timedelta
+from typing import Iterable
+
+
+class TopRepliersAggregator:
+    """Single-pass discussions/responses counter for thread repliers.
+
+    User IDs are interned to dense integers and counts live in two flat
+    integer arrays, so memory depends on the number of distinct repliers
+    and not on how many messages are streamed through ``add_thread``.
+    """
+
+    def __init__(self):
+        self._index = {}
+        self._user_ids = []
+        self._discussions = array('q')
+        self._responses = array('q')
+
+    def _intern(self, user_id: str) -> int:
+        idx = self._index.get(user_id)
+        if idx is None:
+            idx = self._index[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+            self._discussions.append(0)
+            self._responses.append(0)
+        return idx
+
+    def add_thread(self, parent_author: str, reply_authors: Iterable[str]):
+        """Count one thread: a discussion per distinct replier, a response per reply"""
+        counted = set()
+        for reply_author in reply_authors:
+            if reply_author == parent_author:
+                continue
+            idx = self._intern(reply_author)
+            if idx not in counted:
+                counted.add(idx)
+                self._discussions[idx] += 1
+            self._responses[idx] += 1
+
+    def add_counts(self, user_id: str, discussions: int, responses: int):
+        """Add counts already aggregated elsewhere, e.g. a stored daily rollup"""
+        idx = self._intern(user_id)
+        self._discussions[idx] += discussions
+        self._responses[idx] += responses
+
+    def consume(self, threads: Iterable[tuple[str, Iterable[str]]]) -> "TopRepliersAggregator":
+        for parent_author, reply_authors in threads:
+            self.add_thread(parent_author, reply_authors)
+        return self
+
+    def items(self) -> list[tuple[str, int, int]]:
+        """(user_id, discussions, responses) of every replier, in first-seen order"""
+        return list(zip(self._user_ids, self._discussions, self._responses))
+
+    def top(self, n: int) -> list[tuple[str, int, int]]:
+        """(user_id, discussions, responses) of the n most active repliers.
+
+        Uses a bounded heap; ties keep first-seen order like a stable sort.
+        """
+        discussions, responses = self._discussions, self._responses
+        best = heapq.nlargest(n, range(len(self._user_ids)), key=lambda i: (discussions[i], responses[i]))
+        return [(self._user_ids[i], discussions[i], responses[i]) for i in best]
+
+
+def _day_bounds(day: date) -> tuple[float, float]:
+    """[local midnight, next local midnight) of ``day`` as timestamps"""
+    start = datetime.combine(day, time())
+    return start.timestamp(), (start + timedelta(days=1)).timestamp()
+
+
+def replier_counts_by_day(store, channel: str, first_day: date, last_day: date,
+                          today: date = None) -> TopRepliersAggregator:
+    """Replier counts of the threads started between two days, from daily rollups.
+
+    Past days are counted once and stored by the message store, which
+    drops a day's rollup whenever one of its threads changes; only those
+    and today, which is still filling up, are computed from the messages.
+    Days are local dates, like the ranges the tasks are given.
+    """
+    today = today or date.today()
+    last_closed = min(last_day, today - timedelta(days=1))
+    if first_day <= last_closed:
+        stored = store.rollup_days(channel, first_day.isoformat(), last_closed.isoformat())
+        day = first_day
+        while day <= last_closed:
+            if day.isoformat() not in stored:
+                store.materialize_rollup(channel, day.isoformat(), *_day_bounds(day))
+            day += timedelta(days=1)
+
+    aggregator = TopRepliersAggregator()
+    for user_id, discussions, responses in store.sum_rollups(channel, first_day.isoformat(), last_closed.isoformat()):
+        aggregator.add_counts(user_id, discussions, responses)
+    if first_day <= today <= last_day:
+        for user_id, discussions, responses in store.replier_counts(channel, *_day_bounds(today)):
+            aggregator.add_counts(user_id, discussions, responses)
+    return aggregator
+
+
+def top_repliers_by_day(store, channel: str, first_day: date, last_day: date, n: int,
+                        today: date = None) -> list[tuple[str, int, int]]:
+    """(user_id, discussions, responses) of the n most active repliers between two days"""
+    return replier_counts_by_day(store, channel, first_day, last_day, today).top(n)
@@ -0,0 +1,176 @@
+import json
+import os
+import re
+from array import array
+from typing import Iterable, Iterator
+
+from . import records as message_records
+
+ARTIFACTS_DIR = os.getenv(
+    "ARTIFACTS_DIR",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'artifacts')
+)
+
+# Records appended to a resumable artifact between two checkpoints
+ARTIFACT_CHECKPOINT_RECORDS = int(os.getenv("ARTIFACT_CHECKPOINT_RECORDS", "500"))
+
+_ARTIFACT_ID = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class ArtifactNotFound(Exception):
+    pass
+
+
+def artifact_path(artifact_id: str, suffix: str = ".ndjson") -> str:
+    if not _ARTIFACT_ID.match(artifact_id):
+        raise ArtifactNotFound(artifact_id)
+    return os.path.join(ARTIFACTS_DIR, artifact_id + suffix)
+
+
+def write_ndjson(artifact_id: str, records: Iterable[dict]) -> int:
+    """Stream records into ``<artifact_id>.ndjson``, one JSON document per line.
+
+    A sidecar ``.idx`` file keeps the byte offset of every line so readers
+    can jump to any record without scanning. Files are written under a
+    temporary name and renamed, so readers never see a partial artifact.
+    Returns the number of records written.
+    """
+    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    path = artifact_path(artifact_id)
+    offsets = array('Q')
+    with open(path + ".tmp", "wb") as out:
+        for record in records:
+            offsets.append(out.tell())
+            out.write(json.dumps(record, ensure_ascii=False, default=message_records.jsonable).encode("utf-8"))
+            out.write(b"\n")
+    with open(path + ".idx.tmp", "wb") as idx:
+        offsets.tofile(idx)
+    os.replace(path + ".idx.tmp", artifact_path(artifact_id, ".ndjson.idx"))
+    os.replace(path + ".tmp", path)
+    return len(offsets)
+
+
+class ResumableRecords:
+    """A ``.rows`` artifact written across the attempts of an interruptible task.
+
+    ``.rows`` artifacts hold message records in the compact row format, for
+    intermediate artifacts such as fetch chunks: no per-record keys and no
+    derived url or date. Records are appended to ``<artifact_id>.rows.partial``. Every
+    ``checkpoint_records`` records the file is synced to disk and
+    ``<artifact_id>.rows.ckpt`` saves its length, the number of records and
+    the ``post_id`` of the last one. Opening the same artifact again drops
+    whatever was written after the last checkpoint, so a new attempt goes
+    on from ``last_post_id``; ``finish`` renames the file to the final
+    ``.rows`` artifact.
+    """
+
+    def __init__(self, artifact_id: str, checkpoint_records: int = None):
+        os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+        self.checkpoint_records = checkpoint_records or ARTIFACT_CHECKPOINT_RECORDS
+        self._path = artifact_path(artifact_id, ".rows")
+        checkpoint = {"offset": 0, "count": 0, "last_post_id": None}
+        try:
+            with open(self._path + ".ckpt") as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            pass
+        self._out = open(self._path + ".partial", "ab")
+        if self._out.tell() < checkpoint["offset"]:
+            # The partial file is shorter than checkpointed: start over
+            checkpoint = {"offset": 0, "count": 0, "last_post_id": None}
+        self._out.truncate(checkpoint["offset"])
+        self.count = checkpoint["count"]
+        self.last_post_id = checkpoint["last_post_id"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, records: Iterable) -> int:
+        """Append records, checkpointing as they go; returns the records written by every attempt"""
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.checkpoint_records:
+                self._append(batch)
+                batch = []
+        self._append(batch)
+        return self.count
+
+    def _append(self, batch):
+        if not batch:
+            return
+        self.count += message_records.write_records(self._out, batch)
+        self.last_post_id = batch[-1].post_id
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        with open(self._path + ".ckpt.tmp", "w") as f:
+            json.dump({"offset": self._out.tell(), "count": self.count, "last_post_id": self.last_post_id}, f)
+        os.replace(self._path + ".ckpt.tmp", self._path + ".ckpt")
+
+    def finish(self) -> int:
+        """Publish the artifact under its final name and drop the checkpoint"""
+        self._out.close()
+        os.replace(self._path + ".partial", self._path)
+        try:
+            os.remove(self._path + ".ckpt")
+        except FileNotFoundError:
+            pass
+        return self.count
+
+    def close(self):
+        """Stop writing; the partial file and its checkpoint stay for the next attempt"""
+        self._out.close()
+
+
+def read_records(artifact_id: str) -> Iterator:
+    """Yield the message records of a ``.rows`` artifact"""
+    with open(_existing(artifact_id, ".rows"), "rb") as f:
+        yield from message_records.read_records(f)
+
+
+def read_ndjson(artifact_id: str) -> Iterator[dict]:
+    """Yield the records of an artifact"""
+    for line in iter_ndjson_lines(artifact_id):
+        yield json.loads(line)
+
+
+def count_records(artifact_id: str) -> int:
+    return os.path.getsize(_existing(artifact_id, ".ndjson.idx")) // array('Q').itemsize
+
+
+def iter_ndjson_lines(artifact_id: str, offset: int = 0, limit: int = None) -> Iterator[bytes]:
+    """Yield raw NDJSON lines starting at record ``offset``"""
+    path = _existing(artifact_id)
+    start = 0
+    if offset:
+        offsets = array('Q')
+        with open(_existing(artifact_id, ".ndjson.idx"), "rb") as idx:
+            idx.seek(offset * offsets.itemsize)
+            offsets.frombytes(idx.read(offsets.itemsize))
+        if not offsets:
+            return
+        start = offsets[0]
+    with open(path, "rb") as f:
+        f.seek(start)
+        for n, line in enumerate(f):
+            if limit is not None and n >= limit:
+                break
+            yield line
+
+
+def delete(artifact_id: str):
+    for suffix in (".ndjson", ".ndjson.idx", ".rows", ".rows.partial", ".rows.ckpt"):
+        try:
+            os.remove(artifact_path(artifact_id, suffix))
+        except FileNotFoundError:
+            pass
+
+
+def _existing(artifact_id: str, suffix: str = ".ndjson") -> str:
+    path = artifact_path(artifact_id, suffix)
+    if not os.path.exists(path):
+        raise ArtifactNotFound(artifact_id)
+    return path
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+import redis
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from . import logger
+from .utils import client_util
+
+CHANNEL_DIRECTORY_TTL = int(os.getenv("CHANNEL_DIRECTORY_TTL", "3600"))
+# Min seconds between two conversations.list crawls triggered by unknown names
+CHANNEL_DIRECTORY_REFRESH_INTERVAL = int(os.getenv("CHANNEL_DIRECTORY_REFRESH_INTERVAL", "60"))
+CHANNEL_DIRECTORY_TYPES = os.getenv("CHANNEL_DIRECTORY_TYPES", "public_channel")
+
+REDIS_KEY = "slack-reports:channels"
+REDIS_REFRESH_LOCK = "slack-reports:channels:refreshing"
+
+_CHANNEL_ID = re.compile(r"^[CGD][A-Z0-9]{8,}$")
+
+
+def _channel_info(channel: dict) -> dict:
+    return dict(
+        id=channel["id"],
+        name=channel.get("name"),
+        is_private=channel.get("is_private", False),
+        is_archived=channel.get("is_archived", False),
+        num_members=channel.get("num_members"),
+        created=channel.get("created"),
+    )
+
+
+class ChannelDirectory:
+    """Channel name -> ID and ID -> metadata maps, filled from paginated ``conversations.list``.
+
+    Lookups are dict reads. Once the maps are older than ``ttl`` they keep
+    being served while a background thread reloads them; an unknown name
+    triggers a synchronous crawl, at most once per ``refresh_interval``
+    across all workers. With a Redis client the crawled maps are shared by
+    every worker.
+    """
+
+    def __init__(self, client: WebClient, redis_client: Optional[redis.Redis] = None,
+                 ttl: int = CHANNEL_DIRECTORY_TTL, refresh_interval: int = CHANNEL_DIRECTORY_REFRESH_INTERVAL,
+                 types: str = CHANNEL_DIRECTORY_TYPES):
+        self.client = client
+        self.redis = redis_client
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.types = types
+        self._by_id = {}
+        self._by_name = {}
+        self._loaded_at = None
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._background = None
+
+    def resolve(self, channel: str) -> Optional[str]:
+        """Channel ID for a channel ID, name or ``#name`` (None if unknown)"""
+        channel = channel.strip()
+        if _CHANNEL_ID.match(channel):
+            return channel
+        name = channel.lstrip("#").lower()
+
+        self._ensure_loaded()
+        channel_id = self._by_name.get(name)
+        if channel_id is None and self._reload_on_miss():
+            channel_id = self._by_name.get(name)
+        return channel_id
+
+    def channels(self) -> list[dict]:
+        """Metadata of every channel in the directory"""
+        self._ensure_loaded()
+        return list(self._by_id.values())
+
+    def refresh(self) -> dict:
+        """Crawl every page of ``conversations.list`` and replace the maps"""
+        self._last_refresh = time.monotonic()
+        channels = {}
+        cursor = None
+        try:
+            while True:
+                response = self.client.conversations_list(
+                    types=self.types, exclude_archived=False, limit=1000, cursor=cursor
+                )
+                for channel in response["channels"]:
+                    channels[channel["id"]] = _channel_info(channel)
+                cursor = response.get("response_metadata", {}).get("next_cursor")
+                if not cursor:
+                    break
+        except SlackApiError as e:
+            logger.error(f"Error listing channels: {e}")
+            raise
+        logger.info(f"Channel directory refreshed with {len(channels)} channels")
+
+        self._set(channels)
+        if self.redis is not None:
+            pipe = self.redis.pipeline()
+            pipe.delete(REDIS_KEY)
+            if channels:
+                pipe.hset(REDIS_KEY, mapping={cid: json.dumps(info) for cid, info in channels.items()})
+                pipe.expire(REDIS_KEY, self.ttl)
+            pipe.execute()
+        return channels
+
+    def _set(self, channels: dict):
+        by_name = {info["name"].lower(): cid for cid, info in channels.items() if info.get("name")}
+        with self._lock:
+            self._by_id, self._by_name = channels, by_name
+            self._loaded_at = time.monotonic()
+
+    def _load_redis(self) -> bool:
+        if self.redis is None:
+            return False
+        values = self.redis.hgetall(REDIS_KEY)
+        if not values:
+            return False
+        self._set({
+            (cid.decode() if isinstance(cid, bytes) else cid): json.loads(info)
+            for cid, info in values.items()
+        })
+        return True
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None:
+            if not self._load_redis():
+                self.refresh()
+        elif time.monotonic() - self._loaded_at >= self.ttl:
+            self._refresh_in_background()
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._background is not None and self._background.is_alive():
+                return
+            self._background = threading.Thread(target=self._background_refresh, daemon=True)
+            self._background.start()
+
+    def _background_refresh(self):
+        try:
+            if self._should_refresh() or not self._load_redis():
+                self.refresh()
+        except Exception as e:
+            logger.error(f"Background channel directory refresh failed: {e}")
+
+    def _reload_on_miss(self) -> bool:
+        """Reload the maps after a miss; False when a crawl ran too recently"""
+        if self._should_refresh():
+            self.refresh()
+            return True
+        # Another worker may have crawled since we loaded
+        return self._load_redis()
+
+    def _should_refresh(self) -> bool:
+        if time.monotonic() - self._last_refresh < self.refresh_interval:
+            return False
+        if self.redis is None:
+            return True
+        return bool(self.redis.set(REDIS_REFRESH_LOCK, "1", nx=True, ex=self.refresh_interval))
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_channel_directory() -> ChannelDirectory:
+    """Process-wide directory, shared through Redis when ``result_backend`` is set"""
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            redis_url = os.getenv("result_backend")
+            redis_client = redis.Redis.from_url(redis_url) if redis_url else None
+            _directory = ChannelDirectory(client_util, redis_client)
+        return _directory
@@ -0,0 +1,48 @@
+import os
+from typing import Iterable
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Token budget for the replies sent in one prompt; longer threads are map-reduced
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+
+# Rough chars per token of chat text when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in ``text``: exact with tiktoken, estimated otherwise"""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_lines(lines: Iterable[str], max_tokens: int = None) -> list[list[str]]:
+    """Group lines into consecutive windows of at most ``max_tokens`` tokens.
+
+    Windows are filled greedily from the first line, so appending lines
+    never moves an earlier boundary: only the last window changes and new
+    ones are added after it. A single line larger than the budget gets a
+    window of its own.
+    """
+    max_tokens = max_tokens or SUMMARY_CHUNK_TOKENS
+    chunks = []
+    current, current_tokens = [], 0
+    for line in lines:
+        tokens = count_tokens(line)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,69 @@
+import os
+import threading
+
+import requests
+from openai import OpenAI
+from requests.adapters import HTTPAdapter
+from slack_sdk import WebClient
+
+from .rate_limiter import RateLimitedWebClient, get_rate_limiter
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+# Keep-alive connections each worker process holds per LLM host
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))
+
+_slack_client = None
+_slack_lock = threading.Lock()
+
+_registry = {}
+_registry_pid = None
+_registry_lock = threading.RLock()  # factories may look up other entries
+
+
+def get_slack_client() -> WebClient:
+    """The one Slack WebClient of the process, throttled by the shared rate limiter.
+
+    WebClient opens a connection per call and keeps no socket around, so
+    the instance created at import time is safe to share with forked
+    Celery workers.
+    """
+    global _slack_client
+    with _slack_lock:
+        if _slack_client is None:
+            _slack_client = RateLimitedWebClient(token=os.getenv("SLACK_TOKEN"), limiter=get_rate_limiter())
+        return _slack_client
+
+
+def get_or_create(key, factory):
+    """Long-lived object of the current worker process, built by ``factory`` on first use.
+
+    Connection pools must not be shared across a fork, so the registry
+    starts empty again in every new process.
+    """
+    global _registry_pid
+    with _registry_lock:
+        if _registry_pid != os.getpid():
+            _registry.clear()
+            _registry_pid = os.getpid()
+        if key not in _registry:
+            _registry[key] = factory()
+        return _registry[key]
+
+
+def get_openai_client():
+    """OpenAI client of this process; its httpx pool keeps connections alive between tasks"""
+    return get_or_create(("openai",), lambda: OpenAI(api_key=os.getenv('OPENAI_API_KEY')))
+
+
+def get_http_session(name: str) -> requests.Session:
+    """requests Session of this process with a keep-alive pool of LLM_POOL_SIZE connections"""
+    def build():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=LLM_POOL_SIZE, pool_maxsize=LLM_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    return get_or_create(("session", name), build)
@@ -1,6 +1,7 @@
 from .llm_interface import LLMInterface
 from .llm_openai import OpenAILLM
 from .llm_ollama import OllamaLLM
+from .clients import get_or_create
 
 class LLMFactory:
     """Factory for creating LLM instances"""
@@ -9,8 +10,12 @@ class LLMFactory:
     def create_llm(provider: str, model: str) -> LLMInterface:
         """Create an LLM instance based on provider
         
+        Instances hold no per-request state, so each worker process builds
+        one per provider and model and every task reuses it.
+        
         Args:
             provider: Either 'openai' or 'ollama'
+            model: The model to use
             
         Returns:
             LLM instance
@@ -21,8 +26,8 @@ class LLMFactory:
         provider_lower = provider.lower().strip()
         
         if provider_lower == 'openai':
-            return OpenAILLM(model)
+            return get_or_create(("llm", provider_lower, model), lambda: OpenAILLM(model))
         elif provider_lower == 'ollama':
-            return OllamaLLM(model)
+            return get_or_create(("llm", provider_lower, model), lambda: OllamaLLM(model))
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}. Supported providers: 'openai', 'ollama'") 
\ No newline at end of file
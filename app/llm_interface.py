@@ -1,37 +1,97 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, Any, Iterator
 import yaml
+import hashlib
 import os
 
+
+class PromptTemplate:
+    """A prompt template parsed once, rendered by joining literals and values"""
+    
+    def __init__(self, template: str):
+        self.template = template
+        self.parts = []
+        self.simple = True
+        for literal, field, format_spec, conversion in Formatter().parse(template):
+            self.parts.append((literal, field))
+            if format_spec or conversion:
+                self.simple = False
+    
+    def render(self, **values) -> str:
+        if not self.simple:
+            return self.template.format(**values)
+        return "".join(
+            literal + (str(values[field]) if field is not None else "")
+            for literal, field in self.parts
+        )
+
+
+@lru_cache(maxsize=None)
+def load_prompts() -> Dict[str, Any]:
+    """Prompts from prompts.yml, read and parsed once per process
+    
+    Every prompt set gets its user_prompt compiled into a PromptTemplate
+    and its version string computed up front.
+    """
+    prompts_path = os.path.join(os.path.dirname(__file__), 'prompts.yml')
+    with open(prompts_path, 'r', encoding='utf-8') as file:
+        prompts = yaml.safe_load(file)
+    for prompt in prompts.values():
+        prompt['template'] = PromptTemplate(prompt['user_prompt'])
+        digest = hashlib.sha256(
+            (prompt['system_prompt'] + prompt['user_prompt']).encode('utf-8')
+        ).hexdigest()[:12]
+        prompt['prompt_version'] = f"{prompt.get('version', 0)}-{digest}"
+    return prompts
+
+
+class LLMError(RuntimeError):
+    """A provider failed to generate a summary; the message is reported in place of it"""
+
+
 class LLMInterface(ABC):
     """Abstract interface for Language Model implementations"""
     
-    def __init__(self):
-        self.prompts = self._load_prompts()
+    # Name requests are rate limited under, see rate_limiter.LLM_RATE_LIMITS
+    provider = None
     
-    def _load_prompts(self) -> Dict[str, Any]:
-        """Load prompts from YAML file"""
-        prompts_path = os.path.join(os.path.dirname(__file__), 'prompts.yml')
-        with open(prompts_path, 'r', encoding='utf-8') as file:
-            return yaml.safe_load(file)
+    def __init__(self):
+        self.prompts = load_prompts()
     
     @abstractmethod
-    def generate_summary(self, main_message: str, replies: str) -> str:
+    def generate_summary(self, main_message: str, replies: str, prompt: str = 'thread_summary') -> str:
         """Generate a summary of a Slack thread
         
         Args:
             main_message: The main message content
             replies: The formatted replies content
+            prompt: Prompt set from prompts.yml (thread_summary, chunk_summary or reduce_summary)
             
         Returns:
             Generated summary text
+        
+        Raises:
+            LLMError: the provider failed; the summary must not be cached
         """
         pass
     
-    def format_prompt(self, main_message: str, replies: str) -> tuple[str, str]:
+    def stream_summary(self, main_message: str, replies: str, prompt: str = 'thread_summary') -> Iterator[str]:
+        """Generate a summary as a stream of text fragments
+        
+        Failures are raised as in generate_summary. Providers without streaming support yield the whole summary at once.
+        """
+        yield self.generate_summary(main_message, replies, prompt)
+    
+    def prompt_version(self, prompt: str = 'thread_summary') -> str:
+        """Identifies a prompt set: declared version plus a hash of the templates"""
+        return self.prompts[prompt]['prompt_version']
+    
+    def format_prompt(self, main_message: str, replies: str, prompt: str = 'thread_summary') -> tuple[str, str]:
         """Format the prompts with the provided content"""
-        system_prompt = self.prompts['thread_summary']['system_prompt']
-        user_prompt = self.prompts['thread_summary']['user_prompt'].format(
+        system_prompt = self.prompts[prompt]['system_prompt']
+        user_prompt = self.prompts[prompt]['template'].render(
             main_message=main_message,
             replies=replies
         )
@@ -1,27 +1,36 @@
+import json
 import os
 import requests
 from dotenv import load_dotenv
-from .llm_interface import LLMInterface
-from . import logger
+from .llm_interface import LLMError, LLMInterface
+from .clients import get_http_session
+from . import logger, metrics
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://host.docker.internal:11434')
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'deepseek-r1:latest')
+# (connect, read) seconds; read is the longest wait for the next bytes, i.e. the whole
+# reply of a plain request but only the gap between fragments of a streamed one
+OLLAMA_TIMEOUT = (float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '10')), float(os.getenv('OLLAMA_READ_TIMEOUT', '300')))
 
 class OllamaLLM(LLMInterface):
     """Ollama implementation of LLM interface"""
     
+    provider = "ollama"
+    
     def __init__(self, model: str = None):
         super().__init__()
         self.base_url = OLLAMA_BASE_URL
+        # Keep-alive pool shared by every task of this worker process
+        self.session = get_http_session("ollama")
         # Use provided model or fallback to environment variable or default
         self.model = model or OLLAMA_MODEL
     
-    def generate_summary(self, main_message: str, replies: str) -> str:
+    def generate_summary(self, main_message: str, replies: str, prompt: str = 'thread_summary') -> str:
         """Generate summary using Ollama API"""
         try:
-            system_prompt, user_prompt = self.format_prompt(main_message, replies)
+            system_prompt, user_prompt = self.format_prompt(main_message, replies, prompt)
             
             payload = {
                 "model": self.model,
@@ -35,19 +44,22 @@ class OllamaLLM(LLMInterface):
 
             logger.info(f"Sending request to Ollama with model: {self.model}")
             
-            response = requests.post(f"{self.base_url}/api/chat", json=payload)
+            response = self.session.post(f"{self.base_url}/api/chat", json=payload, timeout=OLLAMA_TIMEOUT)
             
             if response.status_code != 200:
                 logger.error("Error in Ollama response: %s", response.text)
-                return f"Error: Ollama respondió con código {response.status_code}"
+                raise LLMError(f"Error: Ollama respondió con código {response.status_code}")
             
             try:
                 data = response.json()
-                return data.get("message", {}).get("content", "")
             except ValueError:
                 logger.error("Failed to parse the response as JSON")
-                return "Error: No se pudo parsear la respuesta de Ollama"
+                raise LLMError("Error: No se pudo parsear la respuesta de Ollama")
+            metrics.count_tokens(self.provider, self.model, data.get("prompt_eval_count"), data.get("eval_count"))
+            return data.get("message", {}).get("content", "")
             
+        except LLMError:
+            raise
         except requests.exceptions.ConnectionError as e:
             error_msg = f"No se puede conectar a Ollama en {self.base_url}. "
             if "host.docker.internal" in str(e):
@@ -55,10 +67,47 @@ class OllamaLLM(LLMInterface):
             else:
                 error_msg += "Verifica que Ollama esté corriendo y sea accesible."
             logger.error(f"Ollama connection error: {e}")
-            return error_msg
+            raise LLMError(error_msg) from e
         except requests.exceptions.RequestException as e:
             logger.error(f"Error contacting Ollama: {e}")
-            return f"Error contacting Ollama: {str(e)}"
+            raise LLMError(f"Error contacting Ollama: {str(e)}") from e
         except Exception as e:
             logger.error(f"Error generating summary with Ollama: {e}")
-            return f"Error generating summary: {str(e)}" 
\ No newline at end of file
+            raise LLMError(f"Error generating summary: {str(e)}") from e
+    
+    def stream_summary(self, main_message: str, replies: str, prompt: str = 'thread_summary'):
+        """Stream the summary from the Ollama chat API as it is generated"""
+        system_prompt, user_prompt = self.format_prompt(main_message, replies, prompt)
+        
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "think": False,
+            "stream": True
+        }
+        
+        logger.info(f"Streaming request to Ollama with model: {self.model}")
+        
+        # Ollama streams one JSON object per line until "done"
+        with self.session.post(f"{self.base_url}/api/chat", json=payload, stream=True,
+                               timeout=OLLAMA_TIMEOUT) as response:
+            if response.status_code != 200:
+                logger.error("Error in Ollama response: %s", response.text)
+                raise LLMError(f"Ollama respondió con código {response.status_code}")
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise LLMError(data["error"])
+                content = data.get("message", {}).get("content", "")
+                if content:
+                    yield content
+                if data.get("done"):
+                    # The closing object carries the token counts
+                    metrics.count_tokens(self.provider, self.model, data.get("prompt_eval_count"),
+                                         data.get("eval_count"))
+                    break
@@ -1,24 +1,27 @@
 import os
-from openai import OpenAI
 from dotenv import load_dotenv
-from .llm_interface import LLMInterface
-from . import logger
+from .llm_interface import LLMError, LLMInterface
+from .clients import get_openai_client
+from . import logger, metrics
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 class OpenAILLM(LLMInterface):
     """OpenAI implementation of LLM interface"""
     
+    provider = "openai"
+    
     def __init__(self, model: str = None):
         super().__init__()
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # Shared by every task of this worker process
+        self.client = get_openai_client()
         # Use provided model or fallback to environment variable or default
         self.model = model or os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
     
-    def generate_summary(self, main_message: str, replies: str) -> str:
+    def generate_summary(self, main_message: str, replies: str, prompt: str = 'thread_summary') -> str:
         """Generate summary using OpenAI API"""
         try:
-            system_prompt, user_prompt = self.format_prompt(main_message, replies)
+            system_prompt, user_prompt = self.format_prompt(main_message, replies, prompt)
             
             logger.info(f"Sending request to OpenAI with model: {self.model}")
 
@@ -32,8 +35,36 @@ class OpenAILLM(LLMInterface):
                 temperature=0.7
             )
             
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                metrics.count_tokens(self.provider, self.model, usage.prompt_tokens, usage.completion_tokens)
             return response.choices[0].message.content
             
         except Exception as e:
             logger.error(f"Error generating summary with OpenAI: {e}")
-            return f"Error generating summary: {str(e)}" 
\ No newline at end of file
+            raise LLMError(f"Error generating summary: {str(e)}") from e
+    
+    def stream_summary(self, main_message: str, replies: str, prompt: str = 'thread_summary'):
+        """Stream the summary from the OpenAI API as it is generated"""
+        system_prompt, user_prompt = self.format_prompt(main_message, replies, prompt)
+        
+        logger.info(f"Streaming request to OpenAI with model: {self.model}")
+        
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=500,
+            temperature=0.7,
+            stream=True,
+            # The last chunk then carries the token usage, with no choices
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            usage = getattr(chunk, "usage", None)
+            if usage is not None:
+                metrics.count_tokens(self.provider, self.model, usage.prompt_tokens, usage.completion_tokens)
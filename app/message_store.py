@@ -0,0 +1,451 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+from . import logger
+
+MESSAGE_STORE_PATH = os.getenv(
+    "MESSAGE_STORE_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'messages.db')
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    channel      TEXT NOT NULL,
+    ts           TEXT NOT NULL,
+    ts_num       REAL NOT NULL,
+    parent_ts    TEXT,
+    latest_reply TEXT,
+    raw          TEXT NOT NULL,
+    PRIMARY KEY (channel, ts)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_channel_ts_num ON messages (channel, ts_num);
+CREATE INDEX IF NOT EXISTS idx_messages_parent ON messages (channel, parent_ts);
+
+CREATE TABLE IF NOT EXISTS sync_ranges (
+    channel TEXT NOT NULL,
+    oldest  REAL NOT NULL,
+    latest  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sync_ranges_channel ON sync_ranges (channel);
+
+CREATE TABLE IF NOT EXISTS event_streams (
+    channel      TEXT PRIMARY KEY,
+    since        REAL NOT NULL,
+    last_message REAL
+);
+
+CREATE TABLE IF NOT EXISTS applied_events (
+    event_id   TEXT PRIMARY KEY,
+    applied_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_applied_events_at ON applied_events (applied_at);
+
+CREATE TABLE IF NOT EXISTS replier_rollups (
+    channel     TEXT NOT NULL,
+    day         TEXT NOT NULL,
+    user        TEXT,
+    discussions INTEGER NOT NULL,
+    responses   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_replier_rollups_channel_day ON replier_rollups (channel, day);
+
+CREATE TABLE IF NOT EXISTS rollup_days (
+    channel TEXT NOT NULL,
+    day     TEXT NOT NULL,
+    PRIMARY KEY (channel, day)
+);
+"""
+
+# Per-replier counts of the threads started in [?, ?): a discussion per
+# thread the user replied to, a response per reply, own threads excluded
+_REPLIER_COUNTS = """
+    SELECT json_extract(r.raw, '$.user'), COUNT(DISTINCT p.ts), COUNT(*)
+    FROM messages p
+    JOIN messages r ON r.channel = p.channel AND r.parent_ts = p.ts
+    WHERE p.channel = ? AND p.parent_ts IS NULL AND p.ts_num >= ? AND p.ts_num < ?
+      AND json_extract(r.raw, '$.user') IS NOT json_extract(p.raw, '$.user')
+    GROUP BY json_extract(r.raw, '$.user')
+"""
+
+# Slack retries an event for a few minutes at most; ids older than this are forgotten
+APPLIED_EVENTS_TTL = 24 * 3600
+# A channel with no message event for this long is crawled again, in case its events stopped
+EVENT_STREAM_STALE_SECONDS = float(os.getenv("MESSAGE_STORE_EVENT_STREAM_STALE_HOURS", "24")) * 3600
+
+# Message subtypes that describe a change to another message
+_EVENT_ONLY_SUBTYPES = {"message_changed", "message_deleted", "message_replied"}
+
+
+class MessageStore:
+    """Local SQLite copy of channel history, keyed by (channel, ts).
+
+    Raw Slack message payloads are kept as-is; formatting stays in
+    ``slack_client``. Top-level messages have ``parent_ts`` NULL, thread
+    replies point at their parent; replies also sent to the channel
+    (``thread_broadcast``) are stored as replies and listed as top-level
+    messages too, the way conversations.history returns them. ``sync_ranges`` records which time
+    windows of each channel have already been crawled from Slack, and
+    ``event_streams`` since when Events API deliveries keep a channel
+    current without crawling, as long as message events keep arriving.
+    ``replier_rollups`` holds per-day replier
+    counts; writes touching a thread drop the rollup of the day it started.
+    """
+
+    def __init__(self, path: str = MESSAGE_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            if "last_message" not in {row[1] for row in conn.execute("PRAGMA table_info(event_streams)")}:
+                # Stores created before event streams could go stale; their streams count as stale
+                conn.execute("ALTER TABLE event_streams ADD COLUMN last_message REAL")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -- writes ---------------------------------------------------------------
+
+    def upsert_messages(self, channel: str, messages: Iterable[dict]):
+        """Insert or refresh top-level messages from conversations_history"""
+        rows = [
+            (channel, msg["ts"], float(msg["ts"]),
+             msg.get("thread_ts") if msg.get("subtype") == "thread_broadcast" else None,
+             msg.get("latest_reply"), json.dumps(msg))
+            for msg in messages
+        ]
+        with self._connection() as conn:
+            conn.executemany(
+                """INSERT INTO messages (channel, ts, ts_num, parent_ts, latest_reply, raw)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (channel, ts) DO UPDATE SET
+                       latest_reply = excluded.latest_reply,
+                       raw = excluded.raw""",
+                rows
+            )
+            self._invalidate_rollups(conn, channel, [ts for _, ts, _, _, latest_reply, _ in rows if latest_reply])
+
+    def replace_thread(self, channel: str, parent_ts: str, replies: Iterable[dict]):
+        """Store the current replies of a thread, dropping ones no longer there"""
+        rows = [
+            (channel, reply["ts"], float(reply["ts"]), parent_ts, json.dumps(reply))
+            for reply in replies if reply.get("ts") != parent_ts
+        ]
+        with self._connection() as conn:
+            self._invalidate_rollups(conn, channel, [parent_ts])
+            conn.execute("DELETE FROM messages WHERE channel = ? AND parent_ts = ?", (channel, parent_ts))
+            conn.executemany(
+                """INSERT INTO messages (channel, ts, ts_num, parent_ts, latest_reply, raw)
+                   VALUES (?, ?, ?, ?, NULL, ?)
+                   ON CONFLICT (channel, ts) DO UPDATE SET
+                       parent_ts = excluded.parent_ts,
+                       raw = excluded.raw""",
+                rows
+            )
+
+    def add_synced_range(self, channel: str, oldest: float, latest: float):
+        """Record [oldest, latest] as crawled, merging overlapping ranges"""
+        with self._connection() as conn:
+            overlapping = conn.execute(
+                "SELECT rowid, oldest, latest FROM sync_ranges WHERE channel = ? AND oldest <= ? AND latest >= ?",
+                (channel, latest, oldest)
+            ).fetchall()
+            for _, range_oldest, range_latest in overlapping:
+                oldest = min(oldest, range_oldest)
+                latest = max(latest, range_latest)
+            conn.executemany("DELETE FROM sync_ranges WHERE rowid = ?", [(row[0],) for row in overlapping])
+            conn.execute("INSERT INTO sync_ranges (channel, oldest, latest) VALUES (?, ?, ?)",
+                         (channel, oldest, latest))
+
+    def apply_event(self, event: dict, event_id: str = None) -> bool:
+        """Apply one Events API event (message, reply, edit, deletion or reaction).
+
+        Events already applied (same ``event_id``) are skipped, so Slack
+        retries are harmless. The first new message or reply of a channel
+        starts its event stream: from then on the channel is kept current by
+        events alone, until no message event arrives for
+        EVENT_STREAM_STALE_SECONDS (see ``events_since``). Reactions and edits
+        never start a stream, since they don't show the message
+        subscription works. Returns False when the event was skipped.
+        """
+        event_type = event.get("type")
+        if event_type == "message":
+            channel = event.get("channel")
+        elif event_type in ("reaction_added", "reaction_removed"):
+            channel = event.get("item", {}).get("channel")
+        else:
+            return False
+        if not channel:
+            return False
+
+        with self._connection() as conn:
+            if event_id:
+                now = time.time()
+                conn.execute("DELETE FROM applied_events WHERE applied_at < ?", (now - APPLIED_EVENTS_TTL,))
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO applied_events (event_id, applied_at) VALUES (?, ?)", (event_id, now)
+                ).rowcount
+                if not inserted:
+                    return False
+
+            if event_type == "message":
+                new_message = self._apply_message_event(conn, channel, event)
+            else:
+                self._apply_reaction_event(conn, channel, event)
+                new_message = False
+
+            if new_message:
+                # A stream that went stale starts over from this event
+                now = time.time()
+                since = float(event.get("event_ts") or event.get("ts") or now)
+                conn.execute(
+                    """INSERT INTO event_streams (channel, since, last_message) VALUES (?, ?, ?)
+                       ON CONFLICT (channel) DO UPDATE SET
+                           since = CASE WHEN last_message IS NULL OR excluded.last_message - last_message > ?
+                                        THEN excluded.since ELSE since END,
+                           last_message = excluded.last_message""",
+                    (channel, since, now, EVENT_STREAM_STALE_SECONDS)
+                )
+        return True
+
+    def _apply_message_event(self, conn, channel, event) -> bool:
+        """Apply a message event; True if it was a new message or reply"""
+        subtype = event.get("subtype")
+        if subtype == "message_changed":
+            message = event["message"]
+            row = conn.execute("SELECT raw FROM messages WHERE channel = ? AND ts = ?",
+                               (channel, message["ts"])).fetchone()
+            if row:
+                # Keep reply and reaction bookkeeping the edit payload may not carry
+                merged = {**json.loads(row[0]), **message}
+                conn.execute("UPDATE messages SET raw = ? WHERE channel = ? AND ts = ?",
+                             (json.dumps(merged), channel, message["ts"]))
+            return False
+        if subtype == "message_deleted":
+            deleted = conn.execute("SELECT parent_ts FROM messages WHERE channel = ? AND ts = ?",
+                                   (channel, event["deleted_ts"])).fetchone()
+            self._invalidate_rollups(conn, channel, [event["deleted_ts"]])
+            conn.execute("DELETE FROM messages WHERE channel = ? AND (ts = ? OR parent_ts = ?)",
+                         (channel, event["deleted_ts"], event["deleted_ts"]))
+            if deleted and deleted[0]:
+                self._update_parent(conn, channel, deleted[0], -1, None)
+            return False
+        if subtype in _EVENT_ONLY_SUBTYPES:
+            return False
+
+        message = {key: value for key, value in event.items() if key not in ("channel", "event_ts", "channel_type")}
+        thread_ts = message.get("thread_ts")
+        if thread_ts and thread_ts != message["ts"]:
+            inserted = conn.execute(
+                """INSERT INTO messages (channel, ts, ts_num, parent_ts, latest_reply, raw)
+                   VALUES (?, ?, ?, ?, NULL, ?)
+                   ON CONFLICT (channel, ts) DO NOTHING""",
+                (channel, message["ts"], float(message["ts"]), thread_ts, json.dumps(message))
+            ).rowcount
+            if inserted:
+                self._update_parent(conn, channel, thread_ts, 1, message["ts"])
+        else:
+            conn.execute(
+                """INSERT INTO messages (channel, ts, ts_num, parent_ts, latest_reply, raw)
+                   VALUES (?, ?, ?, NULL, NULL, ?)
+                   ON CONFLICT (channel, ts) DO NOTHING""",
+                (channel, message["ts"], float(message["ts"]), json.dumps(message))
+            )
+        return True
+
+    def _update_parent(self, conn, channel, parent_ts, delta, reply_ts):
+        """Keep a parent's reply_count and latest_reply in step with its stored replies"""
+        self._invalidate_rollups(conn, channel, [parent_ts])
+        row = conn.execute("SELECT raw FROM messages WHERE channel = ? AND ts = ?", (channel, parent_ts)).fetchone()
+        if not row:
+            return
+        parent = json.loads(row[0])
+        parent.setdefault("thread_ts", parent_ts)
+        parent["reply_count"] = max(0, parent.get("reply_count", 0) + delta)
+        if reply_ts and float(reply_ts) > float(parent.get("latest_reply") or 0):
+            parent["latest_reply"] = reply_ts
+        conn.execute("UPDATE messages SET raw = ?, latest_reply = ? WHERE channel = ? AND ts = ?",
+                     (json.dumps(parent), parent.get("latest_reply"), channel, parent_ts))
+
+    def _apply_reaction_event(self, conn, channel, event):
+        ts = event["item"].get("ts")
+        row = conn.execute("SELECT raw FROM messages WHERE channel = ? AND ts = ?", (channel, ts)).fetchone()
+        if not row:
+            return
+        message = json.loads(row[0])
+        reactions = message.setdefault("reactions", [])
+        reaction = next((r for r in reactions if r["name"] == event["reaction"]), None)
+        if event["type"] == "reaction_added":
+            if reaction is None:
+                reaction = {"name": event["reaction"], "users": [], "count": 0}
+                reactions.append(reaction)
+            if event.get("user") not in reaction.setdefault("users", []):
+                reaction["users"].append(event.get("user"))
+                reaction["count"] = reaction.get("count", 0) + 1
+        elif reaction is not None and event.get("user") in reaction.get("users", []):
+            reaction["users"].remove(event.get("user"))
+            reaction["count"] = reaction.get("count", 1) - 1
+            if reaction["count"] <= 0:
+                reactions.remove(reaction)
+        if not reactions:
+            del message["reactions"]
+        conn.execute("UPDATE messages SET raw = ? WHERE channel = ? AND ts = ?", (json.dumps(message), channel, ts))
+
+    # -- replier rollups ------------------------------------------------------
+
+    @staticmethod
+    def _invalidate_rollups(conn, channel, thread_ts_list):
+        """Forget the rollups of the days these threads started on"""
+        if thread_ts_list:
+            conn.executemany(
+                "DELETE FROM rollup_days WHERE channel = ? AND day = date(?, 'unixepoch', 'localtime')",
+                [(channel, float(ts)) for ts in thread_ts_list]
+            )
+
+    def rollup_days(self, channel: str, first_day: str, last_day: str) -> set[str]:
+        """Days (YYYY-MM-DD) between first_day and last_day with a stored rollup"""
+        rows = self._connection().execute(
+            "SELECT day FROM rollup_days WHERE channel = ? AND day BETWEEN ? AND ?",
+            (channel, first_day, last_day)
+        )
+        return {day for day, in rows}
+
+    def materialize_rollup(self, channel: str, day: str, start_ts: float, end_ts: float):
+        """Compute and store the replier counts of the threads started on ``day``.
+
+        Runs as a single write transaction, so a concurrent write to one of
+        the day's threads either lands before (and is counted) or after
+        (and drops the rollup again).
+        """
+        with self._connection() as conn:
+            conn.execute("DELETE FROM replier_rollups WHERE channel = ? AND day = ?", (channel, day))
+            conn.execute(
+                f"""INSERT INTO replier_rollups (channel, day, user, discussions, responses)
+                    SELECT ?, ?, * FROM ({_REPLIER_COUNTS})""",
+                (channel, day, channel, start_ts, end_ts)
+            )
+            conn.execute("INSERT OR IGNORE INTO rollup_days (channel, day) VALUES (?, ?)", (channel, day))
+
+    def sum_rollups(self, channel: str, first_day: str, last_day: str) -> Iterator[tuple[str, int, int]]:
+        """(user, discussions, responses) summed over the stored rollups of a day range"""
+        return self._connection().execute(
+            """SELECT user, SUM(discussions), SUM(responses) FROM replier_rollups
+               WHERE channel = ? AND day BETWEEN ? AND ?
+               GROUP BY user""",
+            (channel, first_day, last_day)
+        )
+
+    def replier_counts(self, channel: str, start_ts: float, end_ts: float) -> Iterator[tuple[str, int, int]]:
+        """(user, discussions, responses) computed from the threads started in [start_ts, end_ts)"""
+        return self._connection().execute(_REPLIER_COUNTS, (channel, start_ts, end_ts))
+
+    # -- reads ----------------------------------------------------------------
+
+    def events_since(self, channel: str) -> Optional[float]:
+        """Start of the channel's event stream, None if it has none or it went stale"""
+        row = self._connection().execute(
+            "SELECT since, last_message FROM event_streams WHERE channel = ?", (channel,)
+        ).fetchone()
+        if not row or row[1] is None or time.time() - row[1] > EVENT_STREAM_STALE_SECONDS:
+            return None
+        return row[0]
+
+    def missing_ranges(self, channel: str, oldest: float, latest: float) -> list[tuple[float, float]]:
+        """Sub-ranges of [oldest, latest] that were never crawled"""
+        covered = self._connection().execute(
+            "SELECT oldest, latest FROM sync_ranges WHERE channel = ? AND oldest <= ? AND latest >= ? ORDER BY oldest",
+            (channel, latest, oldest)
+        ).fetchall()
+        gaps = []
+        cursor = oldest
+        for range_oldest, range_latest in covered:
+            if range_oldest > cursor:
+                gaps.append((cursor, range_oldest))
+            cursor = max(cursor, range_latest)
+        if cursor < latest:
+            gaps.append((cursor, latest))
+        return gaps
+
+    def latest_replies(self, channel: str, ts_list: list[str]) -> dict[str, Optional[str]]:
+        """Stored ``latest_reply`` of the given top-level messages"""
+        if not ts_list:
+            return {}
+        placeholders = ",".join("?" * len(ts_list))
+        rows = self._connection().execute(
+            f"SELECT ts, latest_reply FROM messages WHERE channel = ? AND ts IN ({placeholders})",
+            [channel, *ts_list]
+        ).fetchall()
+        return dict(rows)
+
+    def get_replies(self, channel: str, parent_ts_list: list[str]) -> dict[str, list[dict]]:
+        """Stored replies of the given threads, oldest first"""
+        if not parent_ts_list:
+            return {}
+        placeholders = ",".join("?" * len(parent_ts_list))
+        replies = {}
+        for parent_ts, raw in self._connection().execute(
+            f"""SELECT parent_ts, raw FROM messages
+                WHERE channel = ? AND parent_ts IN ({placeholders})
+                ORDER BY ts_num""",
+            [channel, *parent_ts_list]
+        ):
+            replies.setdefault(parent_ts, []).append(json.loads(raw))
+        return replies
+
+    def iter_pages(self, channel: str, oldest: float, latest: float,
+                   page_size: int = 100) -> Iterator[list[tuple[dict, list[dict]]]]:
+        """Lazily yield pages of top-level messages in range, newest first, with their replies"""
+        conn = self._connection()
+        before = float("inf")
+        while True:
+            rows = conn.execute(
+                """SELECT ts, ts_num, raw FROM messages
+                   WHERE channel = ? AND ts_num BETWEEN ? AND ? AND ts_num < ?
+                     AND (parent_ts IS NULL OR json_extract(raw, '$.subtype') = 'thread_broadcast')
+                   ORDER BY ts_num DESC LIMIT ?""",
+                (channel, oldest, latest, before, page_size)
+            ).fetchall()
+            if not rows:
+                return
+            replies = self.get_replies(channel, [ts for ts, _, _ in rows])
+            yield [(json.loads(raw), replies.get(ts, [])) for ts, _, raw in rows]
+            before = rows[-1][1]
+
+    def get_messages(self, channel: str, oldest: float, latest: float) -> list[tuple[dict, list[dict]]]:
+        """Top-level messages in range, newest first, each with its replies"""
+        return [item for page in self.iter_pages(channel, oldest, latest) for item in page]
+
+    def thread_parents(self, channel: str, oldest: float, latest: float) -> list[str]:
+        """ts of the top-level messages in range that have replies, oldest first"""
+        rows = self._connection().execute(
+            """SELECT p.ts FROM messages p
+               WHERE p.channel = ? AND p.parent_ts IS NULL AND p.ts_num BETWEEN ? AND ?
+                 AND EXISTS (SELECT 1 FROM messages r WHERE r.channel = p.channel AND r.parent_ts = p.ts)
+               ORDER BY p.ts_num""",
+            (channel, oldest, latest)
+        )
+        return [ts for ts, in rows]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_message_store(path: str = None) -> MessageStore:
+    """Process-wide store for ``path`` (defaults to MESSAGE_STORE_PATH)"""
+    path = path or MESSAGE_STORE_PATH
+    with _stores_lock:
+        if path not in _stores:
+            logger.info(f"Opening message store at {path}")
+            _stores[path] = MessageStore(path)
+        return _stores[path]
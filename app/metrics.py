@@ -0,0 +1,119 @@
+import os
+import time
+
+from celery import current_task
+from celery.signals import (
+    before_task_publish, task_postrun, task_prerun, task_retry, worker_init, worker_process_shutdown
+)
+
+import prometheus_client
+from prometheus_client import Counter, Histogram, multiprocess
+
+from . import logger
+
+# Port every Celery worker serves /metrics on; unset, workers serve none
+WORKER_METRICS_PORT = os.getenv("WORKER_METRICS_PORT")
+# Set for prefork workers so the metrics of every child process are added up
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+SLACK_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LLM_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TASK_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600, 14400)
+
+SLACK_API_SECONDS = Histogram(
+    "slack_reports_slack_api_seconds", "Slack Web API call latency", ["method", "outcome"], buckets=SLACK_BUCKETS)
+SLACK_API_RATELIMITED = Counter(
+    "slack_reports_slack_api_ratelimited_total", "Slack calls answered with ratelimited", ["method"])
+SLACK_API_RETRIES = Counter(
+    "slack_reports_slack_api_retries_total", "Slack calls retried after being rate limited", ["method"])
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "slack_reports_rate_limit_wait_seconds", "Time spent waiting on the shared token buckets", ["key"],
+    buckets=SLACK_BUCKETS)
+PAGES_FETCHED = Counter(
+    "slack_reports_pages_fetched_total", "History pages read, from Slack or the message store", ["task", "source"])
+MESSAGES_FETCHED = Counter(
+    "slack_reports_messages_fetched_total", "Top-level messages read, from Slack or the message store",
+    ["task", "source"])
+LLM_SECONDS = Histogram(
+    "slack_reports_llm_seconds", "LLM generation latency, streamed or not", ["provider", "model", "prompt"],
+    buckets=LLM_BUCKETS)
+LLM_TOKENS = Counter(
+    "slack_reports_llm_tokens_total", "LLM tokens reported by the provider", ["provider", "model", "kind"])
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "slack_reports_task_queue_wait_seconds", "Time from publishing a task to a worker starting it",
+    ["task", "queue"], buckets=TASK_BUCKETS)
+TASK_RUN_SECONDS = Histogram(
+    "slack_reports_task_run_seconds", "Task run time on the worker", ["task", "state"], buckets=TASK_BUCKETS)
+TASK_RETRIES = Counter("slack_reports_task_retries_total", "Task retries", ["task"])
+
+
+def task_name() -> str:
+    """Name of the task running in this thread ("none" outside tasks), for per-task labels"""
+    task = current_task._get_current_object()
+    return getattr(task, "name", None) or "none"
+
+
+def count_tokens(provider: str, model: str, prompt_tokens, completion_tokens):
+    """Add the token usage a provider reported; missing counts are skipped"""
+    for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+        if isinstance(tokens, int) and tokens > 0:
+            LLM_TOKENS.labels(provider=provider, model=model, kind=kind).inc(tokens)
+
+
+def registry():
+    """The registry to expose: every worker child's metrics in multiprocess mode"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        collected = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return collected
+    return prometheus_client.REGISTRY
+
+
+def render() -> tuple[bytes, str]:
+    """(body, content type) of a scrape"""
+    return prometheus_client.generate_latest(registry()), prometheus_client.CONTENT_TYPE_LATEST
+
+
+# Queue wait is measured from a timestamp stamped on every published task
+_started = {}
+
+
+@before_task_publish.connect
+def _stamp_sent_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("sent_at", time.time())
+
+
+@task_prerun.connect
+def _task_started(task_id=None, task=None, **kwargs):
+    _started[task_id] = time.monotonic()
+    sent_at = getattr(task.request, "sent_at", None)
+    if sent_at:
+        queue = (task.request.delivery_info or {}).get("routing_key") or "none"
+        TASK_QUEUE_WAIT_SECONDS.labels(task=task.name, queue=queue).observe(max(0.0, time.time() - float(sent_at)))
+
+
+@task_postrun.connect
+def _task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is not None:
+        TASK_RUN_SECONDS.labels(task=task.name, state=state or "none").observe(time.monotonic() - started)
+
+
+@task_retry.connect
+def _task_retried(sender=None, **kwargs):
+    TASK_RETRIES.labels(task=getattr(sender, "name", "none")).inc()
+
+
+@worker_init.connect
+def _serve_worker_metrics(**kwargs):
+    if not WORKER_METRICS_PORT:
+        return
+    prometheus_client.start_http_server(int(WORKER_METRICS_PORT), registry=registry())
+    logger.info(f"Serving worker metrics on port {WORKER_METRICS_PORT}")
+
+
+@worker_process_shutdown.connect
+def _forget_worker_process(pid=None, **kwargs):
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,153 @@
+import os
+import shutil
+from datetime import datetime, timezone
+from itertools import count as count_up, islice
+from typing import Iterable
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from . import artifacts
+
+BATCH_SIZE = 10000
+
+
+def _dictionary():
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def _schemas():
+    timestamp = pa.timestamp("us", tz="UTC")
+    return {
+        "messages": pa.schema([
+            ("channel", pa.string()),
+            ("day", pa.string()),
+            ("post_id", pa.string()),
+            ("ts", timestamp),
+            ("author", _dictionary()),
+            ("fullname", _dictionary()),
+            ("message", pa.string()),
+            ("subtype", _dictionary()),
+            ("url", pa.string()),
+            ("reply_count", pa.int32()),
+            ("reaction_count", pa.int32()),
+        ]),
+        "replies": pa.schema([
+            ("channel", pa.string()),
+            ("day", pa.string()),
+            ("parent_post_id", pa.string()),
+            ("post_id", pa.string()),
+            ("ts", timestamp),
+            ("author", _dictionary()),
+            ("fullname", _dictionary()),
+            ("message", pa.string()),
+            ("url", pa.string()),
+        ]),
+        "reactions": pa.schema([
+            ("channel", pa.string()),
+            ("day", pa.string()),
+            ("post_id", pa.string()),
+            ("reaction", _dictionary()),
+            ("count", pa.int32()),
+        ]),
+    }
+
+
+def _utc_day(post_id: str) -> str:
+    """UTC day of a Slack ts; ``date`` is in the worker's local time, so it can't be the partition"""
+    return datetime.fromtimestamp(float(post_id), timezone.utc).strftime("%Y-%m-%d")
+
+
+def _rows(channel: str, messages: Iterable[dict]):
+    """Split formatted messages into rows of the three tables"""
+    for msg in messages:
+        day = _utc_day(msg["post_id"])
+        ts = int(float(msg["post_id"]) * 1_000_000)
+        reactions = msg.get("reactions") or {}
+        replies = msg.get("replies") or []
+        message_row = {
+            "channel": channel, "day": day, "post_id": msg["post_id"], "ts": ts,
+            "author": msg.get("author"), "fullname": msg.get("fullname"), "message": msg.get("message"),
+            "subtype": msg.get("subtype"), "url": msg.get("url"),
+            "reply_count": len(replies), "reaction_count": sum(reactions.values()),
+        }
+        reply_rows = [
+            {
+                "channel": channel, "day": _utc_day(reply["post_id"]), "parent_post_id": msg["post_id"],
+                "post_id": reply["post_id"], "ts": int(float(reply["post_id"]) * 1_000_000),
+                "author": reply.get("author"), "fullname": reply.get("fullname"),
+                "message": reply.get("message"), "url": reply.get("url"),
+            }
+            for reply in replies
+        ]
+        reaction_rows = [
+            {"channel": channel, "day": day, "post_id": msg["post_id"], "reaction": name, "count": count}
+            for name, count in reactions.items()
+        ]
+        yield message_row, reply_rows, reaction_rows
+
+
+def write_parquet(artifact_id: str, channel: str, messages: Iterable[dict], part: str = "0") -> int:
+    """Write formatted messages as three Parquet tables partitioned by channel and day.
+
+    Produces ``<ARTIFACTS_DIR>/<artifact_id>.parquet/{messages,replies,reactions}/
+    channel=<id>/day=<YYYY-MM-DD>/part-<part>-<n>.parquet``, ``day`` being the
+    UTC day of the message (or reply) ts like the ``ts`` column. Author, name,
+    subtype and reaction columns are dictionary-encoded. Messages are
+    consumed in batches of BATCH_SIZE, so memory stays bounded. Several
+    writers can add to the same artifact as long as ``part`` differs.
+    Returns the number of messages written.
+    """
+    root = artifacts.artifact_path(artifact_id, ".parquet")
+    schemas = _schemas()
+    partitioning = ds.partitioning(pa.schema([("channel", pa.string()), ("day", pa.string())]), flavor="hive")
+    count = 0
+    rows = _rows(channel, messages)
+    for batch_no in count_up():
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        count += len(batch)
+        tables = {
+            "messages": [message_row for message_row, _, _ in batch],
+            "replies": [row for _, reply_rows, _ in batch for row in reply_rows],
+            "reactions": [row for _, _, reaction_rows in batch for row in reaction_rows],
+        }
+        for name, table_rows in tables.items():
+            if not table_rows:
+                continue
+            table = pa.Table.from_pylist(table_rows, schema=schemas[name])
+            ds.write_dataset(
+                table,
+                os.path.join(root, name),
+                format="parquet",
+                partitioning=partitioning,
+                basename_template=f"part-{part}-{batch_no}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+    os.makedirs(root, exist_ok=True)
+    return count
+
+
+def delete_channel(artifact_id: str, channel: str):
+    """Drop every partition of ``channel`` from the three tables of an artifact"""
+    root = artifacts.artifact_path(artifact_id, ".parquet")
+    for table in ("messages", "replies", "reactions"):
+        shutil.rmtree(os.path.join(root, table, f"channel={channel}"), ignore_errors=True)
+
+
+def delete(artifact_id: str):
+    """Drop a whole Parquet artifact"""
+    shutil.rmtree(artifacts.artifact_path(artifact_id, ".parquet"), ignore_errors=True)
+
+
+def list_files(artifact_id: str) -> list[str]:
+    """Relative paths of the Parquet files in an artifact"""
+    root = artifacts.artifact_path(artifact_id, ".parquet")
+    if not os.path.isdir(root):
+        raise artifacts.ArtifactNotFound(artifact_id)
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            files.append(os.path.relpath(os.path.join(dirpath, filename), root))
+    return sorted(files)
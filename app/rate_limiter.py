@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from typing import Optional
+
+import redis
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from . import logger, metrics
+
+# Calls per minute Slack allows per method and workspace for each tier
+SLACK_TIER_LIMITS = {
+    tier: int(os.getenv(f"SLACK_TIER{tier}_PER_MINUTE", str(default)))
+    for tier, default in {1: 1, 2: 20, 3: 50, 4: 100}.items()
+}
+# Tier of every method the app calls; unknown methods are treated as tier 3
+SLACK_METHOD_TIERS = {
+    "conversations.history": 3,
+    "conversations.replies": 3,
+    "conversations.list": 2,
+    "conversations.info": 3,
+    "users.list": 2,
+    "users.info": 4,
+    "users.profile.get": 4,
+}
+# Requests per minute each LLM provider gets from all the workers together
+LLM_RATE_LIMITS = {
+    provider: int(os.getenv(f"LLM_{provider.upper()}_PER_MINUTE", str(default)))
+    for provider, default in {"openai": 500, "ollama": 60}.items()
+}
+# Seconds worth of calls a bucket can save up and spend in one burst
+SLACK_RATE_LIMIT_BURST_SECONDS = float(os.getenv("SLACK_RATE_LIMIT_BURST_SECONDS", "5"))
+# Give up on a call after being rate limited for this long in total
+SLACK_RATE_LIMIT_MAX_WAIT = float(os.getenv("SLACK_RATE_LIMIT_MAX_WAIT", "300"))
+
+REDIS_PREFIX = "slack-reports:ratelimit:"
+
+# Reserve one token, letting the bucket go negative: the caller sleeps until
+# its token is due. Nothing is reserved while the method is blocked.
+_RESERVE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'blocked')
+local blocked = tonumber(state[3]) or 0
+if blocked > now then
+  return {tostring(blocked - now), 0}
+end
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 3600)
+local wait = 0
+if tokens < 0 then
+  wait = -tokens / rate
+end
+return {tostring(wait), 1}
+"""
+
+# Pause a method until now + ARGV[1] and restart its bucket empty from there
+_BLOCK_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local resume_at = now + tonumber(ARGV[1])
+local blocked = tonumber(redis.call('HGET', KEYS[1], 'blocked')) or 0
+if resume_at > blocked then
+  redis.call('HSET', KEYS[1], 'blocked', tostring(resume_at), 'tokens', '0', 'ts', tostring(resume_at))
+end
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[1])) + 3600)
+"""
+
+
+def tier_rate(tier: int) -> tuple[float, float]:
+    """(calls per second, burst capacity) of a Slack tier"""
+    per_second = SLACK_TIER_LIMITS[tier] / 60
+    return per_second, max(1.0, per_second * SLACK_RATE_LIMIT_BURST_SECONDS)
+
+
+def llm_rate(provider: str) -> tuple[float, float]:
+    """(requests per second, burst capacity) of an LLM provider"""
+    per_second = LLM_RATE_LIMITS[provider] / 60
+    return per_second, max(1.0, per_second * SLACK_RATE_LIMIT_BURST_SECONDS)
+
+
+def retry_after_seconds(e: SlackApiError) -> float:
+    """Retry-After Slack sent with a rate limited response (1s if missing)"""
+    headers = getattr(e.response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After") or headers.get("retry-after") or 1)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class SlackRateLimiter:
+    """Token bucket per Slack API method, refilled at the rate of the method's tier.
+
+    With a Redis client the buckets are shared by every worker, so adding
+    workers spreads the same budget instead of multiplying 429s; without
+    one they are local to the process. ``block`` pauses a method for
+    everyone when Slack answers with ``Retry-After``.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, rates: dict = None,
+                 default_rate: tuple = None, max_wait: float = SLACK_RATE_LIMIT_MAX_WAIT):
+        self.redis = redis_client
+        self.rates = rates if rates is not None else {
+            method: tier_rate(tier) for method, tier in SLACK_METHOD_TIERS.items()
+        }
+        self.default_rate = default_rate or tier_rate(3)
+        self.max_wait = max_wait
+        self._buckets = {}  # method -> [tokens, updated_at, blocked_until]
+        self._lock = threading.Lock()
+        if redis_client is not None:
+            self._reserve_script = redis_client.register_script(_RESERVE_SCRIPT)
+            self._block_script = redis_client.register_script(_BLOCK_SCRIPT)
+
+    def acquire(self, method: str):
+        """Block until ``method`` may be called once more"""
+        waited = 0.0
+        while True:
+            wait, reserved = self._reserve(method)
+            if wait > 0:
+                time.sleep(wait)
+                waited += wait
+            if reserved:
+                metrics.RATE_LIMIT_WAIT_SECONDS.labels(key=method).observe(waited)
+                return
+
+    def block(self, method: str, seconds: float):
+        """Stop every caller of ``method`` for ``seconds``"""
+        if self.redis is not None:
+            self._block_script(keys=[REDIS_PREFIX + method], args=[seconds])
+            return
+        with self._lock:
+            resume_at = time.monotonic() + seconds
+            bucket = self._buckets.get(method)
+            if bucket is None or resume_at > bucket[2]:
+                self._buckets[method] = [0.0, resume_at, resume_at]
+
+    def _reserve(self, method):
+        rate, capacity = self.rates.get(method, self.default_rate)
+        if self.redis is not None:
+            wait, reserved = self._reserve_script(keys=[REDIS_PREFIX + method], args=[rate, capacity])
+            return float(wait), bool(int(reserved))
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(method, [capacity, now, 0.0])
+            if bucket[2] > now:
+                return bucket[2] - now, False
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate) - 1
+            bucket[0], bucket[1] = tokens, now
+        return (-tokens / rate if tokens < 0 else 0.0), True
+
+
+class RateLimitedWebClient(WebClient):
+    """WebClient whose every API call goes through a SlackRateLimiter.
+
+    Rate limited calls pause their method for the ``Retry-After`` Slack
+    sent and are retried, until the limiter's ``max_wait`` is used up.
+    """
+
+    def __init__(self, *args, limiter: SlackRateLimiter = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter or SlackRateLimiter()
+
+    def api_call(self, api_method: str, **kwargs):
+        waited = 0.0
+        while True:
+            self.limiter.acquire(api_method)
+            started = time.monotonic()
+            try:
+                response = super().api_call(api_method, **kwargs)
+                metrics.SLACK_API_SECONDS.labels(method=api_method, outcome="ok").observe(time.monotonic() - started)
+                return response
+            except SlackApiError as e:
+                rate_limited = e.response.get("error") == "ratelimited"
+                metrics.SLACK_API_SECONDS.labels(
+                    method=api_method, outcome="ratelimited" if rate_limited else "error"
+                ).observe(time.monotonic() - started)
+                if not rate_limited:
+                    raise
+                metrics.SLACK_API_RATELIMITED.labels(method=api_method).inc()
+                retry_after = retry_after_seconds(e)
+                waited += retry_after
+                if waited > self.limiter.max_wait:
+                    logger.error(f"Giving up on {api_method} after {waited:.0f}s rate limited")
+                    raise
+                logger.info(f"{api_method} rate limited, pausing it for {retry_after}s")
+                self.limiter.block(api_method, retry_after)
+                metrics.SLACK_API_RETRIES.labels(method=api_method).inc()
+
+
+_limiter = None
+_llm_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> SlackRateLimiter:
+    """Process-wide limiter, shared through Redis when ``result_backend`` is set"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            redis_url = os.getenv("result_backend")
+            _limiter = SlackRateLimiter(redis.Redis.from_url(redis_url) if redis_url else None)
+        return _limiter
+
+
+def get_llm_rate_limiter() -> SlackRateLimiter:
+    """Process-wide token buckets per LLM provider (keyed ``llm:<provider>``), shared through Redis"""
+    global _llm_limiter
+    with _limiter_lock:
+        if _llm_limiter is None:
+            redis_url = os.getenv("result_backend")
+            _llm_limiter = SlackRateLimiter(
+                redis.Redis.from_url(redis_url) if redis_url else None,
+                rates={f"llm:{provider}": llm_rate(provider) for provider in LLM_RATE_LIMITS},
+                default_rate=llm_rate("ollama")
+            )
+        return _llm_limiter
@@ -0,0 +1,139 @@
+import os
+from collections.abc import Mapping
+from datetime import datetime
+from typing import IO, Iterable, Iterator
+
+import msgpack
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+SLACK_HOME = os.getenv("SLACK_HOME")
+
+
+def message_url(channel: str, ts: str) -> str:
+    return f"{SLACK_HOME}/archives/{channel}/p{ts[:10]}.{ts[-6:]}"
+
+
+def message_date(ts: str) -> str:
+    return datetime.fromtimestamp(float(ts)).isoformat()
+
+
+class ReplyRecord(Mapping):
+    """A formatted thread reply, read like the dict reports used to build.
+
+    Only what comes from Slack is stored, in slots; ``url`` and ``date``
+    are derived from the channel and ts when read. ``to_dict`` gives the
+    plain dict for JSON output.
+    """
+
+    __slots__ = ("channel", "post_id", "author", "fullname", "message")
+    KEYS = ("author", "fullname", "message", "post_id", "url", "date")
+
+    def __init__(self, channel, post_id, author=None, fullname=None, message=None):
+        self.channel = channel
+        self.post_id = post_id
+        self.author = author
+        self.fullname = fullname
+        self.message = message
+
+    @classmethod
+    def from_slack(cls, channel: str, reply: dict, users: dict = None, default_text=None) -> "ReplyRecord":
+        return cls(channel, reply.get("ts"), reply.get("user"), _fullname(users, reply.get("user")),
+                   reply.get("text", default_text))
+
+    @property
+    def url(self) -> str:
+        return message_url(self.channel, self.post_id)
+
+    @property
+    def date(self) -> str:
+        return message_date(self.post_id)
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.channel!r}, {self.post_id!r})"
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.KEYS}
+
+    def to_row(self) -> list:
+        return [self.channel, self.post_id, self.author, self.fullname, self.message]
+
+
+class MessageRecord(ReplyRecord):
+    """A formatted top-level message with its replies, see ``ReplyRecord``"""
+
+    __slots__ = ("subtype", "_reactions", "replies")
+    KEYS = ("author", "fullname", "message", "post_id", "url", "date", "reactions", "replies", "subtype")
+
+    def __init__(self, channel, post_id, author=None, fullname=None, message=None, subtype=None,
+                 reactions=None, replies=None):
+        super().__init__(channel, post_id, author, fullname, message)
+        self.subtype = subtype
+        self._reactions = reactions or None  # most messages have none; no empty dict per message
+        self.replies = replies if replies is not None else []
+
+    @classmethod
+    def from_slack(cls, channel: str, msg: dict, users: dict = None, default_text=None,
+                   replies: list = None) -> "MessageRecord":
+        return cls(
+            channel, msg.get("ts"), msg.get("user"), _fullname(users, msg.get("user")), msg.get("text", default_text),
+            msg.get("subtype"), {r["name"]: r["count"] for r in msg.get("reactions", [])}, replies
+        )
+
+    @property
+    def reactions(self) -> dict:
+        return dict(self._reactions) if self._reactions else {}
+
+    def to_dict(self) -> dict:
+        formatted = super().to_dict()
+        formatted["replies"] = [reply.to_dict() for reply in self.replies]
+        return formatted
+
+    def to_row(self) -> list:
+        return super().to_row() + [self.subtype, self._reactions, [reply.to_row()[1:] for reply in self.replies]]
+
+    @classmethod
+    def from_row(cls, row) -> "MessageRecord":
+        channel, post_id, author, fullname, message, subtype, reactions, replies = row
+        return cls(channel, post_id, author, fullname, message, subtype, reactions,
+                   [ReplyRecord(channel, *reply) for reply in replies])
+
+
+def _fullname(users, user_id):
+    info = (users or {}).get(user_id)
+    return info.get("fullname") if info else None
+
+
+def jsonable(obj):
+    """``default`` hook for json.dumps: records are written as their plain dicts"""
+    if isinstance(obj, ReplyRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def write_records(out: IO[bytes], records: Iterable[MessageRecord]) -> int:
+    """Write records as a msgpack stream of key-less rows and return how many were written"""
+    count = 0
+    packer = msgpack.Packer()
+    for record in records:
+        out.write(packer.pack(record.to_row()))
+        count += 1
+    return count
+
+
+def read_records(source: IO[bytes]) -> Iterator[MessageRecord]:
+    """Records written by ``write_records``, streamed"""
+    for row in msgpack.Unpacker(source, use_list=True, raw=False):
+        yield MessageRecord.from_row(row)
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import redis
+
+# Seconds a finished report is handed to identical requests instead of crawling again
+REQUEST_RESULT_FRESHNESS = int(os.getenv("REQUEST_RESULT_FRESHNESS", "300"))
+# Max seconds a request key points at its task; bounds coalescing onto a lost task
+REQUEST_DEDUP_TTL = int(os.getenv("REQUEST_DEDUP_TTL", "3600"))
+# Seconds a request waits for the task id of an identical request being enqueued
+REQUEST_DEDUP_CLAIM_WAIT = float(os.getenv("REQUEST_DEDUP_CLAIM_WAIT", "5"))
+# Seconds a PENDING task is still coalesced onto; Celery also answers PENDING for lost task ids
+REQUEST_DEDUP_PENDING_GRACE = float(os.getenv("REQUEST_DEDUP_PENDING_GRACE", "60"))
+
+REDIS_PREFIX = "slack-reports:request:"
+CLAIM_PREFIX = "claim:"
+
+# States of a task a worker has picked up and not finished yet
+IN_FLIGHT_STATES = {"RECEIVED", "STARTED", "PROGRESS", "RETRY"}
+
+CREATED = "created"
+COALESCED = "coalesced"
+REUSED = "reused"
+
+
+def request_key(endpoint: str, params: dict) -> str:
+    """Idempotency key of a report request: the endpoint and its normalized parameters"""
+    return hashlib.sha256(
+        json.dumps([endpoint, params], sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+class RequestDeduplicator:
+    """Maps request keys to the Celery task serving them.
+
+    A request identical to one still running gets the running task's id,
+    and one arriving within ``freshness`` seconds of a successful run gets
+    the finished task's id; anything else enqueues a new task. A task
+    still PENDING is only coalesced onto for ``pending_grace`` seconds
+    after it was enqueued, since Celery reports unknown (e.g. lost) task
+    ids as PENDING too. With a Redis client the map is shared by every API
+    process: a request claims its key with ``SET NX`` before enqueueing,
+    and identical requests wait for the claimed task id instead of
+    enqueueing their own.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, freshness: int = REQUEST_RESULT_FRESHNESS,
+                 ttl: int = REQUEST_DEDUP_TTL, claim_wait: float = REQUEST_DEDUP_CLAIM_WAIT,
+                 pending_grace: float = REQUEST_DEDUP_PENDING_GRACE):
+        self.redis = redis_client
+        self.freshness = freshness
+        self.ttl = ttl
+        self.claim_wait = claim_wait
+        self.pending_grace = pending_grace
+        self._tasks = {}  # key -> (expires_at, task_id, enqueued_at)
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, task, launch: Callable) -> tuple[str, str]:
+        """(task id, CREATED / COALESCED / REUSED) serving the request ``key``.
+
+        ``launch`` enqueues ``task`` for the request and returns its AsyncResult.
+        """
+        if self.redis is None:
+            with self._lock:
+                entry = self._tasks.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    reuse = self._reuse(task, entry[1], entry[2])
+                    if reuse:
+                        return entry[1], reuse
+                task_id = launch().id
+                self._tasks[key] = (time.monotonic() + self.ttl, task_id, time.time())
+                return task_id, CREATED
+
+        redis_key = REDIS_PREFIX + key
+        deadline = time.monotonic() + self.claim_wait
+        while True:
+            current = self.redis.get(redis_key)
+            current = current.decode() if isinstance(current, bytes) else current
+            if current is not None and current.startswith(CLAIM_PREFIX) and time.monotonic() < deadline:
+                # An identical request is enqueueing its task right now
+                time.sleep(0.05)
+                continue
+            if current is not None and not current.startswith(CLAIM_PREFIX):
+                # "<task id> <enqueued at>"
+                task_id, _, enqueued_at = current.partition(" ")
+                reuse = self._reuse(task, task_id, float(enqueued_at or 0))
+                if reuse:
+                    return task_id, reuse
+            claim = CLAIM_PREFIX + uuid.uuid4().hex
+            if self._claim(redis_key, current, claim):
+                break
+
+        try:
+            task_id = launch().id
+        except Exception:
+            self.redis.delete(redis_key)
+            raise
+        self.redis.set(redis_key, f"{task_id} {time.time():.3f}", ex=self.ttl)
+        return task_id, CREATED
+
+    def _claim(self, redis_key, current, claim) -> bool:
+        """Point the key at our claim, unless another request changed it since we read it"""
+        if current is None:
+            return bool(self.redis.set(redis_key, claim, nx=True, ex=self.ttl))
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(redis_key)
+                value = pipe.get(redis_key)
+                if (value.decode() if isinstance(value, bytes) else value) != current:
+                    return False
+                pipe.multi()
+                pipe.set(redis_key, claim, ex=self.ttl)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def _reuse(self, task, task_id, enqueued_at: float) -> Optional[str]:
+        """COALESCED if the task is still running, REUSED if it succeeded recently"""
+        result = task.AsyncResult(task_id)
+        try:
+            state = result.state
+            if state in IN_FLIGHT_STATES:
+                return COALESCED
+            if state == "PENDING":
+                return COALESCED if time.time() - enqueued_at <= self.pending_grace else None
+            if state != "SUCCESS":
+                return None
+            if isinstance(result.result, dict) and "error" in result.result:
+                return None
+            date_done = result.date_done
+        except NotImplementedError:  # no result backend to ask
+            return None
+        if date_done is None:
+            return None
+        if date_done.tzinfo is None:
+            date_done = date_done.replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - date_done).total_seconds() <= self.freshness:
+            return REUSED
+        return None
+
+
+_deduplicator = None
+_deduplicator_lock = threading.Lock()
+
+
+def get_request_deduplicator() -> RequestDeduplicator:
+    """Process-wide deduplicator, shared through Redis when ``result_backend`` is set"""
+    global _deduplicator
+    with _deduplicator_lock:
+        if _deduplicator is None:
+            redis_url = os.getenv("result_backend")
+            _deduplicator = RequestDeduplicator(redis.Redis.from_url(redis_url) if redis_url else None)
+        return _deduplicator
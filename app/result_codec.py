@@ -0,0 +1,116 @@
+import json
+import zlib
+
+import msgpack
+from kombu.serialization import register
+
+from .records import jsonable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None
+
+CODEC_NAME = "slack-results"
+CONTENT_TYPE = "application/x-slack-results"
+
+SERIALIZERS = ("json", "orjson", "msgpack")
+COMPRESSIONS = ("none", "zlib", "zstd", "lz4")
+
+# First byte of every payload: how the rest is compressed, so results
+# written under another setting can still be read
+_HEADERS = {"none": b"\x00", "zlib": b"\x01", "zstd": b"\x02", "lz4": b"\x03"}
+
+
+def _require(module, name):
+    if module is None:
+        raise RuntimeError(f"The {name} result codec needs the '{name}' package installed")
+    return module
+
+
+def _serializer(name):
+    """(dumps -> bytes, loads) of a serializer"""
+    if name == "json":
+        return (lambda obj: json.dumps(obj, ensure_ascii=False, default=jsonable).encode("utf-8"),
+                lambda data: json.loads(data))
+    if name == "orjson":
+        _require(orjson, "orjson")
+        return lambda obj: orjson.dumps(obj, default=jsonable), orjson.loads
+    if name == "msgpack":
+        return (lambda obj: msgpack.packb(obj, default=jsonable, use_bin_type=True),
+                lambda data: msgpack.unpackb(data, raw=False))
+    raise ValueError(f"Unknown result serializer '{name}', use one of: {', '.join(SERIALIZERS)}")
+
+
+def _compressor(name):
+    if name == "none":
+        return None
+    if name == "zlib":
+        return lambda data: zlib.compress(data, 6)
+    if name == "zstd":
+        compressor = _require(zstandard, "zstandard").ZstdCompressor(level=3)
+        return compressor.compress
+    if name == "lz4":
+        return _require(lz4_frame, "lz4").compress
+    raise ValueError(f"Unknown result compression '{name}', use one of: {', '.join(COMPRESSIONS)}")
+
+
+def _decompress(data: bytes) -> bytes:
+    header, body = data[:1], data[1:]
+    if header == _HEADERS["none"]:
+        return body
+    if header == _HEADERS["zlib"]:
+        return zlib.decompress(body)
+    if header == _HEADERS["zstd"]:
+        return _require(zstandard, "zstandard").ZstdDecompressor().decompress(body)
+    if header == _HEADERS["lz4"]:
+        return _require(lz4_frame, "lz4").decompress(body)
+    raise ValueError("Unknown result payload header")
+
+
+_LEGACY_JSON_STARTS = (b"{", b"[", b'"')
+
+
+def make_codec(serializer: str = "json", compression: str = "none", min_bytes: int = 1024):
+    """(encode, decode) of a result codec.
+
+    Payloads of at least ``min_bytes`` are compressed; smaller ones, like
+    the state and progress of most tasks, are stored as they are since
+    compressing them costs more than it saves.
+    """
+    dumps, loads = _serializer(serializer)
+    compress = _compressor(compression)
+
+    def encode(obj) -> bytes:
+        data = dumps(obj)
+        if compress is not None and len(data) >= min_bytes:
+            return _HEADERS[compression] + compress(data)
+        return _HEADERS["none"] + data
+
+    def decode(data) -> object:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        data = bytes(data)
+        if data[:1] in _LEGACY_JSON_STARTS:
+            # Stored by Celery's default JSON serializer before the codec was enabled
+            return json.loads(data)
+        return loads(_decompress(data))
+
+    return encode, decode
+
+
+def register_result_codec(serializer: str = "json", compression: str = "none", min_bytes: int = 1024) -> str:
+    """Register the codec with kombu under ``CODEC_NAME`` and return that name"""
+    encode, decode = make_codec(serializer, compression, min_bytes)
+    register(CODEC_NAME, encode, decode, content_type=CONTENT_TYPE, content_encoding="binary")
+    return CODEC_NAME
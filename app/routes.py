@@ -1,14 +1,28 @@
-from flask import request, jsonify
+import json
+import os
+from flask import request, jsonify, Response, send_file, send_from_directory, stream_with_context
 from . import app, celery
-from .tasks import fetch_messages_task, calculate_top_repliers_task, summarize_thread_task
+from . import artifacts
+from .tasks import (
+    fetch_messages_task, calculate_top_repliers_task, summarize_thread_task, summarize_threads_task,
+    apply_slack_event_task, EXPORT_FORMATS
+)
+from . import metrics, parquet_export
 from flasgger import swag_from
-from .utils import validate_date_format, validate_dates, validate_top_n, get_channel_id
+from slack_sdk.signature import SignatureVerifier
+from .utils import validate_date_format, validate_dates, validate_top_n
+from .channel_directory import get_channel_directory
+from .request_dedup import get_request_deduplicator, request_key
+from .task_events import stream_task_events, supports_events, task_state
 
 
+SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET")
+
 TASK_MAPPING = {
     'fetch_messages': fetch_messages_task,
     'top_repliers': calculate_top_repliers_task,
-    'summarize_thread': summarize_thread_task
+    'summarize_thread': summarize_thread_task,
+    'summarize_threads': summarize_threads_task
 }
 
 @app.route("/", methods=["GET"])
@@ -27,6 +41,90 @@ TASK_MAPPING = {
 def home():
     return {"message": "API is up and running!"}, 200
 
+def resolve_channel(data):
+    """channel_id as sent, or the ID of ``channel`` (a channel name, #name or ID)"""
+    if data.get("channel_id"):
+        return data["channel_id"]
+    if data.get("channel"):
+        return get_channel_directory().resolve(data["channel"])
+    return None
+
+
+def channel_not_found(data):
+    return jsonify({"error": f"Channel '{data['channel']}' not found"}), 400
+
+
+ALL_CHANNELS = "all"
+
+
+def resolve_channels(data):
+    """IDs of ``channels`` (IDs, names or #names) and the names that did not resolve.
+
+    ``"all"`` stands for every public channel that is not archived.
+    """
+    channels = data["channels"]
+    directory = get_channel_directory()
+    if channels == ALL_CHANNELS:
+        return [
+            info["id"] for info in directory.channels()
+            if not info.get("is_private") and not info.get("is_archived")
+        ], []
+    if not isinstance(channels, list) or not channels:
+        raise ValueError(f"channels must be a non-empty list or '{ALL_CHANNELS}'")
+    channel_ids, unknown = [], []
+    for channel in channels:
+        channel_id = directory.resolve(channel)
+        if channel_id is None:
+            unknown.append(channel)
+        elif channel_id not in channel_ids:
+            channel_ids.append(channel_id)
+    return channel_ids, unknown
+
+
+def resolve_task_channels(data):
+    """Channel argument of a report task: one ID, or a list when ``channels`` is sent.
+
+    Returns (channel, error response).
+    """
+    if "channels" not in data:
+        channel_id = resolve_channel(data)
+        if not channel_id and data.get("channel"):
+            return None, channel_not_found(data)
+        return channel_id, None
+    channel_ids, unknown = resolve_channels(data)
+    if unknown:
+        return None, (jsonify({"error": f"Channels not found: {', '.join(unknown)}"}), 400)
+    return channel_ids, None
+
+
+def submit_report(endpoint, task, channel, *args):
+    """Enqueue a report task, or hand back the task of an identical request.
+
+    Identical means same endpoint and normalized parameters: channel lists
+    are sorted, so the order they were sent in does not matter.
+    """
+    if isinstance(channel, list):
+        channel = sorted(channel)
+    args = (channel, *args)
+    task_id, dedup = get_request_deduplicator().submit(
+        request_key(endpoint, list(args)), task, lambda: task.delay(*args)
+    )
+    return jsonify({"task_id": task_id, "dedup": dedup}), 202
+
+
+DEDUP_DESCRIPTION = ('"dedup" is "created" for a new task, "coalesced" when an identical request is still '
+                     'running and "reused" when one finished within REQUEST_RESULT_FRESHNESS seconds.')
+
+
+CHANNELS_PROPERTY = {
+    'type': 'array',
+    'items': {'type': 'string'},
+    'example': ['general', 'C0123456789'],
+    'description': 'Channel IDs or names to report on together, or the string "all" for every public '
+                   'channel. The task fans out per channel and its result adds a per-channel breakdown.'
+}
+
+
 @app.route("/fetch-messages", methods=["POST"])
 @swag_from({
     'parameters': [
@@ -41,6 +139,12 @@ def home():
                         'type': 'string',
                         'example': 'ABC123'
                     },
+                    'channel': {
+                        'type': 'string',
+                        'example': 'general',
+                        'description': 'Channel name (or #name) to use instead of channel_id'
+                    },
+                    'channels': CHANNELS_PROPERTY,
                     'start_date': {
                         'type': 'string',
                         'example': '2024-01-01'
@@ -48,6 +152,12 @@ def home():
                     'end_date': {
                         'type': 'string',
                         'example': '2024-01-31'
+                    },
+                    'format': {
+                        'type': 'string',
+                        'example': 'ndjson',
+                        'enum': ['ndjson', 'parquet'],
+                        'description': 'Export format of the result artifact (default ndjson)'
                     }
                 }
             }
@@ -55,10 +165,11 @@ def home():
     ],
     'responses': {
         202: {
-            'description': 'Task created successfully.',
+            'description': 'Task created successfully, or the task of an identical request. ' + DEDUP_DESCRIPTION,
             'examples': {
                 'application/json': {
-                    'task_id': 'task_id_1'
+                    'task_id': 'task_id_1',
+                    'dedup': 'created'
                 }
             }
         },
@@ -67,9 +178,12 @@ def home():
 def fetch_messages():
     try:
         data = request.get_json()
-        channel_id = data.get("channel_id")
+        channel_id, error = resolve_task_channels(data)
+        if error:
+            return error
         start_date_str = data.get("start_date")
         end_date_str = data.get("end_date")
+        export_format = data.get("format", "ndjson")
 
         start_date = validate_date_format(start_date_str)
         end_date = validate_date_format(end_date_str)
@@ -81,9 +195,11 @@ def fetch_messages():
         if error_message:
             return jsonify({"error": error_message}), 400
 
-        task = fetch_messages_task.apply_async(args=[channel_id, start_date_str, end_date_str])
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
 
-        return jsonify({"task_id": task.id}), 202
+        return submit_report("fetch-messages", fetch_messages_task, channel_id,
+                             start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"), export_format)
 
     except Exception as e:
             return jsonify({"error": str(e)}), 400
@@ -103,6 +219,12 @@ def fetch_messages():
                         'type': 'string',
                         'example': 'ABC123'
                     },
+                    'channel': {
+                        'type': 'string',
+                        'example': 'general',
+                        'description': 'Channel name (or #name) to use instead of channel_id'
+                    },
+                    'channels': CHANNELS_PROPERTY,
                     'start_date': {
                         'type': 'string',
                         'example': '2024-01-01'
@@ -121,10 +243,11 @@ def fetch_messages():
     ],
     'responses': {
         202: {
-            'description': 'Task created successfully.',
+            'description': 'Task created successfully, or the task of an identical request. ' + DEDUP_DESCRIPTION,
             'examples': {
                 'application/json': {
-                    'task_id': 'task_id_1'
+                    'task_id': 'task_id_1',
+                    'dedup': 'created'
                 }
             }
         },
@@ -134,7 +257,9 @@ def top_repliers():
 
     try:
         data = request.get_json()
-        channel_id = data.get("channel_id")
+        channel_id, error = resolve_task_channels(data)
+        if error:
+            return error
         start_date_str = data.get("start_date")
         end_date_str = data.get("end_date")
         top_n = data.get('top_n')
@@ -151,13 +276,11 @@ def top_repliers():
         top_n = validate_top_n(top_n)
         
         # Lanza la tarea de Celery en segundo plano
-        task = calculate_top_repliers_task.delay(channel_id, start_date_str, end_date_str, top_n)
+        return submit_report("top-repliers", calculate_top_repliers_task, channel_id,
+                             start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"), top_n)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
-    
-    return jsonify({"task_id": task.id}), 202
-
 
 @app.route('/task-status/<task_id>', methods=['GET'])
 @swag_from({
@@ -175,14 +298,23 @@ def top_repliers():
             'required': False,
             'type': 'string',
             'description': 'The name of the task using _'
+        },
+        {
+            'name': 'state_only',
+            'in': 'query',
+            'required': False,
+            'type': 'boolean',
+            'description': 'Return only the state (and error on failure), without the result or progress'
         }
     ],
     'responses': {
         202: {
-            'description': 'Task is still pending or in progress.',
+            'description': 'Task is still pending or in progress. Running tasks include their progress, '
+                           'e.g. the summary generated so far while a summary is being streamed.',
             'examples': {
                 'application/json': {
-                    'status': 'PENDING'
+                    'status': 'PROGRESS',
+                    'progress': {'step': 'Generating summary', 'partial_summary': 'El hilo trata'}
                 }
             }
         },
@@ -214,15 +346,180 @@ def get_task_status(task_id):
     else:
         return jsonify({"status": "FAILURE", "error": "Invalid task_name"}), 400
 
+    if request.args.get('state_only', '').lower() in ('1', 'true', 'yes'):
+        state = task.state
+        status_code = {'SUCCESS': 200, 'FAILURE': 500}.get(state, 202)
+        return jsonify(task_state(state, task.info if state == 'FAILURE' else None, with_progress=False)), status_code
+
     if task.state == 'PENDING':
         return jsonify({"status": "PENDING"}), 202
     elif task.state == 'SUCCESS':
         return jsonify({"status": "SUCCESS", "data": task.result}), 200
     elif task.state == 'FAILURE':
         return jsonify({"status": "FAILURE", "error": str(task.info)}), 500
+    elif task.state == 'PROGRESS' and isinstance(task.info, dict):
+        # Progress meta, e.g. chunks done or the partial text of a streamed summary
+        return jsonify({"status": "PROGRESS", "progress": task.info}), 202
     else:
         return jsonify({"status": task.state}), 202
 
+@app.route('/task-events/<task_id>', methods=['GET'])
+@swag_from({
+    'parameters': [
+        {
+            'name': 'task_id',
+            'in': 'path',
+            'required': True,
+            'type': 'string',
+            'description': 'The ID of the task'
+        }
+    ],
+    'produces': ['text/event-stream'],
+    'responses': {
+        200: {
+            'description': 'Server-sent events, one per state change until the task finishes: the event name '
+                           'is the lowercased state and its data the status without the result, e.g. '
+                           '`event: progress` / `data: {"status": "PROGRESS", "progress": {"chunks_done": 2, '
+                           '"chunks_total": 5}}`. Fetch the result from /task-status once `success` arrives.'
+        },
+        501: {
+            'description': 'The result backend does not publish task events (only Redis does).'
+        }
+    }
+})
+def get_task_events(task_id):
+    if not supports_events():
+        return jsonify({"error": "Task events need the Redis result backend"}), 501
+    return Response(
+        stream_with_context(stream_task_events(task_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/metrics', methods=['GET'])
+@swag_from({
+    'produces': ['text/plain'],
+    'responses': {
+        200: {
+            'description': 'Prometheus metrics of the API process: Slack API latency, rate limiting, pages '
+                           'fetched and task queue wait. Workers serve theirs on WORKER_METRICS_PORT.'
+        }
+    }
+})
+def get_metrics():
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+
+@app.route('/exports/<artifact_id>', methods=['GET'])
+@swag_from({
+    'parameters': [
+        {
+            'name': 'artifact_id',
+            'in': 'path',
+            'required': True,
+            'type': 'string',
+            'description': 'The artifact_id returned in the fetch_messages task result'
+        },
+        {
+            'name': 'offset',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'description': 'Index of the first message to return'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'required': False,
+            'type': 'integer',
+            'description': 'Max number of messages to return'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Messages as NDJSON (one JSON document per line), streamed with chunked transfer. '
+                           'Byte ranges are supported through the Range header.'
+        },
+        206: {
+            'description': 'Requested byte range of the NDJSON file.'
+        },
+        404: {
+            'description': 'Artifact not found.',
+            'examples': {
+                'application/json': {
+                    'error': 'Export not found'
+                }
+            }
+        }
+    }
+})
+def get_export(artifact_id):
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = request.args.get('limit')
+        limit = int(limit) if limit is not None else None
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "offset and limit must be non-negative integers"}), 400
+
+    try:
+        if os.path.isdir(artifacts.artifact_path(artifact_id, ".parquet")):
+            files = parquet_export.list_files(artifact_id)
+            return jsonify({
+                "format": "parquet",
+                "files": [{"path": path, "url": f"/exports/{artifact_id}/{path}"} for path in files]
+            }), 200
+        total = artifacts.count_records(artifact_id)
+        if request.range and not offset and limit is None:
+            # Byte ranges are answered straight from the file
+            return send_file(artifacts.artifact_path(artifact_id), mimetype='application/x-ndjson',
+                             conditional=True)
+        lines = artifacts.iter_ndjson_lines(artifact_id, offset, limit)
+    except artifacts.ArtifactNotFound:
+        return jsonify({"error": "Export not found"}), 404
+
+    response = Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    response.headers['X-Total-Count'] = str(total)
+    return response
+
+
+@app.route('/exports/<artifact_id>/<path:filename>', methods=['GET'])
+@swag_from({
+    'parameters': [
+        {
+            'name': 'artifact_id',
+            'in': 'path',
+            'required': True,
+            'type': 'string'
+        },
+        {
+            'name': 'filename',
+            'in': 'path',
+            'required': True,
+            'type': 'string',
+            'description': 'Relative path of a file listed by /exports/<artifact_id>'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'One Parquet file of a parquet export.'
+        },
+        404: {
+            'description': 'File not found.'
+        }
+    }
+})
+def get_export_file(artifact_id, filename):
+    try:
+        root = artifacts.artifact_path(artifact_id, ".parquet")
+    except artifacts.ArtifactNotFound:
+        return jsonify({"error": "Export not found"}), 404
+    return send_from_directory(root, filename, mimetype='application/vnd.apache.parquet')
+
+
 @app.route("/summarize-thread", methods=["POST"])
 @swag_from({
     'parameters': [
@@ -238,6 +535,11 @@ def get_task_status(task_id):
                         'example': 'C1234567890',
                         'description': 'The Slack channel ID'
                     },
+                    'channel': {
+                        'type': 'string',
+                        'example': 'general',
+                        'description': 'Channel name (or #name) to use instead of channel_id'
+                    },
                     'thread_ts': {
                         'type': 'string',
                         'example': '1748458889.115369',
@@ -250,7 +552,7 @@ def get_task_status(task_id):
                         'enum': ['openai', 'ollama']
                     }
                 },
-                'required': ['channel_id', 'thread_ts', 'llm_provider']
+                'required': ['thread_ts', 'llm_provider']
             }
         }
     ],
@@ -281,7 +583,9 @@ def summarize_thread():
         if not data:
             return jsonify({"error": "Request body is required"}), 400
         
-        channel_id = data.get("channel_id")
+        channel_id = resolve_channel(data)
+        if not channel_id and data.get("channel"):
+            return channel_not_found(data)
         thread_ts = data.get("thread_ts")
         llm_provider = data.get("llm_provider")
         model = data.get("model")
@@ -307,3 +611,184 @@ def summarize_thread():
         
     except Exception as e:
         return jsonify({"error": str(e)}), 400
+
+
+@app.route("/summarize-threads", methods=["POST"])
+@swag_from({
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'channel_id': {
+                        'type': 'string',
+                        'example': 'C1234567890',
+                        'description': 'The Slack channel ID'
+                    },
+                    'channel': {
+                        'type': 'string',
+                        'example': 'general',
+                        'description': 'Channel name (or #name) to use instead of channel_id'
+                    },
+                    'thread_ts': {
+                        'type': 'array',
+                        'items': {'type': 'string'},
+                        'example': ['1748458889.115369', '1748459999.000100'],
+                        'description': 'Threads to summarize. Alternatively send start_date and end_date'
+                    },
+                    'start_date': {
+                        'type': 'string',
+                        'example': '2024-01-01',
+                        'description': 'Summarize every thread started from this date'
+                    },
+                    'end_date': {
+                        'type': 'string',
+                        'example': '2024-01-07',
+                        'description': 'Summarize every thread started up to this date'
+                    },
+                    'llm_provider': {
+                        'type': 'string',
+                        'example': 'openai',
+                        'enum': ['openai', 'ollama']
+                    },
+                    'model': {
+                        'type': 'string',
+                        'example': 'gpt-4o-mini'
+                    }
+                },
+                'required': ['llm_provider', 'model']
+            }
+        }
+    ],
+    'responses': {
+        202: {
+            'description': 'Batch summarization task created. Finished summaries appear in the '
+                           'task progress (task_name=summarize_threads) as they complete.',
+            'examples': {
+                'application/json': {
+                    'task_id': 'task_id_1'
+                }
+            }
+        },
+        400: {
+            'description': 'Bad request - missing or invalid parameters.',
+            'examples': {
+                'application/json': {
+                    'error': 'Send either thread_ts or start_date and end_date'
+                }
+            }
+        }
+    }
+})
+def summarize_threads():
+    """Endpoint to summarize many Slack threads in one task"""
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({"error": "Request body is required"}), 400
+
+        channel_id = resolve_channel(data)
+        if not channel_id and data.get("channel"):
+            return channel_not_found(data)
+        thread_ts_list = data.get("thread_ts")
+        start_date_str = data.get("start_date")
+        end_date_str = data.get("end_date")
+        llm_provider = data.get("llm_provider")
+        model = data.get("model")
+
+        # Validate required parameters
+        if not channel_id:
+            return jsonify({"error": "Missing required parameter: channel_id"}), 400
+        if not llm_provider:
+            return jsonify({"error": "Missing required parameter: llm_provider"}), 400
+        if not model:
+            return jsonify({"error": "Missing required parameter: model"}), 400
+        if llm_provider.lower() not in ['openai', 'ollama']:
+            return jsonify({"error": "Invalid llm_provider. Must be 'openai' or 'ollama'"}), 400
+
+        if thread_ts_list is not None:
+            if not isinstance(thread_ts_list, list) or not all(isinstance(ts, str) for ts in thread_ts_list):
+                return jsonify({"error": "thread_ts must be a list of thread timestamps"}), 400
+        else:
+            start_date = validate_date_format(start_date_str)
+            end_date = validate_date_format(end_date_str)
+            if not start_date or not end_date:
+                return jsonify({"error": "Send either thread_ts or start_date and end_date"}), 400
+            error_message = validate_dates(start_date, end_date)
+            if error_message:
+                return jsonify({"error": error_message}), 400
+
+        task = summarize_threads_task.delay(
+            channel_id, llm_provider.lower(), model, thread_ts_list, start_date_str, end_date_str
+        )
+
+        return jsonify({"task_id": task.id}), 202
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/slack/events", methods=["POST"])
+@swag_from({
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'description': 'Slack Events API payload, signed with the app signing secret',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'type': {
+                        'type': 'string',
+                        'example': 'event_callback',
+                        'enum': ['url_verification', 'event_callback']
+                    },
+                    'event_id': {
+                        'type': 'string',
+                        'example': 'Ev0123456789'
+                    },
+                    'event': {
+                        'type': 'object',
+                        'example': {'type': 'message', 'channel': 'C1234567890', 'user': 'U1',
+                                    'text': 'hola', 'ts': '1748458889.115369'}
+                    }
+                }
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Event queued (or the url_verification challenge echoed back).'
+        },
+        403: {
+            'description': 'Missing or invalid X-Slack-Signature.'
+        },
+        503: {
+            'description': 'SLACK_SIGNING_SECRET is not configured.'
+        }
+    }
+})
+def slack_events():
+    """Slack Events API receiver: message, reply, edit, deletion and reaction events
+    are queued and applied to the local message store by a worker"""
+    if not SLACK_SIGNING_SECRET:
+        return jsonify({"error": "SLACK_SIGNING_SECRET is not configured"}), 503
+
+    body = request.get_data()
+    if not SignatureVerifier(SLACK_SIGNING_SECRET).is_valid_request(body, request.headers):
+        return jsonify({"error": "Invalid signature"}), 403
+
+    payload = json.loads(body)
+    if payload.get("type") == "url_verification":
+        return jsonify({"challenge": payload.get("challenge")}), 200
+
+    if payload.get("type") == "event_callback" and payload.get("event"):
+        # Slack expects an answer within 3 seconds; the store is updated by a worker
+        apply_slack_event_task.delay(payload["event"], payload.get("event_id"))
+
+    return "", 200
@@ -1,19 +1,26 @@
 import time
-import backoff
-from datetime import datetime
-from slack_sdk import WebClient
+from concurrent.futures import ThreadPoolExecutor
 from slack_sdk.errors import SlackApiError
-from .utils import get_user_info_by_user_id
+from .user_directory import get_user_directory
+from .message_store import get_message_store
+from .clients import get_slack_client
+from .records import MessageRecord, ReplyRecord
 
-from . import logger
+from . import logger, metrics
 import os
 
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
-client = WebClient(token=os.getenv("SLACK_TOKEN"))
-slack_home = os.getenv("SLACK_HOME")
+client = get_slack_client()
+
+# Max number of conversations_replies calls in flight per fetch_messages page
+SLACK_REPLIES_CONCURRENCY = int(os.getenv("SLACK_REPLIES_CONCURRENCY", "8"))
+
+# Threads newer than this may still get replies, so every sync re-checks them; replies to
+# older threads are only picked up from Slack events (see sync_messages)
+THREAD_LOOKBACK_SECONDS = float(os.getenv("MESSAGE_STORE_THREAD_LOOKBACK_DAYS", "14")) * 24 * 3600
 
 if not client:
     logger.error("SLACK_API_TOKEN debe estar configurado en el entorno")
@@ -22,111 +29,209 @@ if not client:
 else:
     logger.info("Cliente de Slack creado con éxito")
 
-@backoff.on_exception(
-    backoff.expo,                   # Exponential backoff strategy
-    SlackApiError,                  # Exception to catch
-    max_time=300,                   # Max time to retry in seconds (5 minutes)
-    jitter=backoff.full_jitter,     # Add jitter to avoid spikes
-    giveup=lambda e: e.response["error"] != "ratelimited",  # only retry if it's ratelimited
-    on_backoff=lambda details: logger.info(f"Retrying... {details}")
-)
+
+def format_message(channel: str, msg: dict, users: dict = None, replies: list = None) -> MessageRecord:
+    """Shape a top-level Slack message the way the reports expect it"""
+    return MessageRecord.from_slack(channel, msg, users, replies=replies)
+
+
+def format_reply(channel: str, reply: dict, users: dict = None) -> ReplyRecord:
+    """Shape a thread reply the way the reports expect it"""
+    return ReplyRecord.from_slack(channel, reply, users)
+
+
 def fetch_messages(channel, start_date, end_date):
-    messages = []
-    try:
-        start_ts = start_date
-        end_ts = end_date
-        next_cursor = None
-
-        while True:
-            try:
-                response = client.conversations_history(
-                    channel=channel,
-                    oldest=start_ts,
-                    latest=end_ts,
-                    limit=100,
-                    cursor=next_cursor
-                )
-                for msg in response['messages']:
-                    post_id =  msg.get("ts")
-                    user_id = msg.get("user")
-                    # user_info = get_user_info_by_user_id(client, user_id)
-                    
-                    formatted_msg = {
-                        "author": user_id,
-                       # "fullname": user_info["email"],
-                        "message": msg.get("text"),
-                        "post_id": post_id,
-                        "url": f"{slack_home}/archives/{channel}/p{post_id[:10]}.{post_id[-6:]}",
-                        "date": datetime.fromtimestamp(float(msg.get("ts"))).isoformat(),
-                        "reactions": {r["name"]: r["count"] for r in msg.get("reactions", [])},
-                        "replies": [],
-                        "subtype": msg.get("subtype")
-                    }
-
-                    if "reply_count" in msg:
-                        replies_response = fetch_replies(channel, msg["ts"])
-                        formatted_msg["replies"] = replies_response
-
-                    messages.append(formatted_msg)
-
-                next_cursor = response.get("response_metadata", {}).get("next_cursor")
-                if not next_cursor:
-                    break
-
-            except SlackApiError as e:
-                logger.error(f"Error paginating messages: {e}")
-                logger.error(f"Error response in paginating messages: {e.response}")
-                return {"error": str(e)}
+    """Return formatted messages (with replies) of a channel between two timestamps.
 
+    Collects ``iter_messages`` into a list; prefer the generator for large
+    ranges.
+    """
+    try:
+        return list(iter_messages(channel, start_date, end_date))
     except SlackApiError as e:
         logger.error(f"Error fetching messages: {e}")
         logger.error(f"Error response in fetching messages: {e.response}")
         return {"error": str(e)}
 
-    return messages
-
-@backoff.on_exception(
-    backoff.expo,                   # Exponential backoff strategy
-    SlackApiError,                  # Exception to catch
-    max_time=300,                   # Max time to retry in seconds (5 minutes)
-    jitter=backoff.full_jitter,     # Add jitter to avoid spikes
-    giveup=lambda e: e.response["error"] != "ratelimited",  # only retry if it's ratelimited
-    on_backoff=lambda details: logger.info(f"Retrying... {details}")
-)
-def fetch_replies(channel, ts):
-    try:
-        replies_response = client.conversations_replies(
+
+def iter_messages(channel, oldest, latest, store=None):
+    """Yield formatted messages (with replies) newest first, page by page.
+
+    Time ranges already in the local message store are read from it; the
+    rest is crawled from Slack, written to the store and yielded as each
+    page arrives. Every stored page moves the sync watermark, so after a
+    failure a new call resumes where the previous one stopped. Callers can
+    stop iterating at any point.
+    """
+    store = store or get_message_store()
+    for seg_oldest, seg_latest, crawl in _plan_segments(channel, float(oldest), float(latest), store):
+        if crawl:
+            for page in _sync_pages(channel, seg_oldest, seg_latest, store):
+                replies = store.get_replies(channel, [msg["ts"] for msg in page])
+                yield from _format_page(channel, [(msg, replies.get(msg["ts"], [])) for msg in page])
+        else:
+            for page in store.iter_pages(channel, seg_oldest, seg_latest):
+                _count_page("store", page)
+                yield from _format_page(channel, page)
+
+
+def _count_page(source, page):
+    task = metrics.task_name()
+    metrics.PAGES_FETCHED.labels(task=task, source=source).inc()
+    metrics.MESSAGES_FETCHED.labels(task=task, source=source).inc(len(page))
+
+
+def _format_page(channel, page):
+    # One bulk lookup for the page's authors instead of a profile call per message
+    authors = {msg.get("user") for msg, _ in page}
+    authors.update(reply.get("user") for _, replies in page for reply in replies)
+    users = get_user_directory().get_many(authors)
+
+    for msg, replies in page:
+        yield format_message(channel, msg, users, [format_reply(channel, reply, users) for reply in replies])
+
+
+def sync_messages(channel, start_ts, end_ts, store=None):
+    """Bring the local store up to date for a channel between two timestamps.
+
+    Ranges never crawled are fetched in full. The last
+    THREAD_LOOKBACK_SECONDS are re-listed as well, but thread replies are
+    only fetched again when the parent's ``latest_reply`` moved.
+
+    Threads started before the lookback are never re-listed, so replies
+    they get after being stored are missed unless the channel receives
+    Slack events (``apply_event``) or the lookback is raised to cover them.
+    """
+    store = store or get_message_store()
+    for seg_oldest, seg_latest, crawl in _plan_segments(channel, float(start_ts), float(end_ts), store):
+        if crawl:
+            for _ in _sync_pages(channel, seg_oldest, seg_latest, store):
+                pass
+
+
+def _plan_segments(channel, oldest, latest, store):
+    """Split [oldest, latest] into newest-first (oldest, latest, crawl) segments
+
+    Whatever came after the start of the channel's Events API stream is
+    already in the store and is never crawled.
+    """
+    now = time.time()
+    crawl_until = min(latest, now)
+    events_since = store.events_since(channel)
+    if events_since is not None:
+        crawl_until = min(crawl_until, events_since)
+    ranges = store.missing_ranges(channel, oldest, crawl_until) if oldest < crawl_until else []
+    refresh_from = max(oldest, now - THREAD_LOOKBACK_SECONDS)
+    if refresh_from < crawl_until:
+        ranges.append((refresh_from, crawl_until))
+
+    segments = []
+    cursor = latest
+    for seg_oldest, seg_latest in reversed(_merge_ranges(ranges)):
+        if seg_latest < cursor:
+            segments.append((seg_latest, cursor, False))
+        segments.append((seg_oldest, seg_latest, True))
+        cursor = seg_oldest
+    if oldest < cursor:
+        segments.append((oldest, cursor, False))
+    return segments
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for oldest, latest in sorted(ranges):
+        if merged and oldest <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], latest))
+        else:
+            merged.append((oldest, latest))
+    return merged
+
+
+def iter_history_pages(channel, oldest, latest, cursor=None):
+    """Yield (messages, next_cursor) for each conversations_history page.
+
+    Rate limits are waited out by the client (see rate_limiter); other
+    Slack errors are raised to the caller.
+    """
+    while True:
+        try:
+            response = client.conversations_history(
+                channel=channel,
+                oldest=oldest,
+                latest=latest,
+                limit=100,
+                cursor=cursor
+            )
+        except SlackApiError as e:
+            logger.error(f"Error paginating messages: {e}")
+            raise
+
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        yield response['messages'], cursor
+        if not cursor:
+            break
+
+
+def _sync_pages(channel, oldest, latest, store):
+    """Crawl a range into the store, yielding each raw history page once stored"""
+    for page, next_cursor in iter_history_pages(channel, oldest, latest):
+        known = store.latest_replies(channel, [msg["ts"] for msg in page])
+        stale_threads = [
+            msg["ts"] for msg in page
+            if "reply_count" in msg and (msg["ts"] not in known or known[msg["ts"]] != msg.get("latest_reply"))
+        ]
+
+        # Fan out the thread fetches of this page; replies are stored before
+        # their parent so an interrupted crawl refetches them next time
+        if stale_threads:
+            workers = min(SLACK_REPLIES_CONCURRENCY, len(stale_threads))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                threads = pool.map(fetch_thread_messages, [channel] * len(stale_threads), stale_threads)
+                for ts, thread in zip(stale_threads, threads):
+                    store.replace_thread(channel, ts, thread)
+
+        store.upsert_messages(channel, page)
+
+        # History is newest first: everything down to the page's oldest
+        # message has now been seen
+        if next_cursor and page:
+            store.add_synced_range(channel, min(float(msg["ts"]) for msg in page), latest)
+        elif not next_cursor:
+            store.add_synced_range(channel, oldest, latest)
+
+        _count_page("slack", page)
+        yield page
+
+
+def iter_thread_messages(channel, ts):
+    """Yield the raw messages of a thread, parent first, following cursors"""
+    cursor = None
+    while True:
+        response = client.conversations_replies(
             channel=channel,
-            ts=ts
+            ts=ts,
+            cursor=cursor
         )
-        return [
-            {
-                "author": reply.get("user"),
-                "message": reply.get("text"),
-                "post_id": reply.get("ts"),
-                "url": f"{slack_home}/archives/{channel}/p{reply.get('ts')[:10]}.{reply.get('ts')[-6:]}",
-                "date": datetime.fromtimestamp(float(reply.get("ts"))).isoformat()
-            } for reply in replies_response["messages"] if reply.get("ts") != ts
-        ]
+        yield from response["messages"]
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            break
+
+
+def fetch_thread_messages(channel, ts):
+    """Raw messages of a thread, parent first"""
+    try:
+        return list(iter_thread_messages(channel, ts))
     except SlackApiError as e:
         logger.error(f"Error fetching replies: {e}")
         logger.error(f"Error response in fetching replies: {e.response}")
-
-        if 'error' in e.response and e.response["error"] == "ratelimited":
-            logger.info("Rate limit error detected. Applying backoff.")
         raise e
 
+
 def fetch_top_repliers():
     return []
 
-@backoff.on_exception(
-    backoff.expo,
-    SlackApiError,
-    max_time=300,
-    jitter=backoff.full_jitter,
-    giveup=lambda e: e.response["error"] != "ratelimited",
-    on_backoff=lambda details: logger.info(f"Retrying... {details}")
-)
+
 def fetch_thread_by_ts(channel: str, thread_ts: str) -> dict:
     """Fetch a complete thread by thread timestamp
     
@@ -139,13 +244,7 @@ def fetch_thread_by_ts(channel: str, thread_ts: str) -> dict:
     """
     try:
         # Get the complete conversation including all replies
-        response = client.conversations_replies(
-            channel=channel,
-            ts=thread_ts,
-            inclusive=True
-        )
-        
-        messages = response["messages"]
+        messages = list(iter_thread_messages(channel, thread_ts))
         if not messages:
             return {"error": "Thread not found"}
         
@@ -153,27 +252,10 @@ def fetch_thread_by_ts(channel: str, thread_ts: str) -> dict:
         main_message = messages[0]
         replies = messages[1:] if len(messages) > 1 else []
         
-        # Format main message
-        formatted_main = {
-            "author": main_message.get("user"),
-            "message": main_message.get("text", ""),
-            "post_id": main_message.get("ts"),
-            "url": f"{slack_home}/archives/{channel}/p{main_message.get('ts', '')[:10]}.{main_message.get('ts', '')[-6:]}",
-            "date": datetime.fromtimestamp(float(main_message.get("ts", 0))).isoformat(),
-            "reactions": {r["name"]: r["count"] for r in main_message.get("reactions", [])},
-        }
-        
-        # Format replies
-        formatted_replies = []
-        for reply in replies:
-            formatted_reply = {
-                "author": reply.get("user"),
-                "message": reply.get("text", ""),
-                "post_id": reply.get("ts"),
-                "url": f"{slack_home}/archives/{channel}/p{reply.get('ts', '')[:10]}.{reply.get('ts', '')[-6:]}",
-                "date": datetime.fromtimestamp(float(reply.get("ts", 0))).isoformat()
-            }
-            formatted_replies.append(formatted_reply)
+        # Plain dicts: the thread ends up in the summary task result
+        formatted_main = MessageRecord.from_slack(channel, main_message, default_text="").to_dict()
+        del formatted_main["replies"]
+        formatted_replies = [ReplyRecord.from_slack(channel, reply, default_text="").to_dict() for reply in replies]
         
         return {
             "main_message": formatted_main,
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import redis
+
+from . import logger
+
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", str(7 * 24 * 3600)))
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+REDIS_PREFIX = "slack-reports:summary:"
+REDIS_LRU = "slack-reports:summary-lru"
+REDIS_SIZES = "slack-reports:summary-sizes"
+REDIS_TOTAL = "slack-reports:summary-bytes"
+
+
+def thread_content_hash(thread_data: dict) -> str:
+    """Hash of everything in a thread that can change its summary"""
+    main_message = thread_data["main_message"]
+    content = [[main_message.get("post_id"), main_message.get("author"), main_message.get("message")]]
+    content.extend(
+        [reply.get("post_id"), reply.get("author"), reply.get("message")]
+        for reply in thread_data.get("replies", [])
+    )
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def text_hash(*parts: str) -> str:
+    """Hash of a piece of prompt content, e.g. one window of a long thread"""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def summary_cache_key(provider: str, model: str, prompt_version: str, content_hash: str) -> str:
+    return hashlib.sha256(
+        json.dumps([provider.lower(), model, prompt_version, content_hash]).encode("utf-8")
+    ).hexdigest()
+
+
+class SummaryCache:
+    """Generated summaries keyed by ``summary_cache_key``.
+
+    Entries expire after ``ttl`` and the least recently used ones are
+    evicted once the stored summaries exceed ``max_bytes``. With a Redis
+    client the cache is shared by every worker; without one it is a local
+    in-process LRU.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None,
+                 ttl: int = SUMMARY_CACHE_TTL, max_bytes: int = SUMMARY_CACHE_MAX_BYTES):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        if self.redis is not None:
+            value = self.redis.get(REDIS_PREFIX + key)
+            if value is None:
+                return None
+            self.redis.zadd(REDIS_LRU, {key: time.time()})
+            return json.loads(value)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return json.loads(value)
+
+    def set(self, key: str, value: dict):
+        encoded = json.dumps(value, ensure_ascii=False)
+        size = len(encoded.encode("utf-8"))
+        if size > self.max_bytes:
+            logger.info(f"Summary of {size} bytes is larger than the whole cache, not caching it")
+            return
+
+        if self.redis is not None:
+            self._set_redis(key, encoded, size)
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, encoded)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value.encode("utf-8"))
+
+    def _set_redis(self, key, encoded, size):
+        previous = self.redis.hget(REDIS_SIZES, key)
+        pipe = self.redis.pipeline()
+        pipe.setex(REDIS_PREFIX + key, self.ttl, encoded)
+        pipe.zadd(REDIS_LRU, {key: time.time()})
+        pipe.hset(REDIS_SIZES, key, size)
+        pipe.incrby(REDIS_TOTAL, size - int(previous or 0))
+        total = pipe.execute()[-1]
+
+        # Evict least recently used summaries (or ones already expired) until under budget
+        while total > self.max_bytes:
+            popped = self.redis.zpopmin(REDIS_LRU)
+            if not popped:
+                break
+            victim = popped[0][0]
+            victim = victim.decode() if isinstance(victim, bytes) else victim
+            victim_size = int(self.redis.hget(REDIS_SIZES, victim) or 0)
+            pipe = self.redis.pipeline()
+            pipe.delete(REDIS_PREFIX + victim)
+            pipe.hdel(REDIS_SIZES, victim)
+            pipe.decrby(REDIS_TOTAL, victim_size)
+            total = pipe.execute()[-1]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> SummaryCache:
+    """Process-wide cache, shared through Redis when ``result_backend`` is set"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            redis_url = os.getenv("result_backend")
+            _cache = SummaryCache(redis.Redis.from_url(redis_url) if redis_url else None)
+        return _cache
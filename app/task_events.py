@@ -0,0 +1,69 @@
+import json
+import os
+import time
+from typing import Iterator
+
+from . import celery
+
+# Seconds between keep-alive comments on an idle event stream
+TASK_EVENTS_HEARTBEAT = float(os.getenv("TASK_EVENTS_HEARTBEAT", "15"))
+# Seconds an event stream stays open; EventSource clients reconnect after it closes
+TASK_EVENTS_MAX_SECONDS = float(os.getenv("TASK_EVENTS_MAX_SECONDS", "600"))
+
+TERMINAL_STATES = {"SUCCESS", "FAILURE", "REVOKED"}
+
+
+def task_state(status: str, info, with_progress: bool = True) -> dict:
+    """Status of a task without its result body: the state, plus progress or error"""
+    state = {"status": status}
+    if status == "FAILURE":
+        state["error"] = str(info)
+    elif status == "PROGRESS" and with_progress and isinstance(info, dict):
+        state["progress"] = info
+    return state
+
+
+def supports_events(backend=None) -> bool:
+    """Whether the result backend publishes state changes (only the Redis backend does)"""
+    backend = backend or celery.backend
+    return hasattr(getattr(backend, "client", None), "pubsub")
+
+
+def _event(state: dict) -> str:
+    return f"event: {state['status'].lower()}\ndata: {json.dumps(state)}\n\n"
+
+
+def stream_task_events(task_id: str, backend=None, heartbeat: float = TASK_EVENTS_HEARTBEAT,
+                       max_seconds: float = TASK_EVENTS_MAX_SECONDS) -> Iterator[str]:
+    """Server-sent events with every state change of a task until it finishes.
+
+    The Redis result backend publishes each stored state (``update_state``
+    progress included) on the channel named after the task's result key,
+    so nothing needs to be published by the tasks themselves. The current
+    state is read after subscribing, so no transition falls in between.
+    """
+    backend = backend or celery.backend
+    pubsub = backend.client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(backend.get_key_for_task(task_id))
+    try:
+        meta = backend.get_task_meta(task_id)
+        yield _event(task_state(meta["status"], meta.get("result")))
+        if meta["status"] in TERMINAL_STATES:
+            return
+
+        deadline = time.monotonic() + max_seconds
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=heartbeat)
+            if message is None:
+                if time.monotonic() - last_sent >= heartbeat:
+                    last_sent = time.monotonic()
+                    yield ": keep-alive\n\n"
+                continue
+            meta = backend.decode_result(message["data"])
+            last_sent = time.monotonic()
+            yield _event(task_state(meta["status"], meta.get("result")))
+            if meta["status"] in TERMINAL_STATES:
+                return
+    finally:
+        pubsub.close()
@@ -1,99 +1,557 @@
 from . import celery
-from .slack_client import fetch_messages, fetch_thread_by_ts
+from celery import chord, group
+from celery.utils.time import get_exponential_backoff_interval
+from .slack_client import iter_messages, fetch_thread_by_ts, sync_messages
+from .message_store import get_message_store
+from .analytics import TopRepliersAggregator, replier_counts_by_day
 from .llm_factory import LLMFactory
-from collections import defaultdict
+from .llm_interface import LLMError
+from slack_sdk.errors import SlackApiError
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from urllib.error import URLError
 from . import logger
-from .utils import get_user_info_by_user_id
-from slack_sdk import WebClient
+from . import artifacts, metrics, parquet_export
+from .user_directory import get_user_directory
+from .summary_cache import get_summary_cache, summary_cache_key, text_hash, thread_content_hash
+from .chunker import chunk_lines
+from .rate_limiter import LLM_RATE_LIMITS, get_llm_rate_limiter
 import os
+import time
 
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
-client = WebClient(token=os.getenv("SLACK_TOKEN"))
+# Max threads fetched and summarized at the same time by summarize_threads_task
+SUMMARY_BATCH_CONCURRENCY = int(os.getenv("SUMMARY_BATCH_CONCURRENCY", "4"))
+# Max windows of one long thread summarized at the same time
+SUMMARY_CHUNK_CONCURRENCY = int(os.getenv("SUMMARY_CHUNK_CONCURRENCY", "4"))
+# Min seconds between two progress updates carrying a streamed partial summary
+SUMMARY_STREAM_INTERVAL = float(os.getenv("SUMMARY_STREAM_INTERVAL", "0.5"))
 
-@celery.task(bind=True)
-def fetch_messages_task(self, channel_id, p_start_date, p_end_date):
-    messages = []
+CHUNK_SIZE = timedelta(days=7)  # Ex.: process 7 days at a time
+# Attempts of a chunk after a network error; each one resumes from the chunk's checkpoint
+FETCH_CHUNK_MAX_RETRIES = int(os.getenv("FETCH_CHUNK_MAX_RETRIES", "5"))
+# Network errors a fetch chunk is retried on
+FETCH_CHUNK_RETRY_ERRORS = (URLError, ConnectionError, TimeoutError)
 
-    chunk_size = timedelta(days=7)  # Ex.: process 7 days at a time
+# Task priorities within a queue, 0 runs first: a user waiting on one thread
+# summary goes ahead of reports, and reports ahead of bulk exports and batches
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REPORT = 3
+PRIORITY_BULK = 6
 
+
+def _date_chunks(p_start_date, p_end_date, chunk_size=CHUNK_SIZE):
+    """Split an inclusive YYYY-MM-DD range into (start_ts, end_ts) chunks"""
     start_date = datetime.strptime(p_start_date, "%Y-%m-%d").replace(hour=0, minute=0, second=0)
     end_date = datetime.strptime(p_end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
 
+    chunks = []
     current_start = start_date
-
     while current_start < end_date:
         current_end = min(current_start + chunk_size, end_date)
+        chunks.append((int(current_start.timestamp()), int(current_end.timestamp())))
+        current_start = current_end
+    return chunks
 
-        chunk_messages = fetch_messages(channel_id, int(current_start.timestamp()), int(current_end.timestamp()))
 
-        messages.extend(chunk_messages)
+def _channels_progress(channel_ids, channel_chunks, done=None):
+    """Progress meta of a multi-channel task: overall and per channel chunk counts"""
+    done = done or {}
+    return {
+        'chunks_done': sum(done.values()),
+        'chunks_total': channel_chunks * len(channel_ids),
+        'channels': {
+            channel_id: {'chunks_done': done.get(channel_id, 0), 'chunks_total': channel_chunks}
+            for channel_id in channel_ids
+        }
+    }
 
-        current_start = current_end
 
-        self.update_state(state='PROGRESS', meta={'current_start': current_start.isoformat()})
+def _start_channels_progress(task, channel_ids, channel_chunks):
+    """Publish zero progress for every channel and seed the per-channel counters"""
+    task.update_state(state='PROGRESS', meta=_channels_progress(channel_ids, channel_chunks))
+    redis_client = getattr(celery.backend, "client", None)
+    if redis_client is not None:
+        key = f"slack-reports:chunks-done:{task.request.id}:channels"
+        redis_client.hset(key, mapping={channel_id: 0 for channel_id in channel_ids})
+        redis_client.expire(key, 24 * 3600)
 
-    return messages
 
-@celery.task(bind=True)
-def calculate_top_repliers_task(self, channel_id, p_start_date, p_end_date, top_n=10):
-    top_repliers_data = defaultdict(lambda: {"discussions": 0, "responses": 0, "full_name": ""})
-    
-    chunk_size = timedelta(days=7)  # Ex.: process 7 days at a time
+def _report_chunk_done(parent_id, chunks_total, channel_id=None, channel_chunks=None):
+    """Bump the finished-chunks counter of a fanned-out task and publish it.
 
-    start_date = datetime.strptime(p_start_date, "%Y-%m-%d").replace(hour=0, minute=0, second=0)
-    end_date = datetime.strptime(p_end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    Chunks of a multi-channel task also bump their channel's counter, and
+    the published progress carries the breakdown of every channel.
+    """
+    redis_client = getattr(celery.backend, "client", None)
+    if not parent_id or redis_client is None:
+        return
+    key = f"slack-reports:chunks-done:{parent_id}"
+    if channel_id is None:
+        chunks_done = redis_client.incr(key)
+        redis_client.expire(key, 24 * 3600)
+        meta = {'chunks_done': chunks_done, 'chunks_total': chunks_total}
+    else:
+        key += ":channels"
+        redis_client.hincrby(key, channel_id, 1)
+        done = {
+            (cid.decode() if isinstance(cid, bytes) else cid): int(count)
+            for cid, count in redis_client.hgetall(key).items()
+        }
+        meta = _channels_progress(list(done), channel_chunks, done)
+    celery.backend.store_result(parent_id, meta, 'PROGRESS')
 
-    current_start = start_date
 
-    while current_start < end_date:
-        current_end = min(current_start + chunk_size, end_date)
+EXPORT_FORMATS = ("ndjson", "parquet")
 
-        messages = fetch_messages(channel_id, int(current_start.timestamp()), int(current_end.timestamp()))
 
-        for msg in messages:
-            parent_author = msg['author']
-            repliers_set = set()
+def _artifact_result(artifact_id, count, export_format="ndjson"):
+    """Task result for an export: Redis only keeps this pointer"""
+    return {
+        "artifact_id": artifact_id,
+        "count": count,
+        "format": export_format,
+        "url": f"/exports/{artifact_id}"
+    }
 
-            for reply in msg.get("replies", []):
-                reply_author = reply["author"]
 
-                if reply_author != parent_author:
-                    if reply_author not in repliers_set:
-                        top_repliers_data[reply_author]["discussions"] += 1
-                        repliers_set.add(reply_author)
-                    top_repliers_data[reply_author]["responses"] += 1
+@celery.task(bind=True, priority=PRIORITY_BULK)
+def fetch_messages_task(self, channel_id, p_start_date, p_end_date, export_format="ndjson"):
+    """Fan the date range out as one chunk subtask per week across the workers.
 
-        current_start = current_end
+    The task is replaced by a chord, so its id resolves to the result of
+    ``merge_messages_task`` once every chunk has finished: a pointer to an
+    NDJSON or Parquet artifact served by ``/exports/<artifact_id>``.
+    ``channel_id`` may also be a list of channels, see ``_fetch_channels``.
+    """
+    if export_format not in EXPORT_FORMATS:
+        return {"error": f"Unsupported export format: {export_format}"}
 
-    sorted_repliers = sorted(
-        top_repliers_data.items(),
-        key=lambda x: (-x[1]['discussions'], -x[1]['responses'])
-    )[:top_n]
+    chunks = _date_chunks(p_start_date, p_end_date)
+    if isinstance(channel_id, (list, tuple)):
+        return _fetch_channels(self, list(channel_id), chunks, export_format)
+    self.update_state(state='PROGRESS', meta={'chunks_done': 0, 'chunks_total': len(chunks)})
 
-    top_repliers_ids = [author for author, _ in sorted_repliers]
+    if not chunks:
+        return merge_messages_task([], self.request.id, export_format)
 
-    full_names = {
-        user_id: get_user_info_by_user_id(client, user_id)
-        for user_id in top_repliers_ids
-    }
+    header = group(
+        fetch_messages_chunk_task.s(channel_id, start_ts, end_ts, self.request.id, len(chunks), index, export_format)
+        for index, (start_ts, end_ts) in enumerate(chunks)
+    )
+    return self.replace(chord(header, merge_messages_task.s(self.request.id, export_format)))
+
+
+def _fetch_channels(task, channel_ids, chunks, export_format):
+    """Fan every week of every channel out, merged by ``merge_channels_messages_task``.
+
+    Chunks are numbered across channels so their artifacts and Parquet
+    parts never clash; progress is reported per channel.
+    """
+    _start_channels_progress(task, channel_ids, len(chunks))
+    if not chunks or not channel_ids:
+        return merge_channels_messages_task([], task.request.id, channel_ids, export_format)
+
+    header = group(
+        fetch_messages_chunk_task.s(channel_id, start_ts, end_ts, task.request.id, len(chunks) * len(channel_ids),
+                                    channel_index * len(chunks) + index, export_format, len(chunks))
+        for channel_index, channel_id in enumerate(channel_ids)
+        for index, (start_ts, end_ts) in enumerate(chunks)
+    )
+    return task.replace(chord(header, merge_channels_messages_task.s(task.request.id, channel_ids, export_format)))
+
+
+def _write_chunk_records(artifact_id, channel_id, start_ts, end_ts):
+    """Write a chunk's records into a resumable artifact and return how many it holds.
+
+    Messages come newest first, so an attempt after an interruption only
+    asks for what is older than the last checkpointed post; the pages the
+    earlier attempt crawled are read back from the message store.
+    """
+    with artifacts.ResumableRecords(artifact_id) as partial:
+        if partial.last_post_id is None:
+            messages = iter_messages(channel_id, start_ts, end_ts)
+        else:
+            resume_ts = float(partial.last_post_id)
+            logger.info(f"Resuming chunk {artifact_id} before {partial.last_post_id} ({partial.count} written)")
+            messages = (msg for msg in iter_messages(channel_id, start_ts, resume_ts)
+                        if float(msg.post_id) < resume_ts)
+        partial.write(messages)
+        return partial.finish()
+
+
+@celery.task(bind=True, priority=PRIORITY_BULK, acks_late=True, reject_on_worker_lost=True,
+             max_retries=FETCH_CHUNK_MAX_RETRIES)
+def fetch_messages_chunk_task(self, channel_id, start_ts, end_ts, parent_id=None, chunks_total=None,
+                              chunk_index=0, export_format="ndjson", channel_chunks=None):
+    """Write one chunk of messages straight from the pager.
+
+    NDJSON chunks go to their own artifact and are merged by the callback;
+    Parquet chunks are written directly into the parent's dataset. Chunks
+    of a multi-channel fetch get ``channel_chunks``, the chunks per channel.
+
+    The task is acknowledged only once it finishes, so a chunk whose
+    worker died is delivered again; NDJSON chunks then resume from their
+    last checkpoint (see ``_write_chunk_records``), as do retries after a
+    network error. Once the retries run out the chunk reports the error like
+    a Slack API failure, so the chord callback still runs, and its partial
+    artifact is deleted.
+    """
+    parent_id = parent_id or self.request.id
+    artifact_id = f"{parent_id}-{chunk_index:05d}"
+    try:
+        if export_format == "parquet":
+            messages = iter_messages(channel_id, start_ts, end_ts)
+            # The boundary post belongs to the next chunk; nothing merges Parquet parts
+            if channel_chunks:
+                last_chunk = chunk_index % channel_chunks == channel_chunks - 1
+            else:
+                last_chunk = chunks_total is None or chunk_index == chunks_total - 1
+            messages = (msg for msg in messages if last_chunk or float(msg["post_id"]) < end_ts)
+            result = {"count": parquet_export.write_parquet(parent_id, channel_id, messages, part=f"{chunk_index:05d}")}
+        else:
+            # Compact rows until merged; only the final export carries every key, url and date
+            result = {"artifact_id": artifact_id,
+                      "count": _write_chunk_records(artifact_id, channel_id, start_ts, end_ts)}
+    except SlackApiError as e:
+        logger.error(f"Error fetching messages chunk: {e}")
+        result = {"error": str(e)}
+    except FETCH_CHUNK_RETRY_ERRORS as e:
+        if self.request.retries < self.max_retries:
+            # Exponential backoff with full jitter, as autoretry_for with retry_backoff would
+            raise self.retry(exc=e, countdown=get_exponential_backoff_interval(
+                factor=1, retries=self.request.retries, maximum=600, full_jitter=True))
+        logger.error(f"Giving up on messages chunk {artifact_id} after {self.request.retries} retries: {e}")
+        artifacts.delete(artifact_id)
+        result = {"error": f"Network error fetching messages: {e}"}
+    # Not counted when retried: the chunk is done only once its last attempt ends
+    if channel_chunks:
+        _report_chunk_done(parent_id, chunks_total, channel_id, channel_chunks)
+    else:
+        _report_chunk_done(parent_id, chunks_total)
+    if channel_chunks:
+        result["channel_id"] = channel_id
+    return result
+
+
+def _merged_chunks(chunk_results, counts=None):
+    """Messages of consecutive chunk artifacts, without the posts neighbours share.
+
+    With ``counts``, the messages kept are also counted per ``channel_id``
+    of their chunk; chunks of another channel never share posts.
+    """
+    previous_ids, previous_channel = set(), None
+    for chunk in chunk_results:
+        channel_id = chunk.get("channel_id")
+        if channel_id != previous_channel:
+            previous_ids, previous_channel = set(), channel_id
+        current_ids = set()
+        for msg in artifacts.read_records(chunk["artifact_id"]):
+            current_ids.add(msg.post_id)
+            if msg.post_id not in previous_ids:
+                if counts is not None:
+                    counts[channel_id] = counts.get(channel_id, 0) + 1
+                yield msg
+        previous_ids = current_ids
+
+
+@celery.task(priority=PRIORITY_BULK)
+def merge_messages_task(chunk_results, artifact_id, export_format="ndjson"):
+    """Concatenate chunk artifacts in range order, dropping duplicated posts.
+
+    Only neighbouring chunks can share a post (the one on their boundary),
+    so just the previous chunk's ids are kept for deduplication. If a chunk
+    failed, the Parquet parts the other chunks already wrote are dropped.
+    """
+    try:
+        for chunk in chunk_results:
+            if "error" in chunk:
+                if export_format == "parquet":
+                    parquet_export.delete(artifact_id)
+                return chunk
+
+        if export_format == "parquet":
+            if not chunk_results:
+                parquet_export.write_parquet(artifact_id, None, [])
+            return _artifact_result(artifact_id, sum(chunk["count"] for chunk in chunk_results), export_format)
+
+        return _artifact_result(artifact_id, artifacts.write_ndjson(artifact_id, _merged_chunks(chunk_results)))
+    finally:
+        for chunk in chunk_results:
+            if "artifact_id" in chunk:
+                artifacts.delete(chunk["artifact_id"])
+
+
+@celery.task(priority=PRIORITY_BULK)
+def merge_channels_messages_task(chunk_results, artifact_id, channel_ids, export_format="ndjson"):
+    """Merge the chunks of a multi-channel fetch into one artifact, channel after channel.
+
+    A channel whose fetch failed is left out and reported with its error
+    in the per-channel breakdown instead of failing the other channels;
+    the Parquet parts its other chunks wrote are removed from the dataset.
+    """
+    try:
+        errors = {}
+        for chunk in chunk_results:
+            if "error" in chunk:
+                errors.setdefault(chunk["channel_id"], chunk["error"])
+        chunks = [chunk for chunk in chunk_results if chunk["channel_id"] not in errors]
+
+        counts = {}
+        if export_format == "parquet":
+            for channel_id in errors:
+                parquet_export.delete_channel(artifact_id, channel_id)
+            for chunk in chunks:
+                counts[chunk["channel_id"]] = counts.get(chunk["channel_id"], 0) + chunk["count"]
+            if not chunks:
+                parquet_export.write_parquet(artifact_id, None, [])
+            count = sum(counts.values())
+        else:
+            count = artifacts.write_ndjson(artifact_id, _merged_chunks(chunks, counts))
+
+        result = _artifact_result(artifact_id, count, export_format)
+        result["channels"] = {
+            channel_id: {"error": errors[channel_id]} if channel_id in errors else {"count": counts.get(channel_id, 0)}
+            for channel_id in channel_ids
+        }
+        return result
+    finally:
+        for chunk in chunk_results:
+            if "artifact_id" in chunk:
+                artifacts.delete(chunk["artifact_id"])
+
+
+def _channel_replier_counts(channel_id, p_start_date, p_end_date) -> TopRepliersAggregator:
+    """Sync a channel's range into the store and count its repliers.
+
+    Raises SlackApiError when the sync fails.
+    """
+    chunks = _date_chunks(p_start_date, p_end_date)
+    if not chunks:
+        return TopRepliersAggregator()
+
+    # The pager writes page by page into the store, so the whole range
+    # is synced in one go without holding it in memory
+    sync_messages(channel_id, chunks[0][0], chunks[-1][1])
+
+    # Sum the daily rollups; only changed days and today are counted again
+    return replier_counts_by_day(
+        get_message_store(), channel_id,
+        datetime.strptime(p_start_date, "%Y-%m-%d").date(),
+        datetime.strptime(p_end_date, "%Y-%m-%d").date()
+    )
+
+
+@celery.task(bind=True, priority=PRIORITY_REPORT)
+def calculate_top_repliers_task(self, channel_id, p_start_date, p_end_date, top_n=10):
+    """Top repliers of a channel; a list of channels fans out, see ``merge_top_repliers_task``"""
+    if isinstance(channel_id, (list, tuple)):
+        channel_ids = list(channel_id)
+        _start_channels_progress(self, channel_ids, 1)
+        if not channel_ids:
+            return merge_top_repliers_task([], top_n)
+        header = group(
+            channel_repliers_task.s(cid, p_start_date, p_end_date, self.request.id) for cid in channel_ids
+        )
+        return self.replace(chord(header, merge_top_repliers_task.s(top_n)))
+
+    try:
+        top_repliers = _channel_replier_counts(channel_id, p_start_date, p_end_date).top(top_n)
+    except SlackApiError as e:
+        logger.error(f"Error syncing messages for top repliers: {e}")
+        return {"error": str(e)}
+
+    full_names = get_user_directory().get_many(author for author, _, _ in top_repliers)
 
     result = [
         {
             "id_replier": author,
             "full_name_replier": full_names.get(author, "Unknown"),
-            "discussions": data["discussions"],
-            "responses": data["responses"]
+            "discussions": discussions,
+            "responses": responses
         }
-        for author, data in sorted_repliers
+        for author, discussions, responses in top_repliers
     ]
 
     return result
 
-@celery.task(bind=True)
+
+@celery.task(priority=PRIORITY_REPORT)
+def channel_repliers_task(channel_id, p_start_date, p_end_date, parent_id=None):
+    """Counts of every replier of one channel of a multi-channel top repliers task"""
+    try:
+        return {"channel_id": channel_id, "repliers": _channel_replier_counts(channel_id, p_start_date, p_end_date).items()}
+    except SlackApiError as e:
+        logger.error(f"Error syncing messages of {channel_id} for top repliers: {e}")
+        return {"channel_id": channel_id, "error": str(e)}
+    finally:
+        _report_chunk_done(parent_id, None, channel_id, 1)
+
+
+@celery.task(priority=PRIORITY_REPORT)
+def merge_top_repliers_task(channel_results, top_n=10):
+    """Workspace-wide top repliers from per-channel counts, with a breakdown per channel.
+
+    Each replier of the overall top lists their counts in every channel
+    they replied in; ``channels`` holds each channel's own top (or the
+    error that left it out of the ranking).
+    """
+    overall = TopRepliersAggregator()
+    by_channel = {}
+    channel_tops = {}
+    for channel in channel_results:
+        if "error" in channel:
+            channel_tops[channel["channel_id"]] = {"error": channel["error"]}
+            continue
+        aggregator = TopRepliersAggregator()
+        for author, discussions, responses in channel["repliers"]:
+            overall.add_counts(author, discussions, responses)
+            aggregator.add_counts(author, discussions, responses)
+            by_channel.setdefault(author, {})[channel["channel_id"]] = {
+                "discussions": discussions, "responses": responses
+            }
+        channel_tops[channel["channel_id"]] = {"top_repliers": aggregator.top(top_n)}
+
+    top_repliers = overall.top(top_n)
+    authors = {author for author, _, _ in top_repliers}
+    for channel in channel_tops.values():
+        authors.update(author for author, _, _ in channel.get("top_repliers", []))
+    full_names = get_user_directory().get_many(authors)
+
+    def entry(author, discussions, responses):
+        return {
+            "id_replier": author,
+            "full_name_replier": full_names.get(author, "Unknown"),
+            "discussions": discussions,
+            "responses": responses
+        }
+
+    for channel in channel_tops.values():
+        if "top_repliers" in channel:
+            channel["top_repliers"] = [entry(*replier) for replier in channel["top_repliers"]]
+    return {
+        "top_repliers": [
+            dict(entry(author, discussions, responses), channels=by_channel[author])
+            for author, discussions, responses in top_repliers
+        ],
+        "channels": channel_tops
+    }
+
+def _generate(llm, main_message: str, replies: str, prompt: str = 'thread_summary', on_partial=None) -> str:
+    """Run one prompt, streaming the text generated so far to ``on_partial`` when given
+
+    Any failure is raised as LLMError.
+    """
+    if llm.provider in LLM_RATE_LIMITS:
+        # Every worker shares the provider's budget, whatever the queue concurrency
+        get_llm_rate_limiter().acquire(f"llm:{llm.provider}")
+    started = time.monotonic()
+    try:
+        if on_partial is None:
+            return llm.generate_summary(main_message, replies, prompt)
+
+        text = ""
+        for fragment in llm.stream_summary(main_message, replies, prompt):
+            text += fragment
+            on_partial(text)
+        return text
+    except LLMError:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating summary: {e}")
+        raise LLMError(f"Error generating summary: {str(e)}") from e
+    finally:
+        metrics.LLM_SECONDS.labels(
+            provider=str(llm.provider), model=str(getattr(llm, "model", None)), prompt=prompt
+        ).observe(time.monotonic() - started)
+
+
+def _summarize(llm, llm_provider: str, model: str, thread_data: dict, on_generate=None, on_partial=None) -> dict:
+    """Summary of an already fetched thread, served from the summary cache when possible
+
+    Threads whose replies do not fit in SUMMARY_CHUNK_TOKENS are split into
+    windows, summarized window by window and merged (see _map_reduce_summary).
+    With ``on_partial`` the final prompt is streamed and the callback gets the
+    summary generated so far. A failed generation is reported as the summary
+    text and not cached.
+    """
+    main_message_text = thread_data["main_message"]["message"]
+    reply_lines = [f"Respuesta {i}: {reply['message']}" for i, reply in enumerate(thread_data["replies"], 1)]
+    chunks = chunk_lines(reply_lines)
+    if len(chunks) > 1:
+        prompt_version = f"{llm.prompt_version('chunk_summary')}+{llm.prompt_version('reduce_summary')}"
+    else:
+        prompt_version = llm.prompt_version()
+
+    # Same provider, model, prompts and thread content -> same summary
+    cache = get_summary_cache()
+    cache_key = summary_cache_key(llm_provider, model, prompt_version, thread_content_hash(thread_data))
+    cached = cache.get(cache_key)
+    if cached:
+        return {"summary": cached["summary"], "generated_at": cached["generated_at"], "cached": True}
+
+    if on_generate:
+        on_generate()
+
+    try:
+        if len(chunks) > 1:
+            summary = _map_reduce_summary(llm, llm_provider, model, main_message_text, chunks, on_partial)
+        else:
+            replies_text = "\n".join(reply_lines) or "No hay respuestas en este hilo."
+            summary = _generate(llm, main_message_text, replies_text, on_partial=on_partial)
+    except LLMError as e:
+        return {"summary": str(e), "generated_at": datetime.now().isoformat(), "cached": False}
+    generated_at = datetime.now().isoformat()
+
+    if summary:
+        cache.set(cache_key, {"summary": summary, "generated_at": generated_at})
+
+    return {"summary": summary, "generated_at": generated_at, "cached": False}
+
+
+def _map_reduce_summary(llm, llm_provider: str, model: str, main_message: str, chunks: list,
+                        on_partial=None) -> str:
+    """Summarize each window of a long thread in parallel, then merge the partial summaries
+
+    Partial summaries are cached per window. Windows are filled from the
+    start of the thread, so when a thread grows only its last window and
+    the new ones are sent to the LLM again, plus the reduce step.
+    """
+    cache = get_summary_cache()
+    chunk_version = llm.prompt_version('chunk_summary')
+
+    def summarize_chunk(lines):
+        replies_text = "\n".join(lines)
+        cache_key = summary_cache_key(llm_provider, model, chunk_version, text_hash(main_message, replies_text))
+        cached = cache.get(cache_key)
+        if cached:
+            return cached["summary"]
+        partial = _generate(llm, main_message, replies_text, 'chunk_summary')
+        if partial:
+            cache.set(cache_key, {"summary": partial})
+        return partial
+
+    def reduce(partials, on_partial=None):
+        return _generate(llm, main_message, "\n\n".join(partials), 'reduce_summary', on_partial)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(SUMMARY_CHUNK_CONCURRENCY, len(chunks)))) as pool:
+        # A failed window or merge raises LLMError out of pool.map
+        partials = list(pool.map(summarize_chunk, chunks))
+
+        # The partial summaries may not fit in one prompt either: merge them in rounds
+        while True:
+            lines = [f"Parte {i}: {partial}" for i, partial in enumerate(partials, 1)]
+            groups = chunk_lines(lines)
+            if len(groups) == 1 or len(groups) == len(lines):
+                # Everything fits, or no two partials fit together: merge them all at once
+                return reduce(lines, on_partial)
+            partials = list(pool.map(reduce, groups))
+
+
+@celery.task(bind=True, priority=PRIORITY_INTERACTIVE)
 def summarize_thread_task(self, channel_id: str, thread_ts: str, llm_provider: str, model: str):
     """
     Celery task to summarize a Slack thread using the specified LLM provider
@@ -117,42 +575,140 @@ def summarize_thread_task(self, channel_id: str, thread_ts: str, llm_provider: s
         if "error" in thread_data:
             return {"error": thread_data["error"]}
         
-        # Update task state
-        self.update_state(state='PROGRESS', meta={'step': 'Generating summary'})
-        
         # Create LLM instance
         try:
             llm = LLMFactory.create_llm(llm_provider, model )
         except ValueError as e:
             return {"error": str(e)}
         
-        # Prepare content for summarization
-        main_message_text = thread_data["main_message"]["message"]
-        
-        # Format replies into a single string
-        replies_text = ""
-        if thread_data["replies"]:
-            replies_list = []
-            for i, reply in enumerate(thread_data["replies"], 1):
-                replies_list.append(f"Respuesta {i}: {reply['message']}")
-            replies_text = "\n".join(replies_list)
-        else:
-            replies_text = "No hay respuestas en este hilo."
-        
-        # Generate summary
-        summary = llm.generate_summary(main_message_text, replies_text)
+        last_update = 0.0
+
+        def publish_partial(text):
+            # The first fragment goes out right away, later ones at most every SUMMARY_STREAM_INTERVAL
+            nonlocal last_update
+            now = time.monotonic()
+            if now - last_update >= SUMMARY_STREAM_INTERVAL:
+                last_update = now
+                self.update_state(state='PROGRESS', meta={'step': 'Generating summary', 'partial_summary': text})
+
+        summary = _summarize(
+            llm, llm_provider, model, thread_data,
+            on_generate=lambda: self.update_state(state='PROGRESS', meta={'step': 'Generating summary'}),
+            on_partial=publish_partial
+        )
         
         # Prepare final result
         result = {
             "thread_data": thread_data,
-            "summary": summary,
+            "summary": summary["summary"],
             "llm_provider": llm_provider,
             "model": model,
-            "generated_at": datetime.now().isoformat()
+            "generated_at": summary["generated_at"]
         }
+        if summary["cached"]:
+            result["cached"] = True
         
         return result
         
     except Exception as e:
         logger.error(f"Error in summarize_thread_task: {e}")
-        return {"error": f"Task failed: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Task failed: {str(e)}"}
+
+
+@celery.task(bind=True, priority=PRIORITY_BULK)
+def summarize_threads_task(self, channel_id: str, llm_provider: str, model: str,
+                           thread_ts_list: list = None, p_start_date: str = None, p_end_date: str = None):
+    """
+    Celery task to summarize many threads of a channel at once
+
+    Threads are either given explicitly or every thread started in the
+    date range. They are fetched and summarized through a bounded pool
+    (SUMMARY_BATCH_CONCURRENCY) sharing a single LLM client, and each
+    finished summary is published right away in the task's PROGRESS meta.
+
+    The threads of a date range come from the message store, which only
+    the Slack workers touch: the task is replaced by ``thread_parents_task``
+    on the Slack queue chained to ``summarize_thread_parents_task``.
+
+    Returns:
+        Dictionary with one result per thread, in request order
+    """
+    if thread_ts_list is None:
+        # The LLM client is built by the task that summarizes
+        return self.replace(
+            thread_parents_task.s(channel_id, p_start_date, p_end_date)
+            | summarize_thread_parents_task.s(channel_id, llm_provider, model)
+        )
+
+    try:
+        llm = LLMFactory.create_llm(llm_provider, model)
+    except ValueError as e:
+        return {"error": str(e)}
+    return _summarize_threads(self, llm, channel_id, llm_provider, model, thread_ts_list)
+
+
+@celery.task(priority=PRIORITY_BULK)
+def thread_parents_task(channel_id, p_start_date, p_end_date):
+    """Threads started in a date range, after syncing the range into the message store"""
+    chunks = _date_chunks(p_start_date, p_end_date)
+    if not chunks:
+        return []
+    try:
+        sync_messages(channel_id, chunks[0][0], chunks[-1][1])
+    except SlackApiError as e:
+        return {"error": str(e)}
+    return get_message_store().thread_parents(channel_id, chunks[0][0], chunks[-1][1])
+
+
+@celery.task(bind=True, priority=PRIORITY_BULK)
+def summarize_thread_parents_task(self, thread_ts_list, channel_id: str, llm_provider: str, model: str):
+    """Chain callback of ``summarize_threads_task``: summarize the threads ``thread_parents_task`` found"""
+    if isinstance(thread_ts_list, dict):
+        return thread_ts_list
+    try:
+        llm = LLMFactory.create_llm(llm_provider, model)
+    except ValueError as e:
+        return {"error": str(e)}
+    return _summarize_threads(self, llm, channel_id, llm_provider, model, thread_ts_list)
+
+
+def _summarize_threads(task, llm, channel_id, llm_provider, model, thread_ts_list):
+    def summarize_one(thread_ts):
+        try:
+            thread_data = fetch_thread_by_ts(channel_id, thread_ts)
+            if "error" in thread_data:
+                return {"thread_ts": thread_ts, "error": thread_data["error"]}
+            summary = _summarize(llm, llm_provider, model, thread_data)
+            return {
+                "thread_ts": thread_ts,
+                "main_message": thread_data["main_message"],
+                "total_messages": thread_data["total_messages"],
+                **summary
+            }
+        except Exception as e:
+            logger.error(f"Error summarizing thread {thread_ts}: {e}")
+            return {"thread_ts": thread_ts, "error": f"Task failed: {str(e)}"}
+
+    total = len(thread_ts_list)
+    task.update_state(state='PROGRESS', meta={'done': 0, 'total': total})
+    with ThreadPoolExecutor(max_workers=max(1, min(SUMMARY_BATCH_CONCURRENCY, total))) as pool:
+        futures = [pool.submit(summarize_one, thread_ts) for thread_ts in thread_ts_list]
+        # Progress carries only the latest summary; the full list is the task result
+        for done, future in enumerate(as_completed(futures), start=1):
+            task.update_state(state='PROGRESS', meta={'done': done, 'total': total, 'latest': future.result()})
+
+    return {
+        "llm_provider": llm_provider,
+        "model": model,
+        "total": total,
+        "results": [future.result() for future in futures]
+    }
+
+
+@celery.task(priority=PRIORITY_REPORT)
+def apply_slack_event_task(event: dict, event_id: str = None):
+    """Apply one Slack Events API event to the local message store"""
+    applied = get_message_store().apply_event(event, event_id)
+    if not applied:
+        logger.info(f"Skipped Slack event {event_id} ({event.get('type')}/{event.get('subtype')})")
+    return applied
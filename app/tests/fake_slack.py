@@ -0,0 +1,213 @@
+"""Minimal in-process fake of the Slack Web API used by tests and benchmarks.
+
+Only the methods the app actually calls are implemented. Responses follow the
+shape returned by Slack so a real ``slack_sdk.WebClient`` can be pointed at it
+through ``base_url``.
+"""
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from app.rate_limiter import SLACK_METHOD_TIERS, SLACK_TIER_LIMITS
+
+
+def make_channel(n_messages, replies_per_thread=3, thread_every=2, start_ts=1704067200):
+    """Build synthetic history: every ``thread_every``-th message has replies"""
+    messages = []
+    replies = {}
+    for i in range(n_messages):
+        ts = f"{start_ts + i * 60}.{i:06d}"
+        msg = {"type": "message", "user": f"U{i % 7:04d}", "text": f"message {i}", "ts": ts}
+        if i % thread_every == 0 and replies_per_thread:
+            thread = [dict(msg, thread_ts=ts)]
+            for j in range(replies_per_thread):
+                thread.append({
+                    "type": "message",
+                    "user": f"U{(i + j + 1) % 7:04d}",
+                    "text": f"reply {j} to {i}",
+                    "ts": f"{start_ts + i * 60 + j + 1}.{i:06d}",
+                    "thread_ts": ts,
+                })
+            msg["reply_count"] = replies_per_thread
+            msg["latest_reply"] = thread[-1]["ts"]
+            replies[ts] = thread
+        messages.append(msg)
+    # conversations.history returns newest first
+    messages.reverse()
+    return messages, replies
+
+
+def tier_limits(window=60.0):
+    """``limits`` enforcing Slack's per-method tiers, squeezed into ``window`` seconds"""
+    return {method: (SLACK_TIER_LIMITS[tier], window) for method, tier in SLACK_METHOD_TIERS.items()}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Large enough that a wide client pool never sees refused connections
+    request_queue_size = 128
+
+
+class FakeSlack:
+    """Threaded HTTP server speaking a subset of the Slack Web API
+
+    Args:
+        messages: Channel history, newest first
+        replies: Mapping of thread ts to the full thread (parent first)
+        latency: Seconds to sleep before answering each call
+        limits: Optional mapping of method name to (max_calls, window_seconds);
+            calls over the limit get a 429 with a ``Retry-After`` header.
+            ``tier_limits()`` builds one from Slack's rate limit tiers
+
+    ``fail_on`` maps a method name to the call numbers (1-based) that must
+    answer with ``internal_error``, to simulate a crawl dying midway.
+    """
+
+    def __init__(self, messages=None, replies=None, latency=0.0, limits=None, users=None, channels=None):
+        self.messages = messages or []
+        self.replies = replies or {}
+        self.users = users or []
+        self.channels = channels or []
+        self.latency = latency
+        self.limits = limits or {}
+        self.fail_on = defaultdict(set)
+        self.calls = defaultdict(int)
+        self.ratelimited = defaultdict(int)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._windows = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/api/"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length).decode("utf-8")
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    params = json.loads(raw or "{}")
+                else:
+                    params = {k: v[0] for k, v in parse_qs(raw).items()}
+                method = self.path.rsplit("/", 1)[-1]
+                status, headers, body = fake.handle(method, params)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _check_limit(self, method):
+        if method not in self.limits:
+            return None
+        max_calls, window = self.limits[method]
+        now = time.monotonic()
+        calls = self._windows[method]
+        while calls and now - calls[0] >= window:
+            calls.popleft()
+        if len(calls) >= max_calls:
+            return max(1, int(window - (now - calls[0]) + 0.999))
+        calls.append(now)
+        return None
+
+    def handle(self, method, params):
+        with self._lock:
+            self.calls[method] += 1
+            if self.calls[method] in self.fail_on[method]:
+                return 200, {}, {"ok": False, "error": "internal_error"}
+            retry_after = self._check_limit(method)
+            if retry_after is not None:
+                self.ratelimited[method] += 1
+                return 429, {"Retry-After": str(retry_after)}, {"ok": False, "error": "ratelimited"}
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            handler = getattr(self, "_" + method.replace(".", "_"), None)
+            if handler is None:
+                return 200, {}, {"ok": False, "error": "unknown_method"}
+            return 200, {}, handler(params)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    @staticmethod
+    def _page(items, params, default_limit=100, max_limit=None):
+        limit = int(params.get("limit") or default_limit)
+        if max_limit:
+            limit = min(limit, max_limit)
+        offset = int(params.get("cursor") or 0)
+        page = items[offset:offset + limit]
+        next_cursor = str(offset + limit) if offset + limit < len(items) else ""
+        return page, {"next_cursor": next_cursor}
+
+    def _conversations_history(self, params):
+        oldest = float(params.get("oldest") or 0)
+        latest = float(params.get("latest") or "inf")
+        # Like Slack, both bounds are exclusive unless ``inclusive`` is set
+        if params.get("inclusive") in ("1", "true", True):
+            in_range = [m for m in self.messages if oldest <= float(m["ts"]) <= latest]
+        else:
+            in_range = [m for m in self.messages if oldest < float(m["ts"]) < latest]
+        page, metadata = self._page(in_range, params)
+        return {"ok": True, "messages": page, "has_more": bool(metadata["next_cursor"]),
+                "response_metadata": metadata}
+
+    def _conversations_replies(self, params):
+        thread = self.replies.get(params.get("ts"))
+        if thread is None:
+            return {"ok": False, "error": "thread_not_found"}
+        page, metadata = self._page(thread, params, default_limit=1000)
+        return {"ok": True, "messages": page, "has_more": bool(metadata["next_cursor"]),
+                "response_metadata": metadata}
+
+    def _users_list(self, params):
+        page, metadata = self._page(self.users, params, default_limit=200)
+        return {"ok": True, "members": page, "response_metadata": metadata}
+
+    def _users_profile_get(self, params):
+        for user in self.users:
+            if user["id"] == params.get("user"):
+                return {"ok": True, "profile": user["profile"]}
+        return {"ok": False, "error": "user_not_found"}
+
+    def _conversations_list(self, params):
+        # Slack often returns fewer channels than asked for; cap pages to exercise cursors
+        page, metadata = self._page(self.channels, params, default_limit=100, max_limit=100)
+        return {"ok": True, "channels": page, "response_metadata": metadata}
@@ -0,0 +1,75 @@
+import random
+from collections import defaultdict
+from datetime import date, datetime
+
+from app.analytics import TopRepliersAggregator, top_repliers_by_day
+from app.message_store import MessageStore
+
+
+def reference_top_repliers(threads, top_n):
+    """The original defaultdict + sort implementation"""
+    data = defaultdict(lambda: {"discussions": 0, "responses": 0})
+    for parent_author, reply_authors in threads:
+        repliers_set = set()
+        for reply_author in reply_authors:
+            if reply_author != parent_author:
+                if reply_author not in repliers_set:
+                    data[reply_author]["discussions"] += 1
+                    repliers_set.add(reply_author)
+                data[reply_author]["responses"] += 1
+    ranked = sorted(data.items(), key=lambda x: (-x[1]["discussions"], -x[1]["responses"]))[:top_n]
+    return [(author, d["discussions"], d["responses"]) for author, d in ranked]
+
+
+def test_matches_reference_implementation():
+    rng = random.Random(7)
+    users = [f"U{i}" for i in range(40)]
+    threads = [
+        (rng.choice(users), [rng.choice(users) for _ in range(rng.randint(0, 8))])
+        for _ in range(2000)
+    ]
+
+    assert TopRepliersAggregator().consume(threads).top(10) == reference_top_repliers(threads, 10)
+
+
+def test_parent_author_replies_are_ignored():
+    aggregator = TopRepliersAggregator()
+    aggregator.add_thread("U1", ["U1", "U2", "U2", "U1"])
+
+    assert aggregator.top(5) == [("U2", 1, 2)]
+
+
+def _ts(day, hour):
+    return f"{datetime(day.year, day.month, day.day, hour).timestamp():.6f}"
+
+
+def _thread(store, day, hour, author, repliers):
+    parent_ts = _ts(day, hour)
+    store.upsert_messages("C1", [{"ts": parent_ts, "user": author, "reply_count": len(repliers)}])
+    store.replace_thread("C1", parent_ts, [
+        {"ts": f"{float(parent_ts) + i + 1:.6f}", "user": user} for i, user in enumerate(repliers)
+    ])
+
+
+def test_rollups_are_reused_until_a_thread_of_their_day_changes(tmp_path, mocker):
+    store = MessageStore(str(tmp_path / "messages.db"))
+    _thread(store, date(2024, 1, 1), 10, "U1", ["U2", "U2", "U1"])
+    _thread(store, date(2024, 1, 2), 10, "U2", ["U3"])
+    _thread(store, date(2024, 1, 3), 23, "U1", ["U3", "U2"])
+    today = date(2024, 1, 3)
+
+    assert top_repliers_by_day(store, "C1", date(2024, 1, 1), today, 5, today=today) == [
+        ("U2", 2, 3), ("U3", 2, 2)
+    ]
+    # Past days are stored, today is always counted live
+    assert store.rollup_days("C1", "2024-01-01", "2024-01-03") == {"2024-01-01", "2024-01-02"}
+
+    materialize = mocker.spy(store, "materialize_rollup")
+    top_repliers_by_day(store, "C1", date(2024, 1, 1), today, 5, today=today)
+    assert materialize.call_count == 0
+
+    _thread(store, date(2024, 1, 2), 12, "U1", ["U3", "U3", "U3"])
+    assert top_repliers_by_day(store, "C1", date(2024, 1, 1), today, 5, today=today) == [
+        ("U3", 3, 5), ("U2", 2, 3)
+    ]
+    assert [c.args[1] for c in materialize.call_args_list] == ["2024-01-02"]
@@ -0,0 +1,55 @@
+import pytest
+from slack_sdk import WebClient
+
+from app.channel_directory import ChannelDirectory
+from app.tests.fake_slack import FakeSlack
+
+
+def channel(i):
+    return {"id": f"C{i:09d}", "name": f"team-{i}", "is_private": False, "num_members": i}
+
+
+@pytest.fixture
+def fake_slack():
+    with FakeSlack(channels=[channel(i) for i in range(250)]) as fake:
+        yield fake
+
+
+@pytest.fixture
+def web_client(fake_slack):
+    return WebClient(token="xoxb-test", base_url=fake_slack.base_url)
+
+
+def test_resolves_names_from_every_page(fake_slack, web_client):
+    directory = ChannelDirectory(web_client)
+
+    assert directory.resolve("team-249") == "C000000249"
+    assert directory.resolve("#Team-3") == "C000000003"
+    assert {c["id"]: c for c in directory.channels()}["C000000120"]["num_members"] == 120
+    assert fake_slack.calls["conversations.list"] == 3
+
+
+def test_ids_pass_through_without_calling_slack(fake_slack, web_client):
+    assert ChannelDirectory(web_client).resolve("C0123456789") == "C0123456789"
+    assert fake_slack.calls["conversations.list"] == 0
+
+
+def test_unknown_name_recrawls_at_most_once_per_interval(fake_slack, web_client):
+    directory = ChannelDirectory(web_client, refresh_interval=60)
+    directory.resolve("team-1")
+    directory._last_refresh = 0.0
+    fake_slack.channels.append({"id": "C999999999", "name": "new-channel"})
+
+    assert directory.resolve("new-channel") == "C999999999"
+    assert directory.resolve("missing") is None
+    assert fake_slack.calls["conversations.list"] == 6
+
+
+def test_stale_directory_is_served_while_refreshing_in_background(fake_slack, web_client):
+    directory = ChannelDirectory(web_client, ttl=0, refresh_interval=0)
+    directory.resolve("team-1")
+    fake_slack.channels[1] = {"id": "C000000001", "name": "renamed"}
+
+    assert directory.resolve("team-1") == "C000000001"
+    directory._background.join(timeout=5)
+    assert directory.resolve("renamed") == "C000000001"
@@ -0,0 +1,25 @@
+from app.chunker import chunk_lines, count_tokens
+
+
+def test_chunks_respect_budget_and_keep_order():
+    lines = [f"Respuesta {i}: " + "word " * 20 for i in range(1, 31)]
+    budget = count_tokens(lines[0]) * 4
+
+    chunks = chunk_lines(lines, budget)
+
+    assert [line for chunk in chunks for line in chunk] == lines
+    assert all(sum(count_tokens(line) for line in chunk) <= budget for chunk in chunks)
+
+
+def test_appending_lines_only_changes_the_tail():
+    lines = [f"Respuesta {i}: " + "word " * 20 for i in range(1, 31)]
+    budget = count_tokens(lines[0]) * 4
+    before = chunk_lines(lines, budget)
+
+    after = chunk_lines(lines + ["Respuesta 31: resolved"], budget)
+
+    assert after[:len(before) - 1] == before[:-1]
+
+
+def test_oversized_line_gets_its_own_window():
+    assert chunk_lines(["short", "x" * 1000, "short"], 10) == [["short"], ["x" * 1000], ["short"]]
@@ -0,0 +1,29 @@
+from app import clients, slack_client, utils
+from app.llm_factory import LLMFactory
+from app.llm_interface import PromptTemplate
+
+
+def test_one_slack_client_per_process():
+    assert slack_client.client is utils.client_util is clients.get_slack_client()
+
+
+def test_llm_instances_are_reused_per_provider_and_model():
+    first = LLMFactory.create_llm("ollama", "llama3")
+
+    assert LLMFactory.create_llm("Ollama", "llama3") is first
+    assert LLMFactory.create_llm("ollama", "qwen") is not first
+    assert LLMFactory.create_llm("ollama", "qwen").session is first.session
+
+
+def test_registry_starts_over_in_a_forked_process(mocker):
+    session = clients.get_http_session("ollama")
+    mocker.patch.object(clients.os, "getpid", return_value=-1)
+
+    assert clients.get_http_session("ollama") is not session
+
+
+def test_prompt_template_matches_str_format():
+    template = "MENSAJE:\n{main_message}\n\nRESPUESTAS:\n{replies}\n{{literal}}"
+    values = {"main_message": "deploy {failed}", "replies": "Respuesta 1: ok"}
+
+    assert PromptTemplate(template).render(**values) == template.format(**values)
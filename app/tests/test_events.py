@@ -0,0 +1,139 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+
+import pytest
+from slack_sdk import WebClient
+
+from app import app, routes, slack_client
+from app.message_store import MessageStore
+from app.tests.fake_slack import FakeSlack
+
+EVENTS_DIR = os.path.join(os.path.dirname(__file__), "events")
+CHANNEL = "C0123456789"
+SECRET = "test-signing-secret"
+
+
+def recorded(name):
+    with open(os.path.join(EVENTS_DIR, name + ".json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def apply(store, *names):
+    for name in names:
+        payload = recorded(name)
+        store.apply_event(payload["event"], payload["event_id"])
+
+
+@pytest.fixture
+def client(mocker):
+    mocker.patch.object(routes, "SLACK_SIGNING_SECRET", SECRET)
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def signed_post(client, payload, secret=SECRET):
+    body = json.dumps(payload)
+    timestamp = str(int(time.time()))
+    signature = "v0=" + hmac.new(secret.encode(), f"v0:{timestamp}:{body}".encode(), hashlib.sha256).hexdigest()
+    return client.post("/slack/events", data=body, content_type="application/json", headers={
+        "X-Slack-Request-Timestamp": timestamp,
+        "X-Slack-Signature": signature,
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MessageStore(str(tmp_path / "messages.db"))
+
+
+def test_url_verification_echoes_challenge(client):
+    payload = recorded("url_verification")
+
+    rv = signed_post(client, payload)
+
+    assert rv.status_code == 200
+    assert rv.json == {"challenge": payload["challenge"]}
+
+
+def test_unsigned_requests_are_rejected(client, mocker):
+    delay = mocker.patch("app.tasks.apply_slack_event_task.delay")
+
+    rv = signed_post(client, recorded("message"), secret="wrong")
+
+    assert rv.status_code == 403
+    delay.assert_not_called()
+
+
+def test_events_are_queued_for_the_workers(client, mocker):
+    delay = mocker.patch("app.tasks.apply_slack_event_task.delay")
+    payload = recorded("reply")
+
+    rv = signed_post(client, payload)
+
+    assert rv.status_code == 200
+    delay.assert_called_once_with(payload["event"], "Ev0MSG000002")
+
+
+def test_message_reply_edit_and_reactions_are_applied(store):
+    apply(store, "message", "reply", "reply", "message_changed", "reaction_added")
+
+    [(parent, replies)] = store.get_messages(CHANNEL, 0, 2e9)
+    assert parent["text"] == "El deploy de las 10:00 falló"
+    assert parent["reply_count"] == 1 and parent["latest_reply"] == "1760791260.000200"
+    assert [r["text"] for r in replies] == ["Hice rollback, ya está estable"]
+    assert parent["reactions"] == [{"name": "eyes", "users": ["U0000003"], "count": 1}]
+
+    apply(store, "reaction_removed", "message_deleted")
+
+    [(parent, replies)] = store.get_messages(CHANNEL, 0, 2e9)
+    assert "reactions" not in parent
+    assert replies == [] and parent["reply_count"] == 0
+
+
+def test_reports_after_the_stream_started_need_no_history_calls(store, mocker):
+    # History up to shortly after the first event was crawled once
+    store.add_synced_range(CHANNEL, 1760700000, 1760791230)
+    apply(store, "message", "reply")
+    mocker.patch.object(slack_client, "get_message_store", return_value=store)
+    mocker.patch.object(slack_client, "get_user_directory", return_value=mocker.Mock(get_many=lambda ids: {}))
+
+    with FakeSlack() as fake:
+        mocker.patch.object(slack_client, "client", WebClient(token="xoxb-test", base_url=fake.base_url))
+        messages = slack_client.fetch_messages(CHANNEL, 1760700000, 1760800000)
+
+    assert sum(fake.calls.values()) == 0
+    assert [m["message"] for m in messages] == ["El deploy de las 10 falló"]
+    assert [r["message"] for r in messages[0]["replies"]] == ["Hice rollback, ya está estable"]
+
+
+def test_reaction_only_channel_is_still_crawled(store, mocker):
+    apply(store, "reaction_added", "message_changed")
+    mocker.patch.object(slack_client, "get_message_store", return_value=store)
+    mocker.patch.object(slack_client, "get_user_directory", return_value=mocker.Mock(get_many=lambda ids: {}))
+    message = dict(recorded("message")["event"], ts="1760791500.000100")
+
+    with FakeSlack(messages=[message]) as fake:
+        mocker.patch.object(slack_client, "client", WebClient(token="xoxb-test", base_url=fake.base_url))
+        messages = slack_client.fetch_messages(CHANNEL, 1760700000, 1760800000)
+
+    assert store.events_since(CHANNEL) is None
+    assert fake.calls["conversations.history"] >= 1
+    assert [m["post_id"] for m in messages] == ["1760791500.000100"]
+
+
+def test_event_stream_goes_stale_without_message_events(store, mocker):
+    apply(store, "message")
+    assert store.events_since(CHANNEL) is not None
+
+    clock = mocker.patch("app.message_store.time.time", return_value=time.time() + 25 * 3600)
+    assert store.events_since(CHANNEL) is None
+
+    # The next message restarts the stream from itself
+    apply(store, "reply")
+    assert store.events_since(CHANNEL) == float(recorded("reply")["event"]["event_ts"])
+    clock.return_value += 3600
+    assert store.events_since(CHANNEL) == float(recorded("reply")["event"]["event_ts"])
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from app.llm_ollama import OLLAMA_TIMEOUT, OllamaLLM
+
+
+class FakeStreamResponse:
+    def __init__(self, lines, status_code=200):
+        self.lines = lines
+        self.status_code = status_code
+        self.text = ""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+
+def test_ollama_streams_content_until_done(mocker):
+    lines = [json.dumps({"message": {"content": part}, "done": False}).encode() for part in ("El ", "deploy")]
+    lines += [b"", json.dumps({"message": {"content": ""}, "done": True}).encode()]
+    llm = OllamaLLM("llama3")
+    post = mocker.patch.object(llm.session, "post", return_value=FakeStreamResponse(lines))
+
+    fragments = list(llm.stream_summary("main", "replies"))
+
+    assert fragments == ["El ", "deploy"]
+    assert post.call_args.kwargs["json"]["stream"] is True
+    # A stalled stream must not hang the worker
+    assert post.call_args.kwargs["timeout"] == OLLAMA_TIMEOUT
+
+
+def test_ollama_stream_raises_on_error_status(mocker):
+    llm = OllamaLLM("llama3")
+    mocker.patch.object(llm.session, "post", return_value=FakeStreamResponse([], status_code=500))
+
+    with pytest.raises(RuntimeError):
+        list(llm.stream_summary("main", "replies"))
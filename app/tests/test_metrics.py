@@ -0,0 +1,61 @@
+import json
+
+import prometheus_client
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from app import app, metrics
+from app.llm_ollama import OllamaLLM
+from app.rate_limiter import RateLimitedWebClient, SlackRateLimiter
+from app.tests.fake_slack import FakeSlack
+from app.tests.test_llm_streaming import FakeStreamResponse
+
+
+def sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_task_queue_wait_and_run_time_are_measured(mocker):
+    task = mocker.Mock()
+    task.name = "app.tasks.fetch_messages_task"
+    task.request.sent_at = 1000.0
+    task.request.delivery_info = {"routing_key": "slack"}
+    mocker.patch.object(metrics.time, "time", return_value=1002.5)
+    labels = {"task": task.name, "queue": "slack"}
+    wait_before = sample("slack_reports_task_queue_wait_seconds_sum", **labels)
+    runs_before = sample("slack_reports_task_run_seconds_count", task=task.name, state="SUCCESS")
+
+    metrics._task_started(task_id="t1", task=task)
+    metrics._task_finished(task_id="t1", task=task, state="SUCCESS")
+
+    assert sample("slack_reports_task_queue_wait_seconds_sum", **labels) == wait_before + 2.5
+    assert sample("slack_reports_task_run_seconds_count", task=task.name, state="SUCCESS") == runs_before + 1
+
+
+def test_slack_calls_and_rate_limits_are_measured():
+    calls_before = sample("slack_reports_slack_api_seconds_count", method="users.list", outcome="ok")
+    limited_before = sample("slack_reports_slack_api_ratelimited_total", method="users.list")
+
+    with FakeSlack(limits={"users.list": (1, 10)}) as fake:
+        limiter = SlackRateLimiter(rates={}, default_rate=(1000, 1000), max_wait=5)
+        web_client = RateLimitedWebClient(token="xoxb-test", base_url=fake.base_url, limiter=limiter)
+        web_client.users_list()
+        with pytest.raises(SlackApiError):
+            web_client.users_list()
+
+    assert sample("slack_reports_slack_api_seconds_count", method="users.list", outcome="ok") == calls_before + 1
+    assert sample("slack_reports_slack_api_ratelimited_total", method="users.list") == limited_before + 1
+    body = app.test_client().get("/metrics").get_data(as_text=True)
+    assert "slack_reports_slack_api_seconds_bucket" in body
+
+
+def test_ollama_stream_counts_tokens(mocker):
+    before = sample("slack_reports_llm_tokens_total", provider="ollama", model="llama3", kind="completion")
+    lines = [json.dumps({"message": {"content": "El deploy"}, "done": False}).encode(),
+             json.dumps({"message": {"content": ""}, "done": True, "prompt_eval_count": 120,
+                         "eval_count": 30}).encode()]
+    llm = OllamaLLM("llama3")
+    mocker.patch.object(llm.session, "post", return_value=FakeStreamResponse(lines))
+
+    assert "".join(llm.stream_summary("main", "replies")) == "El deploy"
+    assert sample("slack_reports_llm_tokens_total", provider="ollama", model="llama3", kind="completion") == before + 30
@@ -0,0 +1,54 @@
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from app import artifacts, parquet_export
+
+
+def message(ts, day, author, replies=(), reactions=None):
+    return {
+        "author": author, "fullname": None, "message": f"hi from {author}", "post_id": ts,
+        "url": f"https://example.slack.com/archives/C1/p{ts}", "date": f"{day}T10:00:00",
+        "reactions": reactions or {}, "subtype": None,
+        "replies": [
+            {"author": reply_author, "fullname": None, "message": "re", "post_id": f"{ts[:-1]}{i + 1}",
+             "url": "u", "date": f"{day}T10:00:01"}
+            for i, reply_author in enumerate(replies)
+        ],
+    }
+
+
+def test_write_parquet_partitions_tables_by_channel_and_day(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "ARTIFACTS_DIR", str(tmp_path))
+    messages = [
+        message("1704100001.000000", "2024-01-01", "U1", replies=["U2", "U3"], reactions={"tada": 2}),
+        message("1704200002.000000", "2024-01-02", "U2"),
+    ]
+
+    assert parquet_export.write_parquet("task-1", "C1", messages) == 2
+
+    files = parquet_export.list_files("task-1")
+    assert "messages/channel=C1/day=2024-01-01/part-0-0-0.parquet" in files
+    assert "messages/channel=C1/day=2024-01-02/part-0-0-0.parquet" in files
+
+    root = artifacts.artifact_path("task-1", ".parquet")
+    msgs = ds.dataset(f"{root}/messages", format="parquet", partitioning="hive").to_table()
+    assert sorted(msgs.column("post_id").to_pylist()) == ["1704100001.000000", "1704200002.000000"]
+    assert pa.types.is_dictionary(msgs.schema.field("author").type)
+
+    replies = ds.dataset(f"{root}/replies", format="parquet", partitioning="hive").to_table()
+    assert replies.column("author").to_pylist() == ["U2", "U3"]
+    reactions = ds.dataset(f"{root}/reactions", format="parquet", partitioning="hive").to_table()
+    assert reactions.column("reaction").to_pylist() == ["tada"]
+
+
+def test_day_partition_is_the_utc_day_of_the_ts(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "ARTIFACTS_DIR", str(tmp_path))
+    # 2024-01-01T23:30:00Z, formatted on a worker a few hours ahead of UTC
+    late = message("1704151800.000000", "2024-01-02", "U1", replies=["U2"])
+    late["replies"][0]["post_id"] = "1704155400.000000"  # 2024-01-02T00:30:00Z
+
+    parquet_export.write_parquet("task-1", "C1", [late])
+
+    files = parquet_export.list_files("task-1")
+    assert "messages/channel=C1/day=2024-01-01/part-0-0-0.parquet" in files
+    assert "replies/channel=C1/day=2024-01-02/part-0-0-0.parquet" in files
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from app import slack_client
+from app.message_store import MessageStore
+from app.rate_limiter import SLACK_METHOD_TIERS, SLACK_TIER_LIMITS, RateLimitedWebClient, SlackRateLimiter
+from app.user_directory import UserDirectory
+from app.tests.fake_slack import FakeSlack, make_channel, tier_limits
+
+
+def test_bucket_spends_burst_then_refills_at_rate():
+    limiter = SlackRateLimiter(rates={"conversations.replies": (20, 5)})
+
+    started = time.monotonic()
+    for _ in range(15):
+        limiter.acquire("conversations.replies")
+
+    # 5 calls from the burst, the other 10 at 20/s
+    assert 0.45 <= time.monotonic() - started < 1.5
+
+
+def test_block_pauses_only_that_method():
+    limiter = SlackRateLimiter(rates={}, default_rate=(1000, 1000))
+    limiter.block("conversations.replies", 0.3)
+
+    started = time.monotonic()
+    limiter.acquire("conversations.history")
+    assert time.monotonic() - started < 0.1
+    limiter.acquire("conversations.replies")
+    assert time.monotonic() - started >= 0.29
+
+
+def test_governed_crawl_stays_under_tier_limits(tmp_path, mocker):
+    window = 0.25
+    messages, replies = make_channel(150, replies_per_thread=2, thread_every=1)
+    # 80% of each tier per window plus a 10% burst, squeezed into the same window as the fake
+    rates = {
+        method: (SLACK_TIER_LIMITS[tier] * 0.8 / window, SLACK_TIER_LIMITS[tier] * 0.1)
+        for method, tier in SLACK_METHOD_TIERS.items()
+    }
+    store = MessageStore(str(tmp_path / "messages.db"))
+    mocker.patch.object(slack_client, "get_message_store", return_value=store)
+    mocker.patch.object(slack_client, "SLACK_REPLIES_CONCURRENCY", 16)
+
+    with FakeSlack(messages, replies, latency=0.005, limits=tier_limits(window)) as fake:
+        web_client = RateLimitedWebClient(token="xoxb-test", base_url=fake.base_url,
+                                          limiter=SlackRateLimiter(rates=rates))
+        mocker.patch.object(slack_client, "client", web_client)
+        mocker.patch.object(slack_client, "get_user_directory", return_value=UserDirectory(web_client))
+
+        fetched = slack_client.fetch_messages("C1", 0, 1710000000)
+
+    assert sum(fake.ratelimited.values()) == 0
+    assert sum(len(m["replies"]) for m in fetched) == 150 * 2
+
+
+def test_client_gives_up_once_max_wait_is_spent():
+    with FakeSlack(limits={"users.list": (1, 10)}) as fake:
+        limiter = SlackRateLimiter(rates={}, default_rate=(1000, 1000), max_wait=5)
+        web_client = RateLimitedWebClient(token="xoxb-test", base_url=fake.base_url, limiter=limiter)
+        web_client.users_list()
+
+        with pytest.raises(SlackApiError) as error:
+            web_client.users_list()
+
+    assert error.value.response["error"] == "ratelimited"
+    assert fake.calls["users.list"] == 2
@@ -0,0 +1,37 @@
+import io
+import json
+
+import pytest
+
+from app import records
+from app.records import MessageRecord, ReplyRecord
+
+
+@pytest.fixture
+def message():
+    slack_msg = {"ts": "1710000000.000100", "user": "U1", "text": "hola", "reactions": [{"name": "+1", "count": 2}]}
+    reply = ReplyRecord.from_slack("C1", {"ts": "1710000001.000200", "user": "U2", "text": "chau"},
+                                   {"U2": {"fullname": "Two"}})
+    return MessageRecord.from_slack("C1", slack_msg, replies=[reply])
+
+
+def test_records_read_like_the_formatted_dicts(message, monkeypatch):
+    monkeypatch.setattr(records, "SLACK_HOME", "https://acme.slack.com")
+
+    assert message["url"] == "https://acme.slack.com/archives/C1/p1710000000.000100"
+    assert message["replies"][0]["fullname"] == "Two"
+    assert message.get("subtype") is None and "reactions" in message
+    assert message == message.to_dict()
+    assert json.loads(json.dumps(message, default=records.jsonable)) == message.to_dict()
+    assert list(message.to_dict()) == ["author", "fullname", "message", "post_id", "url", "date",
+                                       "reactions", "replies", "subtype"]
+
+
+def test_rows_round_trip(message):
+    out = io.BytesIO()
+
+    assert records.write_records(out, [message, MessageRecord("C1", "1710000002.000300")]) == 2
+    out.seek(0)
+    restored = list(records.read_records(out))
+
+    assert [r.to_dict() for r in restored] == [message.to_dict(), MessageRecord("C1", "1710000002.000300").to_dict()]
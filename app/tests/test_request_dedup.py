@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+
+from app.request_dedup import COALESCED, CREATED, REUSED, RequestDeduplicator, request_key
+
+
+class FakeTask:
+    def __init__(self, mocker):
+        self.results = {}
+        self.launched = 0
+        self.mocker = mocker
+
+    def AsyncResult(self, task_id):
+        return self.results[task_id]
+
+    def launch(self, state="PENDING", result=None, date_done=None):
+        self.launched += 1
+        task_id = f"t{self.launched}"
+        self.results[task_id] = self.mocker.Mock(id=task_id, state=state, result=result, date_done=date_done)
+        return self.results[task_id]
+
+
+def test_request_key_normalizes_parameter_order():
+    assert request_key("top-repliers", {"a": 1, "b": 2}) == request_key("top-repliers", {"b": 2, "a": 1})
+    assert request_key("top-repliers", {"a": 1}) != request_key("fetch-messages", {"a": 1})
+
+
+def test_identical_requests_share_running_and_fresh_tasks(mocker):
+    dedup = RequestDeduplicator(freshness=300)
+    task = FakeTask(mocker)
+
+    assert dedup.submit("k", task, task.launch) == ("t1", CREATED)
+    assert dedup.submit("k", task, task.launch) == ("t1", COALESCED)
+    assert dedup.submit("other", task, task.launch) == ("t2", CREATED)
+
+    task.results["t1"].state = "SUCCESS"
+    task.results["t1"].date_done = datetime.now(timezone.utc) - timedelta(seconds=10)
+    assert dedup.submit("k", task, task.launch) == ("t1", REUSED)
+
+    # Stale results, failures and error results are crawled again
+    task.results["t1"].date_done = datetime.now(timezone.utc) - timedelta(seconds=600)
+    assert dedup.submit("k", task, task.launch) == ("t3", CREATED)
+    task.results["t3"].state = "FAILURE"
+    assert dedup.submit("k", task, task.launch) == ("t4", CREATED)
+    task.results["t4"].state = "SUCCESS"
+    task.results["t4"].result = {"error": "ratelimited"}
+    task.results["t4"].date_done = datetime.now(timezone.utc)
+    assert dedup.submit("k", task, task.launch) == ("t5", CREATED)
+
+
+def test_pending_task_is_only_coalesced_onto_for_the_grace_period(mocker):
+    dedup = RequestDeduplicator(pending_grace=60)
+    task = FakeTask(mocker)
+    clock = mocker.patch("app.request_dedup.time.time", return_value=1000.0)
+
+    assert dedup.submit("k", task, task.launch) == ("t1", CREATED)
+    clock.return_value = 1030.0
+    assert dedup.submit("k", task, task.launch) == ("t1", COALESCED)
+
+    # Still PENDING long after it was enqueued: likely lost, so enqueue again
+    clock.return_value = 1100.0
+    assert dedup.submit("k", task, task.launch) == ("t2", CREATED)
+
+    # A task a worker picked up is coalesced onto however long it runs
+    task.results["t2"].state = "STARTED"
+    clock.return_value = 5000.0
+    assert dedup.submit("k", task, task.launch) == ("t2", COALESCED)
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from celery import Celery
+
+from app import result_codec
+from app.records import MessageRecord
+from app.result_codec import make_codec, register_result_codec
+
+RESULT = {"status": "SUCCESS", "result": [{"id_replier": "U1", "discussions": 3, "responses": 5}] * 200,
+          "date_done": "2024-01-01T00:00:00+00:00"}
+
+
+def available(serializer, compression):
+    modules = {"orjson": result_codec.orjson,
+               "zstd": result_codec.zstandard, "lz4": result_codec.lz4_frame}
+    return all(modules.get(name, True) is not None for name in (serializer, compression))
+
+
+@pytest.mark.parametrize("serializer", result_codec.SERIALIZERS)
+@pytest.mark.parametrize("compression", result_codec.COMPRESSIONS)
+def test_codecs_round_trip_and_compress_only_large_payloads(serializer, compression):
+    if not available(serializer, compression):
+        pytest.skip(f"{serializer}/{compression} is not installed")
+    encode, decode = make_codec(serializer, compression, min_bytes=1024)
+
+    large, small = encode(RESULT), encode({"status": "PENDING"})
+
+    assert decode(large) == RESULT and decode(small) == {"status": "PENDING"}
+    assert small[:1] == b"\x00"
+    if compression != "none":
+        assert len(large) < len(json.dumps(RESULT)) / 5
+
+
+def test_records_and_results_stored_before_the_switch_decode():
+    encode, decode = make_codec("json", "zlib")
+
+    assert decode(json.dumps({"status": "SUCCESS"}).encode()) == {"status": "SUCCESS"}
+    assert decode(encode({"message": MessageRecord("C1", "1710000000.000100")}))["message"]["post_id"] == "1710000000.000100"
+
+
+def test_celery_backend_stores_results_with_the_codec():
+    app = Celery("codec-test", backend="cache+memory://")
+    app.conf.result_serializer = register_result_codec("json", "zlib", min_bytes=64)
+    app.conf.result_accept_content = ["json", result_codec.CODEC_NAME]
+
+    app.backend.store_result("t1", RESULT["result"], "SUCCESS")
+
+    assert app.AsyncResult("t1").result == RESULT["result"]
+    stored = app.backend.get(app.backend.get_key_for_task("t1"))
+    assert stored[:1] == b"\x01"
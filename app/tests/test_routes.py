@@ -1,5 +1,14 @@
 import pytest
 from app import app
+from app.request_dedup import RequestDeduplicator
+
+
+@pytest.fixture(autouse=True)
+def deduplicator(mocker):
+    dedup = RequestDeduplicator()
+    mocker.patch('app.routes.get_request_deduplicator', return_value=dedup)
+    return dedup
+
 
 @pytest.fixture
 def client():
@@ -7,11 +16,13 @@ def client():
     with app.test_client() as client:
         yield client
 
+
 def test_home(client):
     rv = client.get('/')
     assert rv.status_code == 200
     assert b'API is up and running!' in rv.data
 
+
 def test_fetch_messages(client, mocker):
     mocker.patch('app.tasks.fetch_messages_task.delay', return_value=mocker.Mock(id='1234567890abcdef'))
     rv = client.post('/fetch-messages', json={
@@ -22,6 +33,7 @@ def test_fetch_messages(client, mocker):
     assert rv.status_code == 202
     assert rv.json['task_id'] == '1234567890abcdef'
 
+
 def test_top_repliers(client, mocker):
     mocker.patch('app.tasks.calculate_top_repliers_task.delay', return_value=mocker.Mock(id='1234567890abcdef'))
     rv = client.post('/top-repliers', json={
@@ -31,4 +43,104 @@ def test_top_repliers(client, mocker):
         'top_n': 10
     })
     assert rv.status_code == 202
-    assert rv.json['task_id'] == '1234567890abcdef'
\ No newline at end of file
+    assert rv.json['task_id'] == '1234567890abcdef'
+
+
+def test_export_streams_ndjson_with_offset_and_limit(client, tmp_path, monkeypatch):
+    monkeypatch.setattr('app.artifacts.ARTIFACTS_DIR', str(tmp_path))
+    from app import artifacts
+    artifacts.write_ndjson('task-1', ({'post_id': str(i)} for i in range(10)))
+
+    rv = client.get('/exports/task-1?offset=3&limit=2')
+    assert rv.status_code == 200
+    assert rv.mimetype == 'application/x-ndjson'
+    assert rv.headers['X-Total-Count'] == '10'
+    assert rv.data == b'{"post_id": "3"}\n{"post_id": "4"}\n'
+
+    rv = client.get('/exports/task-1', headers={'Range': 'bytes=0-15'})
+    assert rv.status_code == 206
+    assert rv.data == b'{"post_id": "0"}'
+
+    assert client.get('/exports/missing').status_code == 404
+
+
+def test_summarize_threads(client, mocker):
+    delay = mocker.patch('app.tasks.summarize_threads_task.delay', return_value=mocker.Mock(id='batch-1'))
+    rv = client.post('/summarize-threads', json={
+        'channel_id': 'C1',
+        'thread_ts': ['1.0', '2.0'],
+        'llm_provider': 'OpenAI',
+        'model': 'gpt-4o-mini'
+    })
+    assert rv.status_code == 202
+    assert rv.json['task_id'] == 'batch-1'
+    delay.assert_called_once_with('C1', 'openai', 'gpt-4o-mini', ['1.0', '2.0'], None, None)
+
+    rv = client.post('/summarize-threads', json={'channel_id': 'C1', 'llm_provider': 'openai', 'model': 'm'})
+    assert rv.status_code == 400
+
+
+def test_task_status_includes_progress(client, mocker):
+    result = mocker.Mock(state='PROGRESS', info={'step': 'Generating summary', 'partial_summary': 'El deploy'})
+    mocker.patch('app.tasks.summarize_thread_task.AsyncResult', return_value=result)
+    rv = client.get('/task-status/abc?task_name=summarize_thread')
+    assert rv.status_code == 202
+    assert rv.json == {'status': 'PROGRESS', 'progress': {'step': 'Generating summary', 'partial_summary': 'El deploy'}}
+
+
+def test_endpoints_accept_channel_names(client, mocker):
+    directory = mocker.Mock()
+    directory.resolve.side_effect = lambda name: {'#general': 'C0000000001'}.get(name)
+    mocker.patch('app.routes.get_channel_directory', return_value=directory)
+    delay = mocker.patch('app.tasks.calculate_top_repliers_task.delay', return_value=mocker.Mock(id='t1'))
+
+    rv = client.post('/top-repliers', json={'channel': '#general', 'start_date': '2024-01-01', 'end_date': '2024-01-31'})
+    assert rv.status_code == 202
+    assert delay.call_args.args[0] == 'C0000000001'
+
+    rv = client.post('/top-repliers', json={'channel': 'nope', 'start_date': '2024-01-01', 'end_date': '2024-01-31'})
+    assert rv.status_code == 400
+    assert rv.json['error'] == "Channel 'nope' not found"
+
+
+def test_endpoints_accept_channel_lists_and_all(client, mocker):
+    directory = mocker.Mock()
+    directory.resolve.side_effect = lambda name: {'general': 'C0000000001', 'C0000000002': 'C0000000002'}.get(name)
+    directory.channels.return_value = [
+        {'id': 'C0000000001', 'is_private': False, 'is_archived': False},
+        {'id': 'C0000000003', 'is_private': False, 'is_archived': True},
+    ]
+    mocker.patch('app.routes.get_channel_directory', return_value=directory)
+    delay = mocker.patch('app.tasks.fetch_messages_task.delay', return_value=mocker.Mock(id='t1'))
+    dates = {'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+
+    rv = client.post('/fetch-messages', json={'channels': ['general', 'C0000000002'], **dates})
+    assert rv.status_code == 202
+    assert delay.call_args.args[0] == ['C0000000001', 'C0000000002']
+
+    rv = client.post('/fetch-messages', json={'channels': 'all', **dates})
+    assert delay.call_args.args[0] == ['C0000000001']
+
+    rv = client.post('/fetch-messages', json={'channels': ['general', 'nope'], **dates})
+    assert rv.status_code == 400
+    assert rv.json['error'] == "Channels not found: nope"
+
+
+def test_identical_reports_are_coalesced(client, mocker):
+    delay = mocker.patch('app.tasks.calculate_top_repliers_task.delay', return_value=mocker.Mock(id='t1'))
+    mocker.patch('app.tasks.calculate_top_repliers_task.AsyncResult', return_value=mocker.Mock(state='PROGRESS'))
+    body = {'channel_id': 'C1', 'start_date': '2024-01-01', 'end_date': '2024-01-31', 'top_n': 5}
+
+    first = client.post('/top-repliers', json=body)
+    second = client.post('/top-repliers', json=dict(body, top_n='5'))
+
+    assert (first.json, second.json) == ({'task_id': 't1', 'dedup': 'created'}, {'task_id': 't1', 'dedup': 'coalesced'})
+    delay.assert_called_once_with('C1', '2024-01-01', '2024-01-31', 5)
+
+
+def test_task_status_state_only_skips_the_result(client, mocker):
+    result = mocker.Mock(state='SUCCESS', result=[{'id_replier': 'U1'}])
+    mocker.patch('app.tasks.calculate_top_repliers_task.AsyncResult', return_value=result)
+    rv = client.get('/task-status/abc?task_name=top_repliers&state_only=true')
+    assert rv.status_code == 200
+    assert rv.json == {'status': 'SUCCESS'}
@@ -0,0 +1,128 @@
+import pytest
+
+from app import slack_client
+from app.message_store import MessageStore
+from app.rate_limiter import RateLimitedWebClient, SlackRateLimiter
+from app.user_directory import UserDirectory
+from app.tests.fake_slack import FakeSlack, make_channel
+
+
+@pytest.fixture
+def store(tmp_path, mocker):
+    store = MessageStore(str(tmp_path / "messages.db"))
+    mocker.patch.object(slack_client, "get_message_store", return_value=store)
+    return store
+
+
+@pytest.fixture
+def fake_slack(mocker, store):
+    messages, replies = make_channel(40, replies_per_thread=3, thread_every=2)
+    users = [{"id": f"U{i:04d}", "profile": {"real_name": f"User {i}"}} for i in range(7)]
+    with FakeSlack(messages, replies, latency=0.01, users=users) as fake:
+        limiter = SlackRateLimiter(rates={}, default_rate=(1000, 1000))
+        web_client = RateLimitedWebClient(token="xoxb-test", base_url=fake.base_url, limiter=limiter)
+        mocker.patch.object(slack_client, "client", web_client)
+        mocker.patch.object(slack_client, "get_user_directory", return_value=UserDirectory(web_client))
+        yield fake
+
+
+def test_fetch_messages_keeps_order_and_replies(fake_slack, mocker):
+    mocker.patch.object(slack_client, "SLACK_REPLIES_CONCURRENCY", 4)
+    messages = slack_client.fetch_messages("C1", 0, 1710000000)
+
+    assert [m["post_id"] for m in messages] == [m["ts"] for m in fake_slack.messages]
+    for msg in messages:
+        expected = fake_slack.replies.get(msg["post_id"], [])[1:]
+        assert [r["post_id"] for r in msg["replies"]] == [r["ts"] for r in expected]
+    assert 1 < fake_slack.max_in_flight <= 4
+
+
+def test_fetch_messages_waits_out_rate_limit(fake_slack):
+    fake_slack.limits = {"conversations.replies": (10, 1)}
+    messages = slack_client.fetch_messages("C1", 0, 1710000000)
+
+    assert fake_slack.ratelimited["conversations.replies"] > 0
+    assert sum(len(m["replies"]) for m in messages) == 20 * 3
+
+
+def test_second_fetch_is_served_from_store(fake_slack):
+    first = slack_client.fetch_messages("C1", 0, 1710000000)
+    calls = dict(fake_slack.calls)
+
+    assert slack_client.fetch_messages("C1", 0, 1710000000) == first
+    assert fake_slack.calls == calls
+
+
+def test_thread_broadcast_is_served_from_store_like_crawled(fake_slack):
+    # A reply also sent to the channel is listed in history and in its thread
+    parent = next(m for m in fake_slack.messages if "reply_count" in m)
+    broadcast = {"type": "message", "subtype": "thread_broadcast", "user": "U0001", "text": "also here",
+                 "ts": f"{float(parent['latest_reply']) + 1:.6f}", "thread_ts": parent["ts"]}
+    fake_slack.replies[parent["ts"]].append(broadcast)
+    parent["latest_reply"] = broadcast["ts"]
+    fake_slack.messages = sorted(fake_slack.messages + [broadcast], key=lambda m: float(m["ts"]), reverse=True)
+
+    crawled = slack_client.fetch_messages("C1", 0, 1710000000)
+    served = slack_client.fetch_messages("C1", 0, 1710000000)
+
+    assert served == crawled
+    assert broadcast["ts"] in [m["post_id"] for m in served]
+    thread = next(m for m in served if m["post_id"] == parent["ts"])
+    assert thread["replies"][-1]["post_id"] == broadcast["ts"]
+
+
+def test_sync_refetches_only_threads_with_new_replies(fake_slack, mocker):
+    slack_client.fetch_messages("C1", 0, 1710000000)
+    replies_calls = fake_slack.calls["conversations.replies"]
+
+    # A new reply lands on one old thread; re-list history from scratch
+    parent = next(m for m in fake_slack.messages if "reply_count" in m)
+    new_reply = {"user": "U9999", "text": "late reply", "ts": f"{float(parent['latest_reply']) + 1:.6f}"}
+    fake_slack.replies[parent["ts"]].append(new_reply)
+    parent["latest_reply"] = new_reply["ts"]
+    mocker.patch.object(slack_client, "THREAD_LOOKBACK_SECONDS", 10 ** 10)
+
+    messages = slack_client.fetch_messages("C1", 0, 1710000000)
+
+    assert fake_slack.calls["conversations.replies"] == replies_calls + 1
+    updated = next(m for m in messages if m["post_id"] == parent["ts"])
+    assert updated["replies"][-1]["message"] == "late reply"
+
+
+def test_fetch_messages_attaches_author_names_in_bulk(fake_slack):
+    messages = slack_client.fetch_messages("C1", 0, 1710000000)
+
+    assert messages[0]["fullname"] == f"User {int(messages[0]['author'][1:])}"
+    assert all(r["fullname"] for m in messages for r in m["replies"])
+    assert fake_slack.calls["users.list"] == 1
+    assert fake_slack.calls["users.profile.get"] == 0
+
+
+@pytest.fixture
+def big_channel(fake_slack):
+    # 250 messages -> three history pages
+    fake_slack.messages, fake_slack.replies = make_channel(250, replies_per_thread=1, thread_every=5)
+    return fake_slack
+
+
+def test_iter_messages_stops_crawling_when_caller_stops(big_channel):
+    messages = slack_client.iter_messages("C1", 0, 1710000000)
+    first = [next(messages) for _ in range(50)]
+
+    assert first[0]["post_id"] == big_channel.messages[0]["ts"]
+    assert big_channel.calls["conversations.history"] == 1
+
+
+def test_iter_messages_resumes_after_failure(big_channel):
+    big_channel.fail_on["conversations.history"] = {2}
+    seen = []
+    with pytest.raises(slack_client.SlackApiError):
+        for msg in slack_client.iter_messages("C1", 0, 1710000000):
+            seen.append(msg["post_id"])
+    assert len(seen) == 100
+
+    messages = slack_client.fetch_messages("C1", 0, 1710000000)
+
+    assert [m["post_id"] for m in messages] == [m["ts"] for m in big_channel.messages]
+    # The first page came from the store; only the missing pages were crawled again
+    assert big_channel.calls["conversations.history"] == 2 + 2
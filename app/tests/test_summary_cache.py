@@ -0,0 +1,38 @@
+from app.summary_cache import SummaryCache, summary_cache_key, thread_content_hash
+
+
+def thread(*replies):
+    return {
+        "main_message": {"post_id": "1.0", "author": "U1", "message": "deploy failed"},
+        "replies": [{"post_id": f"1.{i}", "author": "U2", "message": text} for i, text in enumerate(replies, 1)],
+    }
+
+
+def test_key_changes_with_content_provider_model_and_prompts():
+    content = thread_content_hash(thread("rolled back"))
+    key = summary_cache_key("openai", "gpt-4o", "1-abc", content)
+
+    assert key == summary_cache_key("OpenAI", "gpt-4o", "1-abc", thread_content_hash(thread("rolled back")))
+    assert key != summary_cache_key("openai", "gpt-4o", "1-abc", thread_content_hash(thread("rolled back", "fixed")))
+    assert key != summary_cache_key("ollama", "gpt-4o", "1-abc", content)
+    assert key != summary_cache_key("openai", "gpt-4o-mini", "1-abc", content)
+    assert key != summary_cache_key("openai", "gpt-4o", "2-abc", content)
+
+
+def test_local_cache_evicts_least_recently_used_by_size():
+    cache = SummaryCache(max_bytes=100)
+    cache.set("a", {"summary": "x" * 30})
+    cache.set("b", {"summary": "y" * 30})
+    cache.get("a")
+    cache.set("c", {"summary": "z" * 30})
+
+    assert cache.get("a") == {"summary": "x" * 30}
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_local_cache_expires_entries():
+    cache = SummaryCache(ttl=-1)
+    cache.set("a", {"summary": "old"})
+
+    assert cache.get("a") is None
@@ -0,0 +1,59 @@
+import json
+
+from app.task_events import stream_task_events
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.channels = []
+        self.closed = False
+
+    def subscribe(self, channel):
+        self.channels.append(channel)
+
+    def get_message(self, timeout=None):
+        return self.messages.pop(0) if self.messages else None
+
+    def close(self):
+        self.closed = True
+
+
+def fake_backend(mocker, current, published):
+    pubsub = FakePubSub(None if meta is None else {"data": json.dumps(meta)} for meta in published)
+    backend = mocker.Mock()
+    backend.client.pubsub.return_value = pubsub
+    backend.get_key_for_task.side_effect = lambda task_id: f"celery-task-meta-{task_id}".encode()
+    backend.get_task_meta.return_value = current
+    backend.decode_result.side_effect = json.loads
+    return backend, pubsub
+
+
+def parse(events):
+    return [(e.split("\n")[0], json.loads(e.split("\n")[1][len("data: "):])) for e in events if e.startswith("event:")]
+
+
+def test_pushes_progress_until_the_task_finishes_without_its_result(mocker):
+    backend, pubsub = fake_backend(mocker, {"status": "PENDING", "result": None}, [
+        {"status": "PROGRESS", "result": {"chunks_done": 1, "chunks_total": 2}},
+        None,
+        {"status": "SUCCESS", "result": {"artifact_id": "a", "count": 10}},
+        {"status": "SUCCESS", "result": "never read"},
+    ])
+
+    events = list(stream_task_events("t1", backend=backend, heartbeat=0))
+
+    assert pubsub.channels == [b"celery-task-meta-t1"] and pubsub.closed
+    assert parse(events) == [
+        ("event: pending", {"status": "PENDING"}),
+        ("event: progress", {"status": "PROGRESS", "progress": {"chunks_done": 1, "chunks_total": 2}}),
+        ("event: success", {"status": "SUCCESS"}),
+    ]
+    assert ": keep-alive\n\n" in events
+
+
+def test_finished_task_sends_one_event(mocker):
+    backend, pubsub = fake_backend(mocker, {"status": "FAILURE", "result": "boom"}, [])
+
+    assert parse(stream_task_events("t1", backend=backend)) == [("event: failure", {"status": "FAILURE", "error": "boom"})]
+    assert pubsub.closed
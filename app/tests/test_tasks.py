@@ -0,0 +1,365 @@
+from datetime import datetime
+
+import pytest
+
+from app import artifacts, celery, parquet_export, tasks
+from app.llm_interface import LLMError
+from app.message_store import MessageStore
+from app.records import MessageRecord
+from app.summary_cache import SummaryCache
+from slack_sdk.errors import SlackApiError
+
+
+@pytest.fixture
+def eager(monkeypatch):
+    monkeypatch.setattr(celery.conf, "task_always_eager", True)
+
+
+@pytest.fixture
+def artifacts_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "ARTIFACTS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_date_chunks_cover_whole_range():
+    chunks = tasks._date_chunks("2024-01-01", "2024-01-20")
+
+    assert len(chunks) == 3
+    assert chunks[0][0] < chunks[0][1] == chunks[1][0]
+    assert chunks[-1][1] == int(datetime(2024, 1, 20, 23, 59, 59).timestamp())
+
+
+def test_fetch_messages_task_merges_and_dedupes_chunks(eager, artifacts_dir, mocker):
+    # Neighbouring chunks share a boundary post, which must appear only once
+    mocker.patch.object(tasks, "iter_messages",
+                        side_effect=lambda channel, start, end: iter([MessageRecord(channel, str(start)),
+                                                                      MessageRecord(channel, str(end))]))
+
+    result = tasks.fetch_messages_task.apply(args=["C1", "2024-01-01", "2024-01-20"]).get()
+
+    post_ids = [m["post_id"] for m in artifacts.read_ndjson(result["artifact_id"])]
+    assert len(post_ids) == len(set(post_ids)) == result["count"] == 4
+    # Chunk artifacts are removed once merged
+    assert sorted(p.name for p in artifacts_dir.iterdir()) == [
+        f"{result['artifact_id']}.ndjson", f"{result['artifact_id']}.ndjson.idx"]
+
+
+def test_interrupted_chunk_resumes_from_its_checkpoint(artifacts_dir, mocker):
+    messages = [MessageRecord("C1", f"{ts}.000000") for ts in range(110, 100, -1)]
+    mocker.patch.object(artifacts, "ARTIFACT_CHECKPOINT_RECORDS", 3)
+
+    def dies_after_seven(channel, start, end):
+        yield from messages[:7]
+        raise SystemExit("worker lost")
+
+    mocker.patch.object(tasks, "iter_messages", side_effect=dies_after_seven)
+    with pytest.raises(SystemExit):
+        tasks.fetch_messages_chunk_task.run("C1", 100, 110, "job", 1, 0)
+    # Redelivered: only what is older than the last checkpoint (6 records) is asked for again
+    resumed = mocker.patch.object(tasks, "iter_messages",
+                                  side_effect=lambda channel, start, end: iter(m for m in messages
+                                                                               if float(m.post_id) <= end))
+    result = tasks.fetch_messages_chunk_task.run("C1", 100, 110, "job", 1, 0)
+
+    resumed.assert_called_once_with("C1", 100, 105.0)
+    assert result == {"artifact_id": "job-00000", "count": 10}
+    assert [m.post_id for m in artifacts.read_records("job-00000")] == [m.post_id for m in messages]
+    assert sorted(p.name for p in artifacts_dir.iterdir()) == ["job-00000.rows"]
+    assert tasks.fetch_messages_chunk_task.acks_late and tasks.fetch_messages_chunk_task.reject_on_worker_lost
+
+
+def test_merge_messages_task_propagates_chunk_error(artifacts_dir):
+    artifacts.write_ndjson("t-00000", [{"post_id": "1"}])
+
+    assert tasks.merge_messages_task([{"artifact_id": "t-00000"}, {"error": "boom"}], "t") == {"error": "boom"}
+    assert list(artifacts_dir.iterdir()) == []
+
+
+def test_calculate_top_repliers_task_streams_from_store(tmp_path, mocker):
+    store = MessageStore(str(tmp_path / "messages.db"))
+    store.upsert_messages("C1", [{"ts": "1704110400.000001", "user": "U1", "reply_count": 3}])
+    store.replace_thread("C1", "1704110400.000001", [
+        {"ts": "1704110401.000001", "user": "U2"},
+        {"ts": "1704110402.000001", "user": "U2"},
+        {"ts": "1704110403.000001", "user": "U3"},
+    ])
+    mocker.patch.object(tasks, "sync_messages")
+    mocker.patch.object(tasks, "get_message_store", return_value=store)
+    directory = mocker.Mock()
+    directory.get_many.return_value = {"U2": {"fullname": "Two"}, "U3": None}
+    mocker.patch.object(tasks, "get_user_directory", return_value=directory)
+
+    result = tasks.calculate_top_repliers_task.apply(args=["C1", "2024-01-01", "2024-01-02", 5]).get()
+
+    assert [(r["id_replier"], r["discussions"], r["responses"]) for r in result] == [("U2", 1, 2), ("U3", 1, 1)]
+    assert result[0]["full_name_replier"] == {"fullname": "Two"}
+
+
+def test_summarize_thread_task_reuses_cached_summary(mocker):
+    thread_data = {
+        "main_message": {"post_id": "1.0", "author": "U1", "message": "deploy failed"},
+        "replies": [{"post_id": "1.1", "author": "U2", "message": "rolled back"}],
+        "total_messages": 2,
+    }
+    mocker.patch.object(tasks, "fetch_thread_by_ts", return_value=thread_data)
+    mocker.patch.object(tasks, "get_summary_cache", return_value=SummaryCache())
+    llm = mocker.Mock()
+    llm.prompt_version.return_value = "1-abc"
+    llm.stream_summary.side_effect = lambda *args: iter(["Deploy failed ", "and was rolled back."])
+    mocker.patch.object(tasks.LLMFactory, "create_llm", return_value=llm)
+
+    first = tasks.summarize_thread_task.apply(args=["C1", "1.0", "openai", "gpt-4o"]).get()
+    second = tasks.summarize_thread_task.apply(args=["C1", "1.0", "openai", "gpt-4o"]).get()
+
+    assert llm.stream_summary.call_count == 1
+    assert first["summary"] == "Deploy failed and was rolled back."
+    assert second["summary"] == first["summary"] and second["cached"] is True
+
+
+def test_chunk_reports_an_error_once_its_retries_run_out(eager, artifacts_dir, mocker):
+    mocker.patch.object(artifacts, "ARTIFACT_CHECKPOINT_RECORDS", 1)
+    mocker.patch.object(tasks.fetch_messages_chunk_task, "max_retries", 2)
+
+    def drops_connection(channel, start, end):
+        yield MessageRecord(channel, f"{float(end):.6f}")
+        raise ConnectionError("connection reset")
+
+    crawl = mocker.patch.object(tasks, "iter_messages", side_effect=drops_connection)
+    result = tasks.fetch_messages_chunk_task.apply(args=["C1", 100, 110, "job", 1, 0]).get()
+
+    assert crawl.call_count == 3
+    assert result == {"error": "Network error fetching messages: connection reset"}
+    # The checkpointed partial artifact is not left behind
+    assert list(artifacts_dir.iterdir()) == []
+
+
+def test_summarize_threads_task_shares_one_client_and_keeps_order(mocker):
+    def fetch(channel, thread_ts):
+        return {
+            "main_message": {"post_id": thread_ts, "author": "U1", "message": f"topic {thread_ts}"},
+            "replies": [],
+            "total_messages": 1,
+        }
+    mocker.patch.object(tasks, "fetch_thread_by_ts", side_effect=fetch)
+    mocker.patch.object(tasks, "get_summary_cache", return_value=SummaryCache())
+    llm = mocker.Mock()
+    llm.prompt_version.return_value = "1-abc"
+    llm.generate_summary.side_effect = lambda main, replies, prompt: f"summary of {main}"
+    create_llm = mocker.patch.object(tasks.LLMFactory, "create_llm", return_value=llm)
+    update_state = mocker.patch.object(tasks.summarize_threads_task, "update_state")
+
+    result = tasks.summarize_threads_task.apply(
+        args=["C1", "openai", "gpt-4o"], kwargs={"thread_ts_list": ["3.0", "1.0", "2.0"]}
+    ).get()
+
+    create_llm.assert_called_once()
+    assert [r["thread_ts"] for r in result["results"]] == ["3.0", "1.0", "2.0"]
+    assert result["results"][0]["summary"] == "summary of topic 3.0"
+    progress = [c.kwargs["meta"] for c in update_state.call_args_list]
+    assert [meta["done"] for meta in progress] == [0, 1, 2, 3]
+    assert all("results" not in meta for meta in progress)
+    assert {meta["latest"]["thread_ts"] for meta in progress[1:]} == {"3.0", "1.0", "2.0"}
+
+
+def test_summarize_threads_by_date_reads_the_store_on_the_slack_queue(eager, mocker):
+    sync = mocker.patch.object(tasks, "sync_messages")
+    store = mocker.patch.object(tasks, "get_message_store").return_value
+    store.thread_parents.return_value = ["1.0", "2.0"]
+    mocker.patch.object(tasks, "fetch_thread_by_ts",
+                        side_effect=lambda channel, ts: {"main_message": {"post_id": ts, "message": "m"},
+                                                         "replies": [], "total_messages": 1})
+    mocker.patch.object(tasks, "get_summary_cache", return_value=SummaryCache())
+    llm = mocker.Mock(provider=None)
+    llm.prompt_version.return_value = "1-abc"
+    llm.generate_summary.return_value = "summary"
+    create_llm = mocker.patch.object(tasks.LLMFactory, "create_llm", return_value=llm)
+
+    result = tasks.summarize_threads_task.apply(
+        args=["C1", "openai", "gpt-4o"], kwargs={"p_start_date": "2024-01-01", "p_end_date": "2024-01-02"}
+    ).get()
+
+    sync.assert_called_once()
+    # Only the chained task that summarizes sets up the LLM client
+    create_llm.assert_called_once()
+    assert [r["thread_ts"] for r in result["results"]] == ["1.0", "2.0"]
+    assert celery.amqp.router.route({}, "app.tasks.thread_parents_task")["queue"].name == "slack"
+    assert celery.amqp.router.route({}, "app.tasks.summarize_thread_parents_task")["queue"].name == "llm"
+
+
+def test_long_thread_is_map_reduced_and_only_new_tail_resummarized(mocker):
+    mocker.patch("app.chunker.SUMMARY_CHUNK_TOKENS", 40)
+    mocker.patch.object(tasks, "get_summary_cache", return_value=SummaryCache())
+    llm = mocker.Mock()
+    llm.prompt_version.side_effect = lambda prompt="thread_summary": f"1-{prompt}"
+    llm.generate_summary.side_effect = lambda main, replies, prompt="thread_summary": f"{prompt}:{len(replies)}"
+
+    def thread(n_replies):
+        return {
+            "main_message": {"post_id": "1.0", "author": "U1", "message": "incident"},
+            "replies": [{"post_id": f"1.{i}", "author": "U2", "message": "status update " * 5}
+                        for i in range(1, n_replies + 1)],
+        }
+
+    first = tasks._summarize(llm, "openai", "gpt-4o", thread(12))
+    prompts = [c.args[2] for c in llm.generate_summary.call_args_list]
+    n_chunks = prompts.count("chunk_summary")
+    assert n_chunks > 2 and prompts[-1] == "reduce_summary"
+    assert first["summary"].startswith("reduce_summary")
+
+    llm.generate_summary.reset_mock()
+    tasks._summarize(llm, "openai", "gpt-4o", thread(13))
+    prompts = [c.args[2] for c in llm.generate_summary.call_args_list]
+    # Earlier windows come from the per-chunk cache; only the tail and the merge are generated
+    assert prompts.count("chunk_summary") <= 2 and prompts[-1] == "reduce_summary"
+
+
+def test_summarize_thread_task_publishes_partial_summary(mocker):
+    thread_data = {
+        "main_message": {"post_id": "1.0", "author": "U1", "message": "deploy failed"},
+        "replies": [],
+        "total_messages": 1,
+    }
+    mocker.patch.object(tasks, "fetch_thread_by_ts", return_value=thread_data)
+    mocker.patch.object(tasks, "get_summary_cache", return_value=SummaryCache())
+    mocker.patch.object(tasks, "SUMMARY_STREAM_INTERVAL", 0)
+    llm = mocker.Mock()
+    llm.prompt_version.return_value = "1-abc"
+    llm.stream_summary.side_effect = lambda *args: iter(["El deploy ", "falló."])
+    mocker.patch.object(tasks.LLMFactory, "create_llm", return_value=llm)
+    update_state = mocker.patch.object(tasks.summarize_thread_task, "update_state")
+
+    result = tasks.summarize_thread_task.apply(args=["C1", "1.0", "ollama", "llama3"]).get()
+
+    partials = [c.kwargs["meta"].get("partial_summary") for c in update_state.call_args_list]
+    assert partials[-2:] == ["El deploy ", "El deploy falló."]
+    assert result["summary"] == "El deploy falló."
+
+
+def test_failed_stream_is_reported_and_not_cached(mocker):
+    cache = SummaryCache()
+    mocker.patch.object(tasks, "get_summary_cache", return_value=cache)
+    llm = mocker.Mock()
+    llm.prompt_version.return_value = "1-abc"
+
+    def broken_stream(*args):
+        yield "partial "
+        raise ConnectionError("connection reset")
+    llm.stream_summary.side_effect = broken_stream
+    thread_data = {"main_message": {"post_id": "1.0", "author": "U1", "message": "x"}, "replies": []}
+
+    summary = tasks._summarize(llm, "ollama", "llama3", thread_data, on_partial=lambda text: None)
+
+    assert summary["summary"].startswith("Error generating summary")
+    assert cache._entries == {}
+
+
+def test_only_provider_failures_are_kept_out_of_the_cache(mocker):
+    cache = SummaryCache()
+    mocker.patch.object(tasks, "get_summary_cache", return_value=cache)
+    llm = mocker.Mock()
+    llm.prompt_version.return_value = "1-abc"
+    llm.generate_summary.side_effect = LLMError("Error contacting Ollama: timed out")
+    failing = {"main_message": {"post_id": "1.0", "author": "U1", "message": "x"}, "replies": []}
+
+    assert tasks._summarize(llm, "ollama", "llama3", failing)["summary"] == "Error contacting Ollama: timed out"
+    assert cache._entries == {}
+
+    # A summary that merely reads like an error is still a summary
+    llm.generate_summary.side_effect = None
+    llm.generate_summary.return_value = "Errores de configuración tumbaron el deploy."
+    tasks._summarize(llm, "ollama", "llama3", failing)
+    assert len(cache._entries) == 1
+
+
+def test_multi_channel_fetch_merges_per_channel_and_reports_failures(eager, artifacts_dir, mocker):
+    def fake_iter(channel, start, end):
+        if channel == "C3":
+            raise SlackApiError("not_in_channel", {"ok": False, "error": "not_in_channel"})
+        return iter([MessageRecord(channel, str(start), message=channel), MessageRecord(channel, str(end), message=channel)])
+    mocker.patch.object(tasks, "iter_messages", side_effect=fake_iter)
+
+    result = tasks.fetch_messages_task.apply(args=[["C1", "C2", "C3"], "2024-01-01", "2024-01-20"]).get()
+
+    assert result["channels"]["C1"] == result["channels"]["C2"] == {"count": 4}
+    assert result["channels"]["C3"]["error"].startswith("not_in_channel")
+    messages = list(artifacts.read_ndjson(result["artifact_id"]))
+    # Both channels share the same post ids and neither loses any to the other
+    assert [m["message"] for m in messages] == ["C1"] * 4 + ["C2"] * 4
+    assert result["count"] == 8
+
+
+def test_multi_channel_parquet_drops_the_parts_of_failed_channels(eager, artifacts_dir, mocker):
+    def fake_iter(channel, start, end):
+        # C2 fails only in its last chunk, after its first chunks wrote parts
+        if channel == "C2" and end == tasks._date_chunks("2024-01-01", "2024-01-20")[-1][1]:
+            raise SlackApiError("ratelimited", {"ok": False, "error": "ratelimited"})
+        return iter([MessageRecord(channel, f"{start}.000100", message=channel)])
+    mocker.patch.object(tasks, "iter_messages", side_effect=fake_iter)
+
+    result = tasks.fetch_messages_task.apply(
+        args=[["C1", "C2"], "2024-01-01", "2024-01-20"], kwargs={"export_format": "parquet"}
+    ).get()
+
+    assert result["channels"]["C1"] == {"count": 3} and "error" in result["channels"]["C2"]
+    files = parquet_export.list_files(result["artifact_id"])
+    assert files and not [f for f in files if "channel=C2" in f]
+
+
+def test_failed_parquet_fetch_leaves_no_partial_dataset(eager, artifacts_dir, mocker):
+    def fake_iter(channel, start, end):
+        # Only the last chunk fails, after the others wrote their parts
+        if end == tasks._date_chunks("2024-01-01", "2024-01-20")[-1][1]:
+            raise SlackApiError("ratelimited", {"ok": False, "error": "ratelimited"})
+        return iter([MessageRecord(channel, f"{start}.000100", message=channel)])
+    mocker.patch.object(tasks, "iter_messages", side_effect=fake_iter)
+
+    result = tasks.fetch_messages_task.apply(
+        args=["C1", "2024-01-01", "2024-01-20"], kwargs={"export_format": "parquet"}
+    ).get()
+
+    assert "error" in result
+    assert list(artifacts_dir.iterdir()) == []
+
+
+def test_multi_channel_top_repliers_merges_counts_with_breakdown(eager, tmp_path, mocker):
+    store = MessageStore(str(tmp_path / "messages.db"))
+    for channel, repliers in (("C1", ["U2", "U2", "U3"]), ("C2", ["U3", "U3", "U3"])):
+        store.upsert_messages(channel, [{"ts": "1704110400.000001", "user": "U1", "reply_count": 3}])
+        store.replace_thread(channel, "1704110400.000001", [
+            {"ts": f"170411040{i + 1}.000001", "user": user} for i, user in enumerate(repliers)
+        ])
+    mocker.patch.object(tasks, "sync_messages")
+    mocker.patch.object(tasks, "get_message_store", return_value=store)
+    directory = mocker.Mock()
+    directory.get_many.return_value = {}
+    mocker.patch.object(tasks, "get_user_directory", return_value=directory)
+
+    result = tasks.calculate_top_repliers_task.apply(args=[["C1", "C2"], "2024-01-01", "2024-01-02", 5]).get()
+
+    assert [(r["id_replier"], r["discussions"], r["responses"]) for r in result["top_repliers"]] == [
+        ("U3", 2, 4), ("U2", 1, 2)
+    ]
+    assert result["top_repliers"][0]["channels"] == {
+        "C1": {"discussions": 1, "responses": 1}, "C2": {"discussions": 1, "responses": 3}
+    }
+    assert [r["id_replier"] for r in result["channels"]["C1"]["top_repliers"]] == ["U2", "U3"]
+
+
+def test_tasks_are_routed_to_their_queue_with_priorities():
+    def queue(name):
+        return celery.amqp.router.route({}, name)["queue"].name
+
+    assert queue("app.tasks.fetch_messages_chunk_task") == "slack"
+    assert queue("app.tasks.summarize_thread_task") == "llm"
+    assert queue("app.tasks.merge_messages_task") == celery.conf.task_default_queue
+    assert tasks.summarize_thread_task.priority < tasks.calculate_top_repliers_task.priority
+    assert tasks.calculate_top_repliers_task.priority < tasks.fetch_messages_task.priority
+
+
+def test_llm_calls_take_a_token_of_their_provider(mocker):
+    limiter = mocker.patch.object(tasks, "get_llm_rate_limiter").return_value
+    llm = mocker.Mock(provider="openai")
+    llm.generate_summary.return_value = "summary"
+
+    assert tasks._generate(llm, "main", "replies") == "summary"
+    limiter.acquire.assert_called_once_with("llm:openai")
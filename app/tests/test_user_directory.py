@@ -0,0 +1,47 @@
+import pytest
+from slack_sdk import WebClient
+
+from app.tests.fake_slack import FakeSlack
+from app.user_directory import UserDirectory
+
+
+@pytest.fixture
+def fake_slack():
+    users = [{"id": f"U{i:04d}", "profile": {"real_name": f"User {i}", "display_name": f"u{i}"}}
+             for i in range(450)]
+    with FakeSlack(users=users) as fake:
+        yield fake
+
+
+@pytest.fixture
+def web_client(fake_slack):
+    return WebClient(token="xoxb-test", base_url=fake_slack.base_url)
+
+
+def test_get_many_fills_from_paginated_users_list(fake_slack, web_client):
+    directory = UserDirectory(web_client)
+
+    found = directory.get_many(["U0001", "U0449"])
+
+    assert found["U0449"]["fullname"] == "User 449"
+    assert fake_slack.calls["users.list"] == 3
+    assert fake_slack.calls["users.profile.get"] == 0
+    assert directory.get("U0200")["display_name"] == "u200"
+    assert fake_slack.calls["users.list"] == 3
+
+
+def test_unknown_user_falls_back_once_and_is_cached(fake_slack, web_client):
+    directory = UserDirectory(web_client)
+
+    assert directory.get("UNKNOWN") is None
+    assert directory.get("UNKNOWN") is None
+    assert fake_slack.calls["users.profile.get"] == 1
+
+
+def test_local_cache_is_lru_bounded(web_client):
+    directory = UserDirectory(web_client, max_size=100)
+
+    directory.refresh()
+
+    assert len(directory._entries) == 100
+    assert "U0449" in directory._entries and "U0000" not in directory._entries
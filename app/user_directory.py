@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import redis
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from . import logger
+from .utils import client_util, get_user_info_by_user_id
+
+USER_DIRECTORY_TTL = int(os.getenv("USER_DIRECTORY_TTL", str(24 * 3600)))
+USER_DIRECTORY_MAX_SIZE = int(os.getenv("USER_DIRECTORY_MAX_SIZE", "50000"))
+# Min seconds between two bulk users.list refreshes triggered by misses
+USER_DIRECTORY_REFRESH_INTERVAL = int(os.getenv("USER_DIRECTORY_REFRESH_INTERVAL", "300"))
+
+REDIS_PREFIX = "slack-reports:user:"
+REDIS_REFRESH_LOCK = "slack-reports:users:refreshing"
+
+
+def _profile_info(profile: dict) -> dict:
+    return dict(
+        fullname=profile.get("real_name"),
+        display_name=profile.get("display_name"),
+        email=profile.get("email", ""),
+    )
+
+
+class UserDirectory:
+    """User ID -> profile info cache, filled in bulk from ``users.list``.
+
+    Entries live in a local LRU (bounded by ``max_size``) in front of an
+    optional Redis cache shared by every worker. Both expire after ``ttl``.
+    A miss triggers one paginated ``users.list`` crawl (at most once per
+    ``refresh_interval`` across all workers) before falling back to a
+    single ``users.profile.get``.
+    """
+
+    def __init__(self, client: WebClient, redis_client: Optional[redis.Redis] = None,
+                 ttl: int = USER_DIRECTORY_TTL, max_size: int = USER_DIRECTORY_MAX_SIZE,
+                 refresh_interval: int = USER_DIRECTORY_REFRESH_INTERVAL):
+        self.client = client
+        self.redis = redis_client
+        self.ttl = ttl
+        self.max_size = max_size
+        self.refresh_interval = refresh_interval
+        self._entries = OrderedDict()  # user_id -> (expires_at, info or None)
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        return self.get_many([user_id]).get(user_id)
+
+    def get_many(self, user_ids: Iterable[str]) -> dict:
+        """Profile info for each user id (None for unknown users)"""
+        wanted = {user_id for user_id in user_ids if user_id}
+        found = self._get_local(wanted)
+
+        missing = wanted - found.keys()
+        if missing and self.redis is not None:
+            found.update(self._get_redis(missing))
+            missing = wanted - found.keys()
+
+        if missing and self._should_refresh():
+            users = self.refresh()
+            found.update({user_id: users[user_id] for user_id in missing if user_id in users})
+            missing = wanted - found.keys()
+
+        for user_id in missing:
+            # Guests and users from shared channels are not in users.list
+            info = get_user_info_by_user_id(self.client, user_id)
+            self._put({user_id: info})
+            found[user_id] = info
+
+        return found
+
+    def refresh(self) -> dict:
+        """Load every workspace member through paginated ``users.list``"""
+        self._last_refresh = time.monotonic()
+        users = {}
+        cursor = None
+        try:
+            while True:
+                response = self.client.users_list(limit=200, cursor=cursor)
+                for member in response["members"]:
+                    users[member["id"]] = _profile_info(member.get("profile", {}))
+                cursor = response.get("response_metadata", {}).get("next_cursor")
+                if not cursor:
+                    break
+        except SlackApiError as e:
+            logger.error(f"Error listing users: {e}")
+            if e.response.get("error") == "ratelimited":
+                raise
+        logger.info(f"User directory refreshed with {len(users)} users")
+        self._put(users)
+        return users
+
+    def _should_refresh(self) -> bool:
+        if time.monotonic() - self._last_refresh < self.refresh_interval:
+            return False
+        if self.redis is None:
+            return True
+        # Only one worker per interval crawls users.list; the rest read Redis
+        return bool(self.redis.set(REDIS_REFRESH_LOCK, "1", nx=True, ex=self.refresh_interval))
+
+    def _get_local(self, user_ids) -> dict:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._entries.get(user_id)
+                if entry is None:
+                    continue
+                expires_at, info = entry
+                if expires_at < now:
+                    del self._entries[user_id]
+                    continue
+                self._entries.move_to_end(user_id)
+                found[user_id] = info
+        return found
+
+    def _get_redis(self, user_ids) -> dict:
+        user_ids = list(user_ids)
+        values = self.redis.mget([REDIS_PREFIX + user_id for user_id in user_ids])
+        found = {user_id: json.loads(value) for user_id, value in zip(user_ids, values) if value is not None}
+        self._put_local(found)
+        return found
+
+    def _put(self, users: dict):
+        self._put_local(users)
+        if self.redis is not None and users:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id, info in users.items():
+                pipe.setex(REDIS_PREFIX + user_id, self.ttl, json.dumps(info))
+            pipe.execute()
+
+    def _put_local(self, users: dict):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for user_id, info in users.items():
+                self._entries[user_id] = (expires_at, info)
+                self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_user_directory() -> UserDirectory:
+    """Process-wide directory, shared through Redis when ``result_backend`` is set"""
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            redis_url = os.getenv("result_backend")
+            redis_client = redis.Redis.from_url(redis_url) if redis_url else None
+            _directory = UserDirectory(client_util, redis_client)
+        return _directory
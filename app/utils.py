@@ -2,32 +2,18 @@ from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from typing import Optional
 from . import logger
+from .clients import get_slack_client
 from datetime import datetime
 
-import os
-
-from dotenv import load_dotenv
-
-load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
-client_util = WebClient(token=os.getenv("SLACK_TOKEN"))
-
-
-def get_channel_id(channel_name):
-    try:
-        response = client_util.conversations_list()
-
-        for channel in response['channels']:
-            if channel['name'] == channel_name:
-                return channel['id']
-
-        return f"Channel '{channel_name}' not found."
-
-    except SlackApiError as e:
-        return f"Error fetching channels: {e.response['error']}"
+client_util = get_slack_client()
 
 
 def get_user_info_by_user_id(client: WebClient, user_id: str) -> Optional[dict]:
-    """Returns profile information for an specific user"""
+    """Returns profile information for an specific user
+
+    Rate limit errors the client could not wait out are raised instead of
+    returning a half-empty profile.
+    """
     email = ""
     fullname = None
     display_name = None
@@ -43,10 +29,11 @@ def get_user_info_by_user_id(client: WebClient, user_id: str) -> Optional[dict]:
     
     except SlackApiError as ex:
         logger.error(f"Error getting user profile: {ex}")
-        if ex.response["error"] != "ratelimited":
-            return None
+        if ex.response["error"] == "ratelimited":
+            raise
+        return None
     except Exception as ex:
-        logger().warning(f"Error getting user info from slack by id: {ex}", extra={"tags": {"Consumer": "get_user_info_by_user_id"}})
+        logger.warning(f"Error getting user info from slack by id: {ex}", extra={"tags": {"Consumer": "get_user_info_by_user_id"}})
         return None
 
     return dict(
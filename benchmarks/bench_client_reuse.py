@@ -0,0 +1,107 @@
+"""Per-task overhead of building LLM clients, old vs process-wide registry.
+
+"old" does what every summarize_thread_task used to do: read and parse
+prompts.yml, build a new OpenAI client (or post to Ollama without a
+session, paying a new TCP connection) and str.format the prompt. "new"
+goes through LLMFactory, which reuses one instance per provider and
+model, the parsed prompts and a keep-alive session. Ollama is replaced
+by a local HTTP/1.1 server, so only client overhead is measured.
+
+Usage: python -m benchmarks.bench_client_reuse [--tasks 500]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+import yaml
+from openai import OpenAI
+
+from app.llm_factory import LLMFactory
+
+PROMPTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'app', 'prompts.yml')
+MAIN_MESSAGE = "El deploy de la versión 2.3 falló en producción"
+REPLIES = "\n".join(f"Respuesta {i}: revisando logs del servicio {i}" for i in range(1, 40))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"message": {"content": "resumen"}, "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _old_prompt():
+    with open(PROMPTS_PATH, 'r', encoding='utf-8') as file:
+        prompts = yaml.safe_load(file)
+    system_prompt = prompts['thread_summary']['system_prompt']
+    user_prompt = prompts['thread_summary']['user_prompt'].format(main_message=MAIN_MESSAGE, replies=REPLIES)
+    return system_prompt, user_prompt
+
+
+def old_openai_task():
+    _old_prompt()
+    OpenAI(api_key="sk-bench")
+
+
+def new_openai_task():
+    LLMFactory.create_llm("openai", "gpt-4o-mini").format_prompt(MAIN_MESSAGE, REPLIES)
+
+
+def old_ollama_task(base_url):
+    system_prompt, user_prompt = _old_prompt()
+    payload = {"model": "llama3", "messages": [{"role": "system", "content": system_prompt},
+                                              {"role": "user", "content": user_prompt}], "stream": False}
+    requests.post(f"{base_url}/api/chat", json=payload).json()
+
+
+def new_ollama_task(base_url):
+    llm = LLMFactory.create_llm("ollama", "llama3")
+    llm.base_url = base_url
+    llm.generate_summary(MAIN_MESSAGE, REPLIES)
+
+
+def timed(task, n):
+    started = time.perf_counter()
+    for _ in range(n):
+        task()
+    return (time.perf_counter() - started) / n * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=500)
+    args = parser.parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    rows = [
+        ("openai", timed(old_openai_task, args.tasks), timed(new_openai_task, args.tasks)),
+        ("ollama", timed(lambda: old_ollama_task(base_url), args.tasks),
+         timed(lambda: new_ollama_task(base_url), args.tasks)),
+    ]
+    server.shutdown()
+
+    print(f"{'provider':>8} {'old ms/task':>12} {'new ms/task':>12} {'speedup':>8}")
+    for provider, old, new in rows:
+        print(f"{provider:>8} {old:>12.3f} {new:>12.3f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Memory, bytes and serialization time of formatted messages, dicts vs compact records.
+
+"dict" builds the per-message dicts the pipeline used to produce (keys,
+URL and ISO date computed eagerly) and serializes them the way a Celery
+JSON result or a pickle would store them. "records" builds MessageRecord
+objects and writes them as key-less msgpack rows. Figures are per 100k
+messages. With --redis the payloads are also stored and measured with
+MEMORY USAGE.
+
+Usage: python -m benchmarks.bench_records [--messages 100000] [--redis redis://localhost:6379/15]
+"""
+import argparse
+import io
+import json
+import pickle
+import time
+import tracemalloc
+from datetime import datetime
+
+from app import records
+from app.records import MessageRecord, ReplyRecord
+
+CHANNEL = "CBENCH"
+SLACK_HOME = "https://acme.slack.com"
+START_TS = 1704067200
+
+
+def raw_messages(n):
+    """Slack API messages: every 5th has 3 replies, every 10th a reaction"""
+    for i in range(n):
+        ts = f"{START_TS + i * 60}.{i % 1000000:06d}"
+        msg = {"ts": ts, "user": f"U{i % 500:05d}", "text": f"mensaje número {i} sobre el deploy"}
+        if i % 10 == 0:
+            msg["reactions"] = [{"name": "+1", "count": 2}]
+        replies = [
+            {"ts": f"{START_TS + i * 60 + j + 1}.{i % 1000000:06d}", "user": f"U{(i + j) % 500:05d}",
+             "text": f"respuesta {j}"}
+            for j in range(3)
+        ] if i % 5 == 0 else []
+        yield msg, replies
+
+
+def old_format(msg, replies):
+    def fmt(m):
+        post_id = m.get("ts")
+        return {
+            "author": m.get("user"), "fullname": None, "message": m.get("text"), "post_id": post_id,
+            "url": f"{SLACK_HOME}/archives/{CHANNEL}/p{post_id[:10]}.{post_id[-6:]}",
+            "date": datetime.fromtimestamp(float(post_id)).isoformat(),
+        }
+    formatted = fmt(msg)
+    formatted["reactions"] = {r["name"]: r["count"] for r in msg.get("reactions", [])}
+    formatted["replies"] = [fmt(reply) for reply in replies]
+    formatted["subtype"] = msg.get("subtype")
+    return formatted
+
+
+def new_format(msg, replies):
+    return MessageRecord.from_slack(CHANNEL, msg, replies=[ReplyRecord.from_slack(CHANNEL, r) for r in replies])
+
+
+def build(format_fn, source):
+    tracemalloc.start()
+    started = time.perf_counter()
+    built = [format_fn(msg, replies) for msg, replies in source]
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, elapsed, size
+
+
+def timed(fn):
+    started = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - started
+
+
+def rows_payload(built):
+    out = io.BytesIO()
+    records.write_records(out, built)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--redis", help="Redis URL to also measure MEMORY USAGE of each payload")
+    args = parser.parse_args()
+    records.SLACK_HOME = SLACK_HOME
+    source = list(raw_messages(args.messages))
+    scale = 100_000 / args.messages
+
+    dicts, dict_build, dict_mem = build(old_format, source)
+    recs, rec_build, rec_mem = build(new_format, source)
+    print(f"{'build':<22} {'ms':>9} {'heap MiB':>9}")
+    print(f"{'dicts':<22} {dict_build * 1000 * scale:>9.1f} {dict_mem * scale / 2 ** 20:>9.1f}")
+    print(f"{'records':<22} {rec_build * 1000 * scale:>9.1f} {rec_mem * scale / 2 ** 20:>9.1f}")
+
+    cases = [
+        ("dicts / json", lambda: json.dumps(dicts).encode(), lambda data: json.loads(data)),
+        ("dicts / pickle", lambda: pickle.dumps(dicts, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+        ("records / msgpack rows", lambda: rows_payload(recs), lambda data: list(records.read_records(io.BytesIO(data)))),
+    ]
+    redis_client = None
+    if args.redis:
+        import redis
+        redis_client = redis.Redis.from_url(args.redis)
+
+    print(f"\n{'serialize':<22} {'MiB':>9} {'encode ms':>10} {'decode ms':>10} {'redis MiB':>10}")
+    for name, encode, decode in cases:
+        payload, encode_time = timed(encode)
+        _, decode_time = timed(lambda: decode(payload))
+        stored = "-"
+        if redis_client is not None:
+            redis_client.set("bench:records", payload)
+            stored = f"{redis_client.memory_usage('bench:records') * scale / 2 ** 20:.1f}"
+            redis_client.delete("bench:records")
+        print(f"{name:<22} {len(payload) * scale / 2 ** 20:>9.1f} {encode_time * 1000 * scale:>10.1f} "
+              f"{decode_time * 1000 * scale:>10.1f} {stored:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Wall-clock time of fetch_messages against a fake Slack at several pool sizes.
+
+Usage: python -m benchmarks.bench_reply_fetch [--messages 200] [--latency 0.05]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from slack_sdk import WebClient
+
+from app import slack_client
+from app.message_store import MessageStore
+from app.tests.fake_slack import FakeSlack, make_channel
+from app.user_directory import UserDirectory
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake API call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    messages, replies = make_channel(args.messages)
+    users = [{"id": f"U{i:04d}", "profile": {"real_name": f"User {i}"}} for i in range(7)]
+    with FakeSlack(messages, replies, latency=args.latency, users=users) as fake:
+        slack_client.client = WebClient(token="xoxb-bench", base_url=fake.base_url)
+        print(f"{args.messages} messages, {len(replies)} threads, {args.latency * 1000:.0f} ms per call")
+        print(f"{'concurrency':>11} {'seconds':>9} {'speedup':>8}")
+        baseline = None
+        for workers in args.concurrency:
+            slack_client.SLACK_REPLIES_CONCURRENCY = workers
+            # Fresh store per run so every run crawls Slack in full
+            tmpdir = tempfile.mkdtemp()
+            store = MessageStore(os.path.join(tmpdir, "messages.db"))
+            slack_client.get_message_store = lambda: store
+            # Authors are resolved through the fake too, with a directory as cold as the store
+            directory = UserDirectory(WebClient(token="xoxb-bench", base_url=fake.base_url))
+            slack_client.get_user_directory = lambda: directory
+            started = time.perf_counter()
+            slack_client.fetch_messages("C1", 0, 1710000000)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            print(f"{workers:>11} {elapsed:>9.2f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Encode/decode latency and stored size of task results under each result codec.
+
+Compares Celery's default JSON serializer with the codecs of
+app.result_codec (json, orjson, msgpack x none, zlib, zstd, lz4) on three
+typical results: an inline message export (the shape fetch_messages
+results used to have), a batch of thread summaries and a multi-channel
+top repliers report. Codecs whose package is not installed are skipped.
+With --redis each payload is also stored and measured with MEMORY USAGE.
+
+Usage: python -m benchmarks.bench_result_codec [--messages 10000] [--redis redis://localhost:6379/15]
+"""
+import argparse
+import time
+
+from kombu.serialization import dumps as kombu_dumps, loads as kombu_loads
+
+from app import result_codec
+from benchmarks.bench_records import old_format, raw_messages
+
+
+def payloads(n_messages):
+    messages = [old_format(msg, replies) for msg, replies in raw_messages(n_messages)]
+    summaries = [
+        {"thread_ts": f"1704067200.{i:06d}", "summary": "El equipo revisó el incidente del deploy. " * 12,
+         "cached": i % 3 == 0}
+        for i in range(100)
+    ]
+    repliers = {
+        "top_repliers": [
+            {"id_replier": f"U{i:05d}", "full_name_replier": {"fullname": f"User {i}"}, "discussions": 100 - i,
+             "responses": 300 - i, "channels": {f"C{c:09d}": {"discussions": 3, "responses": 7} for c in range(20)}}
+            for i in range(50)
+        ],
+        "channels": {f"C{c:09d}": {"top_repliers": []} for c in range(20)},
+    }
+    return [("export", {"status": "SUCCESS", "result": messages}),
+            ("summaries", {"status": "SUCCESS", "result": summaries}),
+            ("top repliers", {"status": "SUCCESS", "result": repliers})]
+
+
+def codecs():
+    yield "celery json", (lambda obj: kombu_dumps(obj, serializer="json")[2].encode("utf-8"),
+                          lambda data: kombu_loads(data, "application/json", "utf-8"))
+    for serializer in result_codec.SERIALIZERS:
+        for compression in result_codec.COMPRESSIONS:
+            try:
+                yield f"{serializer}+{compression}", result_codec.make_codec(serializer, compression)
+            except RuntimeError:
+                continue
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--redis", help="Redis URL to also measure MEMORY USAGE of each payload")
+    args = parser.parse_args()
+
+    redis_client = None
+    if args.redis:
+        import redis
+        redis_client = redis.Redis.from_url(args.redis)
+
+    for name, payload in payloads(args.messages):
+        print(f"\n{name}")
+        print(f"{'codec':<18} {'KiB':>10} {'encode ms':>10} {'decode ms':>10} {'redis KiB':>10}")
+        for codec_name, (encode, decode) in codecs():
+            data = encode(payload)
+            encode_time = best_of(lambda: encode(payload), args.repeat)
+            decode_time = best_of(lambda: decode(data), args.repeat)
+            stored = "-"
+            if redis_client is not None:
+                redis_client.set("bench:codec", data)
+                stored = f"{redis_client.memory_usage('bench:codec') / 1024:.1f}"
+                redis_client.delete("bench:codec")
+            print(f"{codec_name:<18} {len(data) / 1024:>10.1f} {encode_time * 1000:>10.2f} "
+                  f"{decode_time * 1000:>10.2f} {stored:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Peak RSS and runtime of the top-repliers aggregation, old vs daily rollups.
+
+Builds a synthetic channel in a temporary message store, then runs each
+implementation in its own subprocess so ``ru_maxrss`` is not shared.
+"rollup" reports its first run, which materializes the 366 daily
+rollups, and a warm run that only sums them.
+
+Usage: python -m benchmarks.bench_top_repliers [--messages 1000000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date
+
+from app.analytics import top_repliers_by_day
+from app.message_store import MessageStore
+from app.slack_client import format_message, format_reply
+from app.tasks import _date_chunks
+
+CHANNEL = "CBENCH"
+START_TS = 1704067200  # 2024-01-01
+REPLIES_PER_THREAD = 3
+USERS = 500
+
+
+def build_store(path, n_messages):
+    """n_messages rows in total: parents with REPLIES_PER_THREAD replies each"""
+    store = MessageStore(path)
+    n_threads = n_messages // (REPLIES_PER_THREAD + 1)
+    spacing = 365 * 24 * 3600 / n_threads
+    conn = store._connection()
+    batch = []
+    for i in range(n_threads):
+        ts = f"{START_TS + i * spacing:.6f}"
+        parent = {"ts": ts, "user": f"U{i % USERS}", "text": f"message {i}", "reply_count": REPLIES_PER_THREAD}
+        batch.append((CHANNEL, ts, float(ts), None, json.dumps(parent)))
+        for j in range(REPLIES_PER_THREAD):
+            reply_ts = f"{START_TS + i * spacing + j + 1:.6f}"
+            reply = {"ts": reply_ts, "user": f"U{(i * 7 + j) % USERS}", "text": f"reply {j}", "thread_ts": ts}
+            batch.append((CHANNEL, reply_ts, float(reply_ts), ts, json.dumps(reply)))
+        if len(batch) >= 50000:
+            conn.executemany("INSERT INTO messages (channel, ts, ts_num, parent_ts, raw) VALUES (?, ?, ?, ?, ?)", batch)
+            conn.commit()
+            batch = []
+    conn.executemany("INSERT INTO messages (channel, ts, ts_num, parent_ts, raw) VALUES (?, ?, ?, ?, ?)", batch)
+    conn.commit()
+
+
+def run_old(store, chunks):
+    """Per-chunk lists of formatted message dicts, aggregated with defaultdict + sort"""
+    top_repliers_data = defaultdict(lambda: {"discussions": 0, "responses": 0, "full_name": ""})
+    for start_ts, end_ts in chunks:
+        messages = []
+        for msg, replies in store.get_messages(CHANNEL, start_ts, end_ts):
+            formatted_msg = format_message(CHANNEL, msg, replies=[format_reply(CHANNEL, reply) for reply in replies])
+            messages.append(formatted_msg)
+        for msg in messages:
+            parent_author = msg['author']
+            repliers_set = set()
+            for reply in msg.get("replies", []):
+                reply_author = reply["author"]
+                if reply_author != parent_author:
+                    if reply_author not in repliers_set:
+                        top_repliers_data[reply_author]["discussions"] += 1
+                        repliers_set.add(reply_author)
+                    top_repliers_data[reply_author]["responses"] += 1
+    ranked = sorted(top_repliers_data.items(), key=lambda x: (-x[1]['discussions'], -x[1]['responses']))[:10]
+    return [(d["discussions"], d["responses"]) for _, d in ranked]
+
+
+def run_rollup(store, chunks):
+    top = top_repliers_by_day(store, CHANNEL, date(2024, 1, 1), date(2024, 12, 31), 10, today=date(2025, 1, 1))
+    return [(discussions, responses) for _, discussions, responses in top]
+
+
+def measure(mode, path):
+    store = MessageStore(path)
+    chunks = _date_chunks("2024-01-01", "2024-12-31")
+    run = {"old": run_old, "rollup": run_rollup}[mode]
+
+    started = time.perf_counter()
+    top = run(store, chunks)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is KiB on Linux and includes the interpreter and imports
+    peak_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    # Second pass under tracemalloc for the Python heap the aggregation itself needs
+    tracemalloc.start()
+    run(store, chunks)
+    peak_heap_mib = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    run(store, chunks)
+    warm = time.perf_counter() - started
+
+    print(json.dumps({"mode": mode, "seconds": elapsed, "warm_seconds": warm, "peak_rss_mib": peak_rss_mib,
+                      "peak_heap_mib": peak_heap_mib, "top": top}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--measure", choices=["old", "rollup"], help=argparse.SUPPRESS)
+    parser.add_argument("--store", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.store)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "messages.db")
+        started = time.perf_counter()
+        build_store(path, args.messages)
+        print(f"built {args.messages} message channel in {time.perf_counter() - started:.1f}s")
+
+        results = {}
+        for mode in ("old", "rollup"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_top_repliers", "--measure", mode, "--store", path],
+                capture_output=True, text=True, check=True
+            ).stdout
+            results[mode] = json.loads(out.strip().splitlines()[-1])
+
+        # Tie order differs (old code saw chunks newest-first), so compare counts
+        assert results["old"]["top"] == results["rollup"]["top"], "implementations disagree"
+        print(f"{'mode':>6} {'seconds':>9} {'warm ms':>9} {'peak RSS MiB':>13} {'peak heap MiB':>14}")
+        for mode, result in results.items():
+            print(f"{mode:>6} {result['seconds']:>9.2f} {result['warm_seconds'] * 1000:>9.1f} "
+                  f"{result['peak_rss_mib']:>13.1f} {result['peak_heap_mib']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,12 @@ import ReportForm from './components/ReportForm';
 import TaskStatus from './components/TaskStatus';
 import SummaryForm from './components/SummaryForm';
 import SummaryTaskStatus from './components/SummaryTaskStatus';
-import { TaskResponse, TaskStatus as TaskStatusType, SummaryTask, SummaryTaskStatus as SummaryTaskStatusType, LLMProvider } from './types';
+import { TaskResponse, TaskStatus as TaskStatusType, ExportPointer, Message, SummaryTask, SummaryTaskStatus as SummaryTaskStatusType, LLMProvider } from './types';
 import { CheckCircleIcon } from '@heroicons/react/24/outline';
 
 const API_URL = 'http://localhost:5000';
+// How often a task is polled when its event stream is unavailable
+const TASK_POLL_INTERVAL_MS = 3000;
 
 interface Task {
   id: string;
@@ -62,6 +64,14 @@ const App: React.FC = () => {
       };
 
       setTasks(prev => [newTask, ...prev]);
+      watchTask(
+        result.task_id,
+        taskName,
+        state => setTasks(prev => prev.map(task => task.id === result.task_id
+          ? { ...task, status: { ...state, task_name: taskName }, last_updated: new Date() }
+          : task)),
+        () => checkTaskStatus(result.task_id, taskName)
+      );
       setNotification({ message: `Task ${result.task_id} generated successfully`, taskId: result.task_id });
 
       setTimeout(() => setNotification(null), 5000);
@@ -103,6 +113,14 @@ const App: React.FC = () => {
       };
 
       setSummaryTasks(prev => [newSummaryTask, ...prev]);
+      watchTask(
+        result.task_id,
+        'summarize_thread',
+        state => setSummaryTasks(prev => prev.map(task => task.id === result.task_id
+          ? { ...task, status: state, last_updated: new Date() }
+          : task)),
+        () => checkSummaryTaskStatus(result.task_id)
+      );
       setNotification({ message: `Summary task ${result.task_id} created successfully`, taskId: result.task_id });
 
       setTimeout(() => setNotification(null), 5000);
@@ -113,6 +131,58 @@ const App: React.FC = () => {
     }
   };
 
+  // Follow a task through server-sent events; the full result is fetched once when it finishes.
+  // The server ends each stream after TASK_EVENTS_MAX_SECONDS and EventSource reconnects on its
+  // own; only when the events endpoint is unavailable (e.g. no Redis backend) do we poll instead.
+  const watchTask = (taskId: string, taskName: string, onState: (state: any) => void, onDone: () => void) => {
+    const isTerminal = (state: any) =>
+      state.status === 'SUCCESS' || state.status === 'FAILURE' || state.status === 'REVOKED';
+
+    const pollState = async () => {
+      try {
+        const response = await fetch(`${API_URL}/task-status/${taskId}?task_name=${taskName}&state_only=true`);
+        const state = await response.json();
+        if (isTerminal(state)) {
+          onDone();
+          return;
+        }
+        onState(state);
+      } catch (error) {
+        console.error('Error polling task state:', error);
+      }
+      setTimeout(pollState, TASK_POLL_INTERVAL_MS);
+    };
+
+    const source = new EventSource(`${API_URL}/task-events/${taskId}`);
+    const handle = (event: MessageEvent) => {
+      const state = JSON.parse(event.data);
+      if (isTerminal(state)) {
+        source.close();
+        onDone();
+      } else {
+        onState(state);
+      }
+    };
+    ['pending', 'started', 'progress', 'retry', 'success', 'failure', 'revoked'].forEach(name =>
+      source.addEventListener(name, handle as EventListener)
+    );
+    source.onerror = () => {
+      // CONNECTING means EventSource is already reconnecting; CLOSED means it gave up for good
+      if (source.readyState === EventSource.CLOSED) {
+        pollState();
+      }
+    };
+  };
+
+  const fetchExport = async (url: string): Promise<Message[]> => {
+    const response = await fetch(`${API_URL}${url}`);
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const text = await response.text();
+    return text.split('\n').filter(line => line.trim()).map(line => JSON.parse(line));
+  };
+
   const checkTaskStatus = async (taskId: string, taskName: string) => {
     try {
       console.log('Checking status for task:', taskId, 'with name:', taskName);
@@ -129,6 +199,19 @@ const App: React.FC = () => {
         throw new Error('Invalid status response from server');
       }
 
+      // Message exports come back as a pointer to an NDJSON artifact, and a task that
+      // could not fetch anything (e.g. a Slack API error) succeeds with just an error
+      if (newStatus.status === 'SUCCESS' && newStatus.data && !Array.isArray(newStatus.data)) {
+        const data = newStatus.data as Partial<ExportPointer> & { error?: string };
+        if (data.error) {
+          newStatus.status = 'FAILURE';
+          newStatus.error = data.error;
+          delete newStatus.data;
+        } else if (data.artifact_id && data.url) {
+          newStatus.data = await fetchExport(data.url);
+        }
+      }
+
       setTasks(prev => prev.map(task => {
         if (task.id === taskId) {
           console.log('Updating task status from:', task.status.status, 'to:', newStatus.status);
@@ -222,7 +305,7 @@ const App: React.FC = () => {
 
   const downloadData = (taskId: string, format: 'csv' | 'json') => {
     const task = tasks.find(t => t.id === taskId);
-    if (!task?.status.data) return;
+    if (!task?.status.data || !Array.isArray(task.status.data)) return;
 
     const data = task.status.data;
     let content: string;
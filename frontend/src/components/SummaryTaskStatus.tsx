@@ -36,6 +36,7 @@ const SummaryTaskStatus: React.FC<SummaryTaskStatusProps> = ({
   const getStatusIcon = () => {
     switch (status.status) {
       case 'PENDING':
+      case 'PROGRESS':
         return <ClockIcon className="h-5 w-5 text-yellow-500" />;
       case 'SUCCESS':
         return <CheckCircleIcon className="h-5 w-5 text-green-500" />;
@@ -49,6 +50,7 @@ const SummaryTaskStatus: React.FC<SummaryTaskStatusProps> = ({
   const getStatusColor = () => {
     switch (status.status) {
       case 'PENDING':
+      case 'PROGRESS':
         return 'border-yellow-200 bg-yellow-50';
       case 'SUCCESS':
         return 'border-green-200 bg-green-50';
@@ -145,6 +147,22 @@ const SummaryTaskStatus: React.FC<SummaryTaskStatusProps> = ({
         </div>
       )}
 
+      {status.status === 'PROGRESS' && status.progress?.partial_summary && (
+        <div className="border-t pt-4 mt-4">
+          <div className="mb-3">
+            <h4 className="font-medium text-gray-800 flex items-center space-x-2">
+              <SparklesIcon className="h-4 w-4 text-purple-500" />
+              <span>{status.progress.step || 'Generating summary'}...</span>
+            </h4>
+          </div>
+          <div className="bg-white border rounded-lg p-4">
+            <p className="text-gray-700 leading-relaxed whitespace-pre-wrap">
+              {status.progress.partial_summary}
+            </p>
+          </div>
+        </div>
+      )}
+
       {status.status === 'FAILURE' && status.error && (
         <div className="border-t pt-4 mt-4">
           <div className="bg-red-50 border border-red-200 rounded-lg p-3">
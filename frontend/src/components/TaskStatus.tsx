@@ -61,6 +61,16 @@ const TaskStatus: React.FC<TaskStatusProps> = ({
             <div className="font-semibold">Status: Pending</div>
           </div>
         )}
+        {status.status === 'PROGRESS' && (
+          <div className="text-blue-600">
+            <div className="font-semibold">Status: In progress</div>
+            {status.progress?.chunks_total !== undefined && (
+              <div className="text-sm mt-1">
+                {status.progress.chunks_done} / {status.progress.chunks_total} chunks done
+              </div>
+            )}
+          </div>
+        )}
         {status.status === 'SUCCESS' && (
           <div className="text-green-600">
             <div className="font-semibold">Status: Completed</div>
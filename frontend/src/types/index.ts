@@ -4,12 +4,23 @@ export interface TaskResponse {
 }
 
 export interface TaskStatus {
-  status: 'PENDING' | 'SUCCESS' | 'FAILURE';
+  status: 'PENDING' | 'PROGRESS' | 'SUCCESS' | 'FAILURE';
   error?: string;
-  data?: Message[] | TopReplier[];
+  progress?: {
+    chunks_done?: number;
+    chunks_total?: number;
+  };
+  data?: Message[] | TopReplier[] | ExportPointer;
   task_name?: string;
 }
 
+export interface ExportPointer {
+  artifact_id: string;
+  count: number;
+  format: 'ndjson';
+  url: string;
+}
+
 export interface Message {
   author: string;
   date: string;
@@ -59,9 +70,13 @@ export interface ThreadSummary {
 }
 
 export interface SummaryTaskStatus {
-  status: 'PENDING' | 'SUCCESS' | 'FAILURE';
+  status: 'PENDING' | 'PROGRESS' | 'SUCCESS' | 'FAILURE';
   error?: string;
   data?: ThreadSummary;
+  progress?: {
+    step?: string;
+    partial_summary?: string;
+  };
 }
 
 export interface SummaryTask {